@@ -0,0 +1,51 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+from pydantic import BaseModel, Field
+from app.utils.current_user import get_current_user
+from app.utils.slow_query_log import slow_query_log
+
+router = APIRouter()
+
+class SlowQuerySettings(BaseModel):
+    threshold_ms: Optional[float] = Field(None, ge=0)
+    max_entries: Optional[int] = Field(None, ge=1, le=1000)
+    explain_sample_rate: Optional[float] = Field(None, ge=0, le=1)
+
+@router.get("/slow-queries")
+async def get_slow_queries(
+    sort: str = Query("max", pattern="^(max|total|count|mean)$"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Slowest normalized statements with percentiles and captured plans"""
+    # Only admins and super admins can view the slow query log
+    if current_user["role"] not in ["super_admin", "admin"]:
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    return slow_query_log.snapshot(sort)
+
+@router.put("/slow-queries/settings")
+async def update_slow_query_settings(
+    settings: SlowQuerySettings,
+    current_user: dict = Depends(get_current_user)
+):
+    """Change the slow query threshold, table size or EXPLAIN sample rate"""
+    # Only super admins can change the slow query settings
+    if current_user["role"] != "super_admin":
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    slow_query_log.configure(**settings.model_dump())
+    return {
+        "threshold_ms": slow_query_log.threshold_ms,
+        "max_entries": slow_query_log.max_entries,
+        "explain_sample_rate": slow_query_log.explain_sample_rate
+    }
+
+@router.delete("/slow-queries")
+async def reset_slow_queries(current_user: dict = Depends(get_current_user)):
+    """Clear the slow query log"""
+    # Only super admins can clear the slow query log
+    if current_user["role"] != "super_admin":
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    slow_query_log.reset()
+    return {"message": "Slow query log cleared"}
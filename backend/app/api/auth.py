@@ -3,14 +3,20 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.utils.database import get_db
+from app.utils.current_user import get_current_user
 from app.utils.mock_database import get_mock_db
+from app.utils.query_stats import query_budget
 from app.models.user import User
 from app.schemas.user import LoginRequest, LoginResponse, UserResponse
-from app.services.auth_service import verify_password, create_access_token, verify_token
+from app.services.auth_service import PasswordHasherBusy, verify_and_update_password_async, create_access_token, revoke_token
 from datetime import timedelta
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
-security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 @router.post("/login", response_model=LoginResponse)
 async def login(login_data: LoginRequest, request: Request, db: AsyncSession = Depends(get_db)):
@@ -27,8 +33,23 @@ async def login(login_data: LoginRequest, request: Request, db: AsyncSession = D
         user_data = await mock_db.get_user_by_username(login_data.username)
         user = user_data
     
-    # Verify user exists and password is correct
-    if not user or not verify_password(login_data.password, user.password_hash if use_real_db else user["password_hash"]):
+    # Verify user exists and password is correct (bcrypt runs off the event loop)
+    new_hash = None
+    try:
+        if user:
+            password_valid, new_hash = await verify_and_update_password_async(
+                login_data.password, user.password_hash if use_real_db else user["password_hash"]
+            )
+        else:
+            password_valid = False
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many logins in progress, please retry",
+            headers={"Retry-After": "1"}
+        )
+    
+    if not password_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password"
@@ -42,6 +63,19 @@ async def login(login_data: LoginRequest, request: Request, db: AsyncSession = D
             detail="Account is deactivated"
         )
     
+    # Hash was made with a different bcrypt cost: store the rehash from this login
+    if new_hash:
+        try:
+            if use_real_db:
+                user.password_hash = new_hash
+                await db.commit()
+                await db.refresh(user)
+            else:
+                user["password_hash"] = new_hash
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"Could not store rehashed password for {login_data.username}: {e}")
+    
     # Create access token
     access_token = create_access_token(
         data={
@@ -72,59 +106,14 @@ async def login(login_data: LoginRequest, request: Request, db: AsyncSession = D
     )
 
 @router.post("/logout")
-async def logout():
+async def logout(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)):
     """User logout"""
+    if credentials:
+        revoke_token(credentials.credentials)
     return {"message": "Logged out successfully"}
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_db)):
+@query_budget(1)
+async def get_me(user: dict = Depends(get_current_user)):
     """Get current authenticated user"""
-    # Verify token
-    payload = verify_token(credentials.credentials)
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token"
-        )
-    
-    user_id = payload.get("sub")
-    if not user_id:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token payload"
-        )
-    
-    use_real_db = getattr(request.app.state, 'use_real_db', False)
-    
-    if use_real_db:
-        # Get user from real database
-        result = await db.execute(select(User).where(User.id == user_id))
-        user = result.scalar_one_or_none()
-        
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
-        return UserResponse(
-            id=str(user.id),
-            email=user.email,
-            full_name=user.full_name,
-            role=user.role,
-            is_active=user.is_active,
-            created_at=user.created_at,
-            updated_at=user.updated_at
-        )
-    else:
-        # Get user from mock database
-        mock_db = await get_mock_db()
-        user = await mock_db.get_user_by_id(user_id)
-        
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
-        return UserResponse(**user)
\ No newline at end of file
+    return UserResponse(**user)
@@ -36,6 +36,7 @@ class EmailStatusResponse(BaseModel):
     sent_at: Optional[str]
     retry_count: int
     error_message: Optional[str]
+    next_attempt_at: Optional[str] = None
 
 @router.post("/send", response_model=EmailResponse)
 async def send_email(
@@ -72,7 +73,7 @@ async def process_email_queue(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     try:
-        stats = email_service.process_email_queue()
+        stats = await email_service.process_email_queue()
         return {
             "message": "Email queue processed",
             "stats": stats
@@ -85,8 +86,8 @@ async def get_email_status(
     email_id: str,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get status of a specific email"""
-    job = email_service.get_email_status(email_id)
+    """Get status of a specific email (memory first, then the outbox by primary key)"""
+    job = await email_service.find_email(email_id)
     if not job:
         raise HTTPException(status_code=404, detail="Email not found")
     
@@ -99,7 +100,8 @@ async def get_email_status(
         created_at=job.created_at.isoformat(),
         sent_at=job.sent_at.isoformat() if job.sent_at else None,
         retry_count=job.retry_count,
-        error_message=job.error_message
+        error_message=job.error_message,
+        next_attempt_at=job.next_attempt_at.isoformat() if job.next_attempt_at else None
     )
 
 @router.get("/queue/stats")
@@ -109,8 +111,8 @@ async def get_queue_stats(current_user: dict = Depends(get_current_user)):
     if current_user["role"] not in ["super_admin", "admin"]:
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
-    stats = email_service.get_queue_stats()
-    return {"queue_stats": stats}
+    stats = await email_service.queue_stats()
+    return {"queue_stats": stats, "retry_schedule": await email_service.retry_schedule()}
 
 @router.delete("/queue/clear")
 async def clear_old_emails(
@@ -123,7 +125,7 @@ async def clear_old_emails(
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     try:
-        cleared_count = email_service.clear_old_emails(days)
+        cleared_count = email_service.clear_old_emails(days) + await email_service.clear_old_outbox(days)
         return {
             "message": f"Cleared {cleared_count} old emails",
             "cleared_count": cleared_count
@@ -160,7 +162,7 @@ async def get_email_config_status(current_user: dict = Depends(get_current_user)
             len(email_service.password) == 16 and 
             email_service.password.replace(' ', '').isalnum()
         ),
-        "queue_stats": email_service.get_queue_stats(),
+        "queue_stats": await email_service.queue_stats(),
         "instructions": {
             "gmail_app_password": "For Gmail, you need to generate an App Password:",
             "steps": [
@@ -197,18 +199,11 @@ async def test_email_configuration(current_user: dict = Depends(get_current_user
             }
         )
         
-        # Try to process the email immediately
-        stats = email_service.process_email_queue()
-        
-        # Get the job status
-        job = email_service.get_email_status(email_id)
-        
+        # The dispatcher sends it right away; poll /api/email/status/{email_id} for the result
         return {
-            "message": "Test email queued and processed",
+            "message": "Test email queued",
             "email_id": email_id,
-            "status": job.status.value if job else "unknown",
-            "error": job.error_message if job and job.error_message else None,
-            "stats": stats
+            "status": "queued"
         }
         
     except Exception as e:
@@ -1,14 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.utils.database import get_db
+from app.utils.database import get_db, get_read_db
 from app.utils.mock_database import get_mock_db
+from app.utils.query_stats import query_budget
 from app.models.lead import Lead
-from app.schemas.lead import LeadCreate, LeadResponse, LeadUpdate
-from typing import List
+from app.models.user import User
+from app.utils.query_optimizer import QueryOptimizer, parse_fields, project_rows
+from app.utils.responses import json_response
+from app.utils.conditional import cache_headers, etag_matches, list_etag, make_etag, not_modified, with_validator_fields
+from app.utils.export import EXPORT_FETCH_SIZE, EXPORT_MEDIA_TYPES, stream_table_batches, encode_export
+from app.services.dashboard_stats import dashboard_stats
+from app.schemas.lead import LeadCreate, LeadResponse, LeadUpdate, LeadPage, LeadBulkError, LeadBulkResult
+from typing import Any, Dict, List, Optional, Tuple, Union
+import csv
+import io
+import logging
+import uuid
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
+# Columns served by the ORM-free read path, in response order
+LEAD_FIELDS = list(LeadResponse.model_fields)
+
+# Rows validated and loaded per COPY during bulk import
+BULK_CHUNK_SIZE = 1000
+
 @router.post("/", response_model=LeadResponse)
 async def create_lead(lead_data: LeadCreate, request: Request, db: AsyncSession = Depends(get_db)):
     """Create a new lead"""
@@ -31,6 +52,7 @@ async def create_lead(lead_data: LeadCreate, request: Request, db: AsyncSession
         db.add(new_lead)
         await db.commit()
         await db.refresh(new_lead)
+        await dashboard_stats.record_created("leads", [{"status": new_lead.status, "assigned_to": new_lead.assigned_to}])
         
         return LeadResponse(
             id=str(new_lead.id),
@@ -62,64 +84,277 @@ async def create_lead(lead_data: LeadCreate, request: Request, db: AsyncSession
         }
         
         new_lead = await mock_db.create_lead(lead_dict)
+        await dashboard_stats.record_created("leads", [new_lead])
         return LeadResponse(**new_lead)
 
-@router.get("/", response_model=List[LeadResponse])
-async def get_leads(request: Request, db: AsyncSession = Depends(get_db)):
-    """Get all leads"""
+def _parse_csv_rows(text: str) -> List[Dict[str, Any]]:
+    """Parse CSV text into row dicts, treating empty cells as missing"""
+    return [
+        {key: (value.strip() or None) if isinstance(value, str) else value for key, value in row.items() if key}
+        for row in csv.DictReader(io.StringIO(text))
+    ]
+
+async def _read_bulk_rows(request: Request) -> List[Any]:
+    """Read lead rows from a JSON array body, a text/csv body or a CSV file upload"""
+    content_type = request.headers.get("content-type", "")
+    
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Expected a CSV file in the 'file' field"
+                )
+            return _parse_csv_rows((await upload.read()).decode("utf-8-sig"))
+        
+        if content_type.startswith("text/csv"):
+            return _parse_csv_rows((await request.body()).decode("utf-8-sig"))
+        
+        rows = await request.json()
+    except (ValueError, csv.Error) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not parse upload: {e}"
+        )
+    
+    if not isinstance(rows, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Expected a JSON array of leads"
+        )
+    return rows
+
+def _validate_lead_chunk(chunk: List[Any], first_row: int, errors: List[LeadBulkError]) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """Validate a chunk of raw rows, collecting per-row errors"""
+    records, row_numbers = [], []
+    
+    for row_number, row in enumerate(chunk, start=first_row):
+        if not isinstance(row, dict):
+            errors.append(LeadBulkError(row=row_number, errors=["Row must be an object"]))
+            continue
+        
+        try:
+            lead_data = LeadCreate.model_validate(row)
+        except ValidationError as e:
+            errors.append(LeadBulkError(
+                row=row_number,
+                errors=[f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()]
+            ))
+            continue
+        
+        records.append({
+            "first_name": lead_data.first_name,
+            "last_name": lead_data.last_name,
+            "email": lead_data.email,
+            "phone": lead_data.phone,
+            "company": lead_data.company,
+            "source": lead_data.source,
+            "status": lead_data.status or "new",
+            "assigned_to": lead_data.assigned_to,
+            "created_by": lead_data.created_by
+        })
+        row_numbers.append(row_number)
+    
+    return records, row_numbers
+
+async def _resolve_lead_users(
+    db: AsyncSession,
+    records: List[Dict[str, Any]],
+    row_numbers: List[int],
+    errors: List[LeadBulkError]
+) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """Check user references for a chunk with one query and prepare rows for COPY"""
+    parsed = []
+    for record, row_number in zip(records, row_numbers):
+        try:
+            created_by = uuid.UUID(record["created_by"])
+            assigned_to = uuid.UUID(record["assigned_to"]) if record["assigned_to"] else None
+        except ValueError:
+            errors.append(LeadBulkError(row=row_number, errors=["created_by/assigned_to must be user UUIDs"]))
+            continue
+        parsed.append((record, row_number, created_by, assigned_to))
+    
+    user_ids = {created_by for _, _, created_by, _ in parsed} | {assigned_to for _, _, _, assigned_to in parsed if assigned_to}
+    known_ids = set()
+    if user_ids:
+        result = await db.execute(select(User.id).where(User.id.in_(user_ids)))
+        known_ids = set(result.scalars().all())
+    
+    resolved, resolved_rows = [], []
+    for record, row_number, created_by, assigned_to in parsed:
+        missing = [uid for uid in (created_by, assigned_to) if uid and uid not in known_ids]
+        if missing:
+            errors.append(LeadBulkError(row=row_number, errors=[f"Unknown user: {uid}" for uid in missing]))
+            continue
+        
+        resolved.append({**record, "id": uuid.uuid4(), "created_by": created_by, "assigned_to": assigned_to})
+        resolved_rows.append(row_number)
+    
+    return resolved, resolved_rows
+
+@router.post("/bulk", response_model=LeadBulkResult)
+async def bulk_create_leads(request: Request, db: AsyncSession = Depends(get_db)):
+    """Import leads from a JSON array or CSV upload.
+    
+    Rows are validated and loaded with COPY in chunks; invalid rows are
+    reported by their 1-based position and skipped without aborting the rest.
+    """
     use_real_db = getattr(request.app.state, 'use_real_db', False)
+    rows = await _read_bulk_rows(request)
+    
+    created = 0
+    created_records: List[Dict[str, Any]] = []
+    errors: List[LeadBulkError] = []
+    
+    for offset in range(0, len(rows), BULK_CHUNK_SIZE):
+        records, row_numbers = _validate_lead_chunk(rows[offset:offset + BULK_CHUNK_SIZE], offset + 1, errors)
+        if not records:
+            continue
+        
+        if use_real_db:
+            records, row_numbers = await _resolve_lead_users(db, records, row_numbers, errors)
+            if not records:
+                continue
+            
+            try:
+                # Savepoint per chunk so a rejected chunk leaves earlier ones intact
+                async with db.begin_nested():
+                    created += await QueryOptimizer.bulk_copy_records(db, Lead, records)
+                created_records.extend(records)
+            except Exception as e:
+                # Driver messages name tables, constraints and SQL; keep them in the server log
+                logger.warning(f"Bulk lead import rejected rows {row_numbers[0]}-{row_numbers[-1]}: {e}")
+                errors.extend(
+                    LeadBulkError(row=row_number, errors=["Rejected by the database; no rows from this chunk were imported"])
+                    for row_number in row_numbers
+                )
+        else:
+            mock_db = await get_mock_db()
+            created += await mock_db.bulk_create_leads(records)
+            created_records.extend(records)
+    
+    if use_real_db:
+        await db.commit()
+    await dashboard_stats.record_created("leads", created_records)
+    
+    errors.sort(key=lambda error: error.row)
+    return LeadBulkResult(
+        received=len(rows),
+        created=created,
+        failed=len(rows) - created,
+        errors=errors
+    )
+
+@router.get("/", response_model=Union[LeadPage, List[LeadResponse]])
+@query_budget(2)
+async def get_leads(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get all leads, or one keyset page when limit/cursor is given.
+    
+    ?fields=a,b selects only those columns and returns trimmed objects.
+    """
+    use_real_db = getattr(request.app.state, 'use_real_db', False)
+    
+    try:
+        field_list = parse_fields(fields, LeadResponse.model_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if limit is not None or cursor is not None:
+        try:
+            if use_real_db:
+                page = await QueryOptimizer.execute_with_keyset_pagination(
+                    db, select(Lead), Lead, limit=limit or 20, cursor=cursor, fields=with_validator_fields(field_list or LEAD_FIELDS)
+                )
+            else:
+                mock_db = await get_mock_db()
+                page = await mock_db.get_leads_page(limit or 20, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        
+        # Conditional GET: the ETag is built from the rows being returned, before any serialization
+        etag = list_etag(request, "leads", page["items"])
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        headers = cache_headers(etag)
+        response.headers.update(headers)
+        
+        if field_list:
+            items = project_rows(page["items"], field_list)
+            return json_response({"items": items, "next_cursor": page["next_cursor"]}, headers=headers)
+        if use_real_db:
+            return json_response({"items": page["items"], "next_cursor": page["next_cursor"]}, headers=headers)
+        return LeadPage(items=[LeadResponse(**lead) for lead in page["items"]], next_cursor=page["next_cursor"])
+    
+    if use_real_db:
+        rows = await QueryOptimizer.execute_projected(db, select(Lead), Lead, with_validator_fields(field_list or LEAD_FIELDS))
+    else:
+        mock_db = await get_mock_db()
+        rows = await mock_db.get_all_leads()
+    
+    etag = list_etag(request, "leads", rows)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    headers = cache_headers(etag)
+    response.headers.update(headers)
+    
+    if field_list:
+        return json_response(project_rows(rows, field_list), headers=headers)
+    if use_real_db:
+        return json_response(rows, headers=headers)
+    return [LeadResponse(**lead) for lead in rows]
+
+@router.get("/export")
+async def export_leads(
+    request: Request,
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$")
+):
+    """Stream every lead as NDJSON or CSV using a server-side cursor"""
+    use_real_db = getattr(request.app.state, 'use_real_db', False)
+    columns = list(Lead.__table__.columns.keys())
     
     if use_real_db:
-        result = await db.execute(select(Lead))
-        leads = result.scalars().all()
-        return [LeadResponse(
-            id=str(lead.id),
-            first_name=lead.first_name,
-            last_name=lead.last_name,
-            email=lead.email,
-            phone=lead.phone,
-            company=lead.company,
-            source=lead.source,
-            status=lead.status,
-            assigned_to=str(lead.assigned_to) if lead.assigned_to else None,
-            created_by=str(lead.created_by),
-            created_at=lead.created_at,
-            updated_at=lead.updated_at
-        ) for lead in leads]
+        batches = stream_table_batches(Lead.__table__)
     else:
         mock_db = await get_mock_db()
-        leads = await mock_db.get_all_leads()
-        return [LeadResponse(**lead) for lead in leads]
+        batches = mock_db.iter_lead_batches(EXPORT_FETCH_SIZE)
+    
+    return StreamingResponse(
+        encode_export(batches, columns, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f"attachment; filename=leads.{export_format}"}
+    )
 
 @router.get("/{lead_id}", response_model=LeadResponse)
-async def get_lead(lead_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+@query_budget(1)
+async def get_lead(lead_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
     """Get lead by ID"""
     use_real_db = getattr(request.app.state, 'use_real_db', False)
     
     if use_real_db:
-        result = await db.execute(select(Lead).where(Lead.id == lead_id))
-        lead = result.scalar_one_or_none()
+        rows = await QueryOptimizer.execute_projected(
+            db, select(Lead).where(Lead.id == lead_id), Lead, LEAD_FIELDS
+        )
         
-        if not lead:
+        if not rows:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Lead not found"
             )
         
-        return LeadResponse(
-            id=str(lead.id),
-            first_name=lead.first_name,
-            last_name=lead.last_name,
-            email=lead.email,
-            phone=lead.phone,
-            company=lead.company,
-            source=lead.source,
-            status=lead.status,
-            assigned_to=str(lead.assigned_to) if lead.assigned_to else None,
-            created_by=str(lead.created_by),
-            created_at=lead.created_at,
-            updated_at=lead.updated_at
-        )
+        etag = make_etag("lead", lead_id, rows[0]["updated_at"])
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        
+        return json_response(rows[0], headers=cache_headers(etag))
     else:
         mock_db = await get_mock_db()
         lead = await mock_db.get_lead_by_id(lead_id)
@@ -130,4 +365,9 @@ async def get_lead(lead_id: str, request: Request, db: AsyncSession = Depends(ge
                 detail="Lead not found"
             )
         
+        etag = make_etag("lead", lead_id, lead["updated_at"])
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers.update(cache_headers(etag))
+        
         return LeadResponse(**lead)
\ No newline at end of file
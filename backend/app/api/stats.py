@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Depends
+from app.schemas.stats import StatsSummary
+from app.services.dashboard_stats import dashboard_stats
+from app.utils.current_user import get_current_user
+
+router = APIRouter()
+
+@router.get("/summary", response_model=StatsSummary)
+async def get_stats_summary(current_user: dict = Depends(get_current_user)):
+    """Lead counts by status/assignee and task counts by status/priority for the dashboards"""
+    return await dashboard_stats.summary()
@@ -1,21 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.utils.database import get_db
+from app.utils.database import get_db, get_read_db
 from app.utils.mock_database import get_mock_db
+from app.utils.query_stats import query_budget
 from app.models.task import Task
-from app.models.user import User
-from app.schemas.task import TaskCreate, TaskResponse, TaskUpdate
+from app.schemas.task import TaskCreate, TaskResponse, TaskUpdate, TaskPage
 from app.services.email_service import email_service
-from typing import List
+from app.services.user_directory import user_directory
+from app.services.dashboard_stats import dashboard_stats
+from app.utils.query_optimizer import QueryOptimizer, parse_fields, project_rows
+from app.utils.responses import json_response
+from app.utils.conditional import cache_headers, etag_matches, list_etag, make_etag, not_modified, with_validator_fields
+from app.utils.export import EXPORT_FETCH_SIZE, EXPORT_MEDIA_TYPES, stream_table_batches, encode_export
+from typing import Dict, List, Optional, Union
+import uuid
 
 router = APIRouter()
 
+# Columns served by the ORM-free read path, in response order
+TASK_FIELDS = list(TaskResponse.model_fields)
+
+# Upper bound on tasks accepted by one bulk request
+BULK_MAX_TASKS = 1000
+
+def queue_assignment_emails(tasks_by_assignee: Dict[str, List[Dict]], assignees: Dict, session: Optional[AsyncSession] = None):
+    """Queue one notification per assignee; with a session they join its transaction"""
+    for assignee_id, assigned_tasks in tasks_by_assignee.items():
+        assignee = assignees.get(assignee_id)
+        if not assignee:
+            continue
+        try:
+            email_id = email_service.send_task_assignment_batch(
+                to_email=assignee.email,
+                assignee_name=assignee.full_name,
+                tasks=assigned_tasks,
+                session=session
+            )
+            print(f"Task assignment email queued: {email_id}")
+        except Exception as e:
+            print(f"Failed to queue task assignment email: {e}")
+
+def assignment_email_data(task_data: TaskCreate) -> Dict:
+    return {
+        "task_title": task_data.title,
+        "task_description": task_data.description or "",
+        "due_date": task_data.due_date.strftime("%Y-%m-%d") if task_data.due_date else None,
+        "priority": task_data.priority or "Medium"
+    }
+
 @router.post("/", response_model=TaskResponse)
 async def create_task(task_data: TaskCreate, request: Request, db: AsyncSession = Depends(get_db)):
     """Create a new task and send notification email"""
     use_real_db = getattr(request.app.state, 'use_real_db', False)
     
+    # Get assignee details for email from the user directory
+    assignees = await user_directory.resolve([task_data.assigned_to])
+    tasks_by_assignee = {str(task_data.assigned_to): [assignment_email_data(task_data)]}
+    
     if use_real_db:
         # Real database logic
         new_task = Task(
@@ -29,13 +72,11 @@ async def create_task(task_data: TaskCreate, request: Request, db: AsyncSession
         )
         
         db.add(new_task)
+        # The notification is written to the outbox in the same transaction as the task
+        queue_assignment_emails(tasks_by_assignee, assignees, session=db)
         await db.commit()
         await db.refresh(new_task)
         
-        # Get assignee details for email
-        assignee_result = await db.execute(select(User).where(User.id == task_data.assigned_to))
-        assignee = assignee_result.scalar_one_or_none()
-        
         task_response = TaskResponse(
             id=str(new_task.id),
             title=new_task.title,
@@ -64,82 +105,213 @@ async def create_task(task_data: TaskCreate, request: Request, db: AsyncSession
         
         new_task = await mock_db.create_task(task_dict)
         
-        # Get assignee details for email
-        assignee = await mock_db.get_user_by_id(task_data.assigned_to)
-        
         task_response = TaskResponse(**new_task)
+        
+        # Queue email notification to assignee
+        queue_assignment_emails(tasks_by_assignee, assignees)
     
-    # Queue email notification to assignee
-    if assignee:
-        try:
-            email_id = email_service.send_task_assignment(
-                to_email=assignee.email if use_real_db else assignee["email"],
-                assignee_name=assignee.full_name if use_real_db else assignee["full_name"],
-                task_title=task_data.title,
-                task_description=task_data.description or "",
-                due_date=task_data.due_date.strftime("%Y-%m-%d") if task_data.due_date else None,
-                priority=task_data.priority or "Medium"
-            )
-            print(f"Task assignment email queued: {email_id}")
-        except Exception as e:
-            print(f"Failed to queue task assignment email: {e}")
+    await dashboard_stats.record_created("tasks", [{"status": task_response.status, "priority": task_response.priority}])
     
     return task_response
 
-@router.get("/", response_model=List[TaskResponse])
-async def get_tasks(request: Request, db: AsyncSession = Depends(get_db)):
-    """Get all tasks"""
+@router.post("/bulk", response_model=List[TaskResponse])
+async def bulk_create_tasks(tasks_data: List[TaskCreate], request: Request, db: AsyncSession = Depends(get_db)):
+    """Create many tasks in one statement and send one notification per assignee"""
     use_real_db = getattr(request.app.state, 'use_real_db', False)
     
+    if not tasks_data:
+        return []
+    if len(tasks_data) > BULK_MAX_TASKS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BULK_MAX_TASKS} tasks can be created per request"
+        )
+    
+    # User ids must be UUIDs; one bad value would otherwise fail the whole INSERT
+    row_errors = []
+    for row_number, task_data in enumerate(tasks_data, start=1):
+        errors = []
+        for field in ("assigned_to", "assigned_by"):
+            try:
+                setattr(task_data, field, str(uuid.UUID(getattr(task_data, field))))
+            except ValueError:
+                errors.append(f"{field} must be a user UUID")
+        if errors:
+            row_errors.append({"row": row_number, "errors": errors})
+    if row_errors:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=row_errors
+        )
+    
+    user_fields = ("assigned_to", "assigned_by")
+    user_ids = list(dict.fromkeys(getattr(task_data, field) for task_data in tasks_data for field in user_fields))
+    
+    # Resolve assignees and creators from the user directory (one IN query for any it lacks);
+    # an unknown id would otherwise fail the foreign key and the whole INSERT with it
+    users = await user_directory.resolve(user_ids)
+    
+    for row_number, task_data in enumerate(tasks_data, start=1):
+        errors = [f"{field} is not a known user" for field in user_fields if getattr(task_data, field) not in users]
+        if errors:
+            row_errors.append({"row": row_number, "errors": errors})
+    if row_errors:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=row_errors
+        )
+    
+    assignees = {task_data.assigned_to: users[task_data.assigned_to] for task_data in tasks_data}
+    
+    # Collapse each assignee's tasks into a single notification email
+    tasks_by_assignee: Dict[str, List[Dict]] = {}
+    for task_data in tasks_data:
+        tasks_by_assignee.setdefault(task_data.assigned_to, []).append(assignment_email_data(task_data))
+    
     if use_real_db:
-        result = await db.execute(select(Task))
-        tasks = result.scalars().all()
-        return [TaskResponse(
-            id=str(task.id),
-            title=task.title,
-            description=task.description,
-            assigned_to=str(task.assigned_to),
-            assigned_by=str(task.assigned_by),
-            status=task.status,
-            priority=task.priority,
-            due_date=task.due_date,
-            completed_at=task.completed_at,
-            created_at=task.created_at,
-            updated_at=task.updated_at
-        ) for task in tasks]
+        # One multi-row INSERT ... RETURNING for the whole batch
+        result = await db.execute(
+            Task.__table__.insert().returning(*[Task.__table__.c[field] for field in TASK_FIELDS]),
+            [{
+                "title": task_data.title,
+                "description": task_data.description,
+                "assigned_to": task_data.assigned_to,
+                "assigned_by": task_data.assigned_by,
+                "status": task_data.status or "pending",
+                "priority": task_data.priority or "medium",
+                "due_date": task_data.due_date
+            } for task_data in tasks_data]
+        )
+        rows = [dict(row) for row in result.mappings()]
+        queue_assignment_emails(tasks_by_assignee, assignees, session=db)
+        await db.commit()
+        await dashboard_stats.record_created("tasks", rows)
+        response = json_response(rows)
     else:
         mock_db = await get_mock_db()
-        tasks = await mock_db.get_all_tasks()
-        return [TaskResponse(**task) for task in tasks]
+        new_tasks = await mock_db.bulk_create_tasks([{
+            "title": task_data.title,
+            "description": task_data.description,
+            "assigned_to": task_data.assigned_to,
+            "assigned_by": task_data.assigned_by,
+            "status": task_data.status or "pending",
+            "priority": task_data.priority or "medium",
+            "due_date": task_data.due_date.isoformat() if task_data.due_date else None
+        } for task_data in tasks_data])
+        await dashboard_stats.record_created("tasks", new_tasks)
+        response = [TaskResponse(**task) for task in new_tasks]
+        queue_assignment_emails(tasks_by_assignee, assignees)
+    
+    return response
+
+@router.get("/", response_model=Union[TaskPage, List[TaskResponse]])
+@query_budget(2)
+async def get_tasks(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get all tasks, or one keyset page when limit/cursor is given.
+    
+    ?fields=a,b selects only those columns and returns trimmed objects.
+    """
+    use_real_db = getattr(request.app.state, 'use_real_db', False)
+    
+    try:
+        field_list = parse_fields(fields, TaskResponse.model_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if limit is not None or cursor is not None:
+        try:
+            if use_real_db:
+                page = await QueryOptimizer.execute_with_keyset_pagination(
+                    db, select(Task), Task, limit=limit or 20, cursor=cursor, fields=with_validator_fields(field_list or TASK_FIELDS)
+                )
+            else:
+                mock_db = await get_mock_db()
+                page = await mock_db.get_tasks_page(limit or 20, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        
+        # Conditional GET: the ETag is built from the rows being returned, before any serialization
+        etag = list_etag(request, "tasks", page["items"])
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        headers = cache_headers(etag)
+        response.headers.update(headers)
+        
+        if field_list:
+            items = project_rows(page["items"], field_list)
+            return json_response({"items": items, "next_cursor": page["next_cursor"]}, headers=headers)
+        if use_real_db:
+            return json_response({"items": page["items"], "next_cursor": page["next_cursor"]}, headers=headers)
+        return TaskPage(items=[TaskResponse(**task) for task in page["items"]], next_cursor=page["next_cursor"])
+    
+    if use_real_db:
+        rows = await QueryOptimizer.execute_projected(db, select(Task), Task, with_validator_fields(field_list or TASK_FIELDS))
+    else:
+        mock_db = await get_mock_db()
+        rows = await mock_db.get_all_tasks()
+    
+    etag = list_etag(request, "tasks", rows)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    headers = cache_headers(etag)
+    response.headers.update(headers)
+    
+    if field_list:
+        return json_response(project_rows(rows, field_list), headers=headers)
+    if use_real_db:
+        return json_response(rows, headers=headers)
+    return [TaskResponse(**task) for task in rows]
+
+@router.get("/export")
+async def export_tasks(
+    request: Request,
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$")
+):
+    """Stream every task as NDJSON or CSV using a server-side cursor"""
+    use_real_db = getattr(request.app.state, 'use_real_db', False)
+    columns = list(Task.__table__.columns.keys())
+    
+    if use_real_db:
+        batches = stream_table_batches(Task.__table__)
+    else:
+        mock_db = await get_mock_db()
+        batches = mock_db.iter_task_batches(EXPORT_FETCH_SIZE)
+    
+    return StreamingResponse(
+        encode_export(batches, columns, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f"attachment; filename=tasks.{export_format}"}
+    )
 
 @router.get("/{task_id}", response_model=TaskResponse)
-async def get_task(task_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+@query_budget(1)
+async def get_task(task_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
     """Get task by ID"""
     use_real_db = getattr(request.app.state, 'use_real_db', False)
     
     if use_real_db:
-        result = await db.execute(select(Task).where(Task.id == task_id))
-        task = result.scalar_one_or_none()
+        rows = await QueryOptimizer.execute_projected(
+            db, select(Task).where(Task.id == task_id), Task, TASK_FIELDS
+        )
         
-        if not task:
+        if not rows:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Task not found"
             )
         
-        return TaskResponse(
-            id=str(task.id),
-            title=task.title,
-            description=task.description,
-            assigned_to=str(task.assigned_to),
-            assigned_by=str(task.assigned_by),
-            status=task.status,
-            priority=task.priority,
-            due_date=task.due_date,
-            completed_at=task.completed_at,
-            created_at=task.created_at,
-            updated_at=task.updated_at
-        )
+        etag = make_etag("task", task_id, rows[0]["updated_at"])
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        
+        return json_response(rows[0], headers=cache_headers(etag))
     else:
         mock_db = await get_mock_db()
         task = await mock_db.get_task_by_id(task_id)
@@ -150,6 +322,11 @@ async def get_task(task_id: str, request: Request, db: AsyncSession = Depends(ge
                 detail="Task not found"
             )
         
+        etag = make_etag("task", task_id, task["updated_at"])
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers.update(cache_headers(etag))
+        
         return TaskResponse(**task)
 
 @router.put("/{task_id}", response_model=TaskResponse)
@@ -167,6 +344,8 @@ async def update_task(task_id: str, task_update: TaskUpdate, request: Request, d
                 detail="Task not found"
             )
         
+        before = {"status": task.status, "priority": task.priority}
+        
         # Update fields
         if task_update.title is not None:
             task.title = task_update.title
@@ -184,6 +363,7 @@ async def update_task(task_id: str, task_update: TaskUpdate, request: Request, d
         
         await db.commit()
         await db.refresh(task)
+        await dashboard_stats.record_updated("tasks", before, {"status": task.status, "priority": task.priority})
         
         return TaskResponse(
             id=str(task.id),
@@ -200,6 +380,8 @@ async def update_task(task_id: str, task_update: TaskUpdate, request: Request, d
         )
     else:
         mock_db = await get_mock_db()
+        existing = await mock_db.get_task_by_id(task_id)
+        before = {"status": existing["status"], "priority": existing["priority"]} if existing else None
         task = await mock_db.update_task(task_id, task_update.dict(exclude_unset=True))
         
         if not task:
@@ -208,4 +390,5 @@ async def update_task(task_id: str, task_update: TaskUpdate, request: Request, d
                 detail="Task not found"
             )
         
+        await dashboard_stats.record_updated("tasks", before, task)
         return TaskResponse(**task)
\ No newline at end of file
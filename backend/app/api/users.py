@@ -1,16 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.utils.database import get_db
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from app.utils.database import get_db, get_read_db
 from app.utils.mock_database import get_mock_db
+from app.utils.query_stats import query_budget
 from app.models.user import User
-from app.schemas.user import UserCreate, UserResponse, UserCredentials
-from app.services.auth_service import get_password_hash, generate_unique_username, generate_secure_password
+from app.schemas.user import UserCreate, UserResponse, UserCredentials, UserPage
+from app.services.auth_service import PasswordHasherBusy, get_password_hash_async, generate_username_candidates, generate_secure_password
 from app.services.email_service import email_service
-from typing import List
+from app.services.user_cache import user_cache
+from app.services.user_directory import user_directory
+from app.utils.query_optimizer import QueryOptimizer, parse_fields, project_rows
+from app.utils.responses import json_response
+from app.utils.conditional import cache_headers, etag_matches, list_etag, make_etag, not_modified, with_validator_fields
+from typing import Any, Dict, List, Optional, Union
 
 router = APIRouter()
 
+# Candidate usernames tried per new user before giving up
+USERNAME_ATTEMPTS = 5
+
+# Unique constraint / index on users.email: named by Postgres for the setup SQL, by SQLAlchemy for create_all
+USER_EMAIL_CONSTRAINTS = frozenset({"users_email_key", "ix_users_email"})
+
+def violated_constraint(error: IntegrityError) -> Optional[str]:
+    """Constraint name reported by asyncpg, which SQLAlchemy's adapted error wraps"""
+    for candidate in (error.orig, getattr(error.orig, "__cause__", None)):
+        name = getattr(candidate, "constraint_name", None)
+        if name:
+            return name
+    return None
+
+def insert_user_statement(values: Dict[str, Any]):
+    """INSERT ... ON CONFLICT (username) DO NOTHING RETURNING the directory columns"""
+    return (
+        pg_insert(User)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=[User.username])
+        .returning(User.id, User.email, User.full_name, User.role, User.is_active)
+    )
+
+def queue_credentials_email(user_data: UserCreate, username: str, password: str, session: Optional[AsyncSession] = None):
+    """Queue the new user's credentials email; returns (email_id, error)"""
+    try:
+        email_id = email_service.send_user_credentials(
+            to_email=user_data.email,
+            full_name=user_data.full_name,
+            username=username,
+            password=password,
+            role=user_data.role.value,
+            session=session
+        )
+        print(f"User credentials email queued: {email_id}")
+        return email_id, None
+    except Exception as e:
+        print(f"Email queueing failed: {e}")
+        return None, str(e)
+
 @router.post("/", response_model=UserCredentials)
 async def create_user(user_data: UserCreate, request: Request, db: AsyncSession = Depends(get_db)):
     """Create a new user with auto-generated username and password"""
@@ -18,41 +66,57 @@ async def create_user(user_data: UserCreate, request: Request, db: AsyncSession
     # Check if using real or mock database
     use_real_db = getattr(request.app.state, 'use_real_db', False)
     
+    # Candidate usernames are tried in order; the password is hashed once up front
+    candidates = generate_username_candidates(user_data.full_name, USERNAME_ATTEMPTS)
+    password = generate_secure_password()
+    try:
+        password_hash = await get_password_hash_async(password)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many password operations in progress, please retry",
+            headers={"Retry-After": "1"}
+        )
+    
     if use_real_db:
-        # Real database logic
-        result = await db.execute(select(User).where(User.email == user_data.email))
-        if result.scalar_one_or_none():
+        # Real database logic: one INSERT per attempt, which usually succeeds first time.
+        # The username unique index absorbs collisions; an email collision raises.
+        new_user = None
+        try:
+            for username in candidates:
+                result = await db.execute(insert_user_statement({
+                    "username": username,
+                    "email": user_data.email,
+                    "password_hash": password_hash,
+                    "full_name": user_data.full_name,
+                    "role": user_data.role.value,
+                    "is_active": True
+                }))
+                new_user = result.mappings().first()
+                if new_user:
+                    break
+        except IntegrityError as e:
+            await db.rollback()
+            if violated_constraint(e) in USER_EMAIL_CONSTRAINTS:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Email already registered"
+                )
+            raise
+        
+        if not new_user:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Could not allocate a unique username, please retry"
             )
         
-        # Generate unique username and secure password
-        username = generate_unique_username(user_data.full_name)
-        password = generate_secure_password()
-        
-        # Ensure username is unique
-        while True:
-            result = await db.execute(select(User).where(User.username == username))
-            if not result.scalar_one_or_none():
-                break
-            username = generate_unique_username(user_data.full_name)
-        
-        # Create new user
-        new_user = User(
-            username=username,
-            email=user_data.email,
-            password_hash=get_password_hash(password),
-            full_name=user_data.full_name,
-            role=user_data.role.value,
-            is_active=True
-        )
-        
-        db.add(new_user)
+        # The email goes to the outbox in the same transaction as the user row
+        email_id, email_error = queue_credentials_email(user_data, username, password, session=db)
         await db.commit()
-        await db.refresh(new_user)
+        user_cache.invalidate(str(new_user["id"]))
+        user_directory.upsert(new_user)
     else:
-        # Mock database logic
+        # Mock database logic: indexed lookups, no scans
         mock_db = await get_mock_db()
         
         # Check if email already exists
@@ -63,58 +127,35 @@ async def create_user(user_data: UserCreate, request: Request, db: AsyncSession
                 detail="Email already registered"
             )
         
-        # Generate unique username and secure password
-        username = generate_unique_username(user_data.full_name)
-        password = generate_secure_password()
-        
-        # Ensure username is unique
-        while True:
-            existing_user = await mock_db.get_user_by_username(username)
-            if not existing_user:
+        username = None
+        for candidate in candidates:
+            if not await mock_db.get_user_by_username(candidate):
+                username = candidate
                 break
-            username = generate_unique_username(user_data.full_name)
+        
+        if username is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Could not allocate a unique username, please retry"
+            )
         
         # Create new user in mock database
-        await mock_db.create_user({
+        new_user = await mock_db.create_user({
             "username": username,
             "email": user_data.email,
-            "password_hash": get_password_hash(password),
+            "password_hash": password_hash,
             "full_name": user_data.full_name,
             "role": user_data.role.value,
             "is_active": True
         })
-    
-    # Queue credentials email for sending
-    email_status = "not_sent"
-    email_error = None
-    
-    try:
-        email_id = email_service.send_user_credentials(
-            to_email=user_data.email,
-            full_name=user_data.full_name,
-            username=username,
-            password=password,
-            role=user_data.role.value
-        )
-        print(f"User credentials email queued: {email_id}")
-        
-        # Try to process the email immediately
-        stats = email_service.process_email_queue()
-        
-        # Check if email was sent
-        job = email_service.get_email_status(email_id)
-        if job:
-            if job.status.value == "sent":
-                email_status = "sent"
-            elif job.status.value == "failed":
-                email_status = "failed"
-                email_error = job.error_message
-            else:
-                email_status = "queued"
+        user_cache.invalidate(new_user["id"])
+        user_directory.upsert(new_user)
         
-    except Exception as e:
-        email_error = str(e)
-        print(f"Email queueing failed: {e}")
+        # Queue credentials email for sending
+        email_id, email_error = queue_credentials_email(user_data, username, password)
+    
+    # The email dispatcher sends it in the background; track it via /api/email/status/{email_id}
+    email_status = "queued" if email_id else "not_sent"
     
     # Return credentials for popup display with email status
     credentials = UserCredentials(
@@ -128,25 +169,88 @@ async def create_user(user_data: UserCreate, request: Request, db: AsyncSession
     # Add email status info (this will be shown in the response)
     credentials.email_status = email_status
     credentials.email_error = email_error
+    credentials.email_id = email_id
     
     return credentials
 
-@router.get("/", response_model=List[UserResponse])
-async def get_users(request: Request, db: AsyncSession = Depends(get_db)):
-    """Get all users"""
+@router.get("/", response_model=Union[UserPage, List[UserResponse]])
+@query_budget(2)
+async def get_users(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get all users, or one keyset page when limit/cursor is given.
+    
+    ?fields=a,b selects only those columns and returns trimmed objects.
+    """
     use_real_db = getattr(request.app.state, 'use_real_db', False)
     
+    try:
+        field_list = parse_fields(fields, UserResponse.model_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if limit is not None or cursor is not None:
+        try:
+            if use_real_db:
+                page = await QueryOptimizer.execute_with_keyset_pagination(
+                    db, select(User).where(User.is_active == True), User, limit=limit or 20, cursor=cursor,
+                    fields=with_validator_fields(field_list) if field_list else None
+                )
+            else:
+                mock_db = await get_mock_db()
+                page = await mock_db.get_users_page(limit or 20, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        
+        # Conditional GET: the ETag is built from the rows being returned, before any serialization
+        etag = list_etag(request, "users", page["items"])
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        headers = cache_headers(etag)
+        response.headers.update(headers)
+        
+        if field_list:
+            items = project_rows(page["items"], field_list)
+            return json_response({"items": items, "next_cursor": page["next_cursor"]}, headers=headers)
+        
+        if use_real_db:
+            items = [UserResponse.model_validate(user) for user in page["items"]]
+        else:
+            items = [UserResponse(**user) for user in page["items"]]
+        return UserPage(items=items, next_cursor=page["next_cursor"])
+    
     if use_real_db:
-        result = await db.execute(select(User).where(User.is_active == True))
-        users = result.scalars().all()
-        return users
+        if field_list:
+            users = await QueryOptimizer.execute_projected(
+                db, select(User).where(User.is_active == True), User, with_validator_fields(field_list)
+            )
+        else:
+            result = await db.execute(select(User).where(User.is_active == True))
+            users = result.scalars().all()
     else:
         mock_db = await get_mock_db()
         users = await mock_db.get_all_users()
-        return [UserResponse(**user) for user in users]
+    
+    etag = list_etag(request, "users", users)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    headers = cache_headers(etag)
+    response.headers.update(headers)
+    
+    if field_list:
+        return json_response(project_rows(users, field_list), headers=headers)
+    if use_real_db:
+        return users
+    return [UserResponse(**user) for user in users]
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+@query_budget(1)
+async def get_user(user_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
     """Get user by ID"""
     use_real_db = getattr(request.app.state, 'use_real_db', False)
     
@@ -159,6 +263,11 @@ async def get_user(user_id: str, request: Request, db: AsyncSession = Depends(ge
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
+        
+        etag = make_etag("user", user_id, user.updated_at)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers.update(cache_headers(etag))
         return user
     else:
         mock_db = await get_mock_db()
@@ -169,4 +278,9 @@ async def get_user(user_id: str, request: Request, db: AsyncSession = Depends(ge
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
+        
+        etag = make_etag("user", user_id, user["updated_at"])
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers.update(cache_headers(etag))
         return UserResponse(**user)
\ No newline at end of file
@@ -5,13 +5,30 @@ from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import FileResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
-from starlette.responses import Response
-from app.api import auth, users, leads, tasks, email
-from app.utils.database import AsyncSessionLocal
+from starlette.responses import Response, PlainTextResponse
+from app.api import auth, users, leads, tasks, email, admin, stats
+from app.utils.database import AsyncSessionLocal, engine, read_engine, get_replica_lag
+from app.utils.metrics import metrics
+from app.utils.query_optimizer import ConnectionPoolMonitor
+from app.utils.conditional import REVALIDATE_CACHE_CONTROL
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.query_stats import QueryStatsMiddleware
+from app.services.email_service import email_service
 # Rate limiting and validation middleware (simplified for demo)
 # from app.middleware.rate_limit import RateLimitMiddleware
 # from app.middleware.validation import InputValidationMiddleware
 
+# Responses on these routes carry tokens, credentials or admin data
+NO_STORE_PREFIXES = ("/api/auth/", "/api/admin/", "/api/email/")
+
+def is_sensitive_route(request: Request) -> bool:
+    """Whether a response must never be written to any cache"""
+    path = request.url.path
+    if path.startswith(NO_STORE_PREFIXES):
+        return True
+    # Creating a user returns the generated password
+    return path.startswith("/api/users") and request.method != "GET"
+
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         response = await call_next(request)
@@ -41,9 +58,15 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
             "gyroscope=(), "
             "speaker=()"
         )
-        response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, proxy-revalidate"
-        response.headers["Pragma"] = "no-cache"
-        response.headers["Expires"] = "0"
+        
+        # Per-route cache policy: tokens and credentials are never stored;
+        # everything else may be kept privately and revalidated via ETag
+        if is_sensitive_route(request):
+            response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, proxy-revalidate"
+            response.headers["Pragma"] = "no-cache"
+            response.headers["Expires"] = "0"
+        elif "Cache-Control" not in response.headers:
+            response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
         
         return response
 
@@ -74,12 +97,46 @@ app.add_middleware(TrustedHostMiddleware, allowed_hosts=["localhost", "127.0.0.1
 # Compression middleware
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
+# Per-request SQL query counting (Server-Timing header and query budgets)
+app.add_middleware(QueryStatsMiddleware)
+
+# Metrics middleware - added last so it times the whole stack
+app.add_middleware(MetricsMiddleware)
+
+DB_POOL_SIZE = metrics.gauge("crm_db_pool_size", "Connections kept in the pool", ("pool",))
+DB_POOL_CHECKED_OUT = metrics.gauge("crm_db_pool_checked_out", "Connections currently checked out", ("pool",))
+DB_POOL_OVERFLOW = metrics.gauge("crm_db_pool_overflow", "Connections open beyond pool_size", ("pool",))
+EMAIL_QUEUE_JOBS = metrics.gauge("crm_email_queue_jobs", "Email jobs in the queue by status", ("status",))
+
+def collect_pool_metrics():
+    """Refresh connection pool gauges from the engines"""
+    pools = {"primary": engine}
+    if read_engine is not engine:
+        pools["replica"] = read_engine
+    
+    for name, pool_engine in pools.items():
+        pool_status = ConnectionPoolMonitor.get_pool_status(pool_engine)
+        DB_POOL_SIZE.set(pool_status["size"], pool=name)
+        DB_POOL_CHECKED_OUT.set(pool_status["checked_out"], pool=name)
+        DB_POOL_OVERFLOW.set(max(pool_status["overflow"], 0), pool=name)
+
+def collect_email_queue_metrics():
+    """Refresh email queue depth gauges from in-memory jobs and the dispatcher's last outbox counts"""
+    for status, count in email_service.cached_queue_stats().items():
+        if status != "total":
+            EMAIL_QUEUE_JOBS.set(count, status=status)
+
+metrics.register_collector(collect_pool_metrics)
+metrics.register_collector(collect_email_queue_metrics)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(leads.router, prefix="/api/leads", tags=["leads"])
 app.include_router(tasks.router, prefix="/api/tasks", tags=["tasks"])
 app.include_router(email.router, prefix="/api/email", tags=["email"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+app.include_router(stats.router, prefix="/api/stats", tags=["stats"])
 
 @app.on_event("startup")
 async def startup_event():
@@ -92,6 +149,14 @@ async def startup_event():
     from app.services.background_tasks import background_manager
     await background_manager.start()
     
+    # Pick (or calibrate) the bcrypt cost before serving logins
+    try:
+        from app.services.auth_service import configure_password_hashing
+        verify_ms = await configure_password_hashing()
+        print(f"🔐 bcrypt verify takes ~{verify_ms:.0f} ms on this host")
+    except Exception as e:
+        print(f"⚠️  bcrypt calibration failed: {e}")
+    
     # Test database connection
     try:
         from sqlalchemy import text
@@ -132,6 +197,23 @@ async def startup_event():
         
         # Set global flag for mock database
         app.state.use_real_db = False
+    
+    # Queue emails through the outbox table when it is available
+    email_service.use_outbox = app.state.use_real_db
+    
+    # Warm the user directory used for assignee lookups
+    try:
+        from app.services.user_directory import user_directory
+        await user_directory.warm(app.state.use_real_db)
+    except Exception as e:
+        print(f"⚠️  User directory warm-up failed: {e}")
+    
+    # Build the dashboard counters from the tables
+    try:
+        from app.services.dashboard_stats import dashboard_stats
+        await dashboard_stats.warm(app.state.use_real_db)
+    except Exception as e:
+        print(f"⚠️  Dashboard stats warm-up failed: {e}")
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -142,6 +224,13 @@ async def shutdown_event():
     from app.services.background_tasks import background_manager
     await background_manager.stop()
     
+    # Close pooled SMTP connections
+    await email_service.close()
+    
+    # Release the bcrypt worker threads
+    from app.services.auth_service import password_hasher
+    password_hasher.shutdown()
+    
     print("✅ CRM API shutdown complete")
 
 @app.get("/")
@@ -167,9 +256,24 @@ async def health_check():
         # Test database connection
         async with AsyncSessionLocal() as session:
             await session.execute(text("SELECT 1"))
-        return {"status": "healthy", "database": "connected"}
     except Exception as e:
         return {"status": "unhealthy", "database": "disconnected", "error": str(e)}
+    
+    health = {"status": "healthy", "database": "connected"}
+    
+    if read_engine is not engine:
+        try:
+            lag = await get_replica_lag()
+            health["replica"] = {"status": "connected", "lag_seconds": round(lag, 3)}
+        except Exception as e:
+            health["replica"] = {"status": "disconnected", "error": str(e)}
+    
+    return health
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text exposition of pool, request, queue and background metrics"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/email-setup-help")
 async def email_setup_help():
@@ -0,0 +1,71 @@
+import json
+import logging
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.middleware.metrics import route_template
+from app.utils.query_stats import QUERY_BUDGET_MODE, count_queries
+
+logger = logging.getLogger(__name__)
+
+class QueryStatsMiddleware:
+    """Counts SQL queries per request and reports them in a Server-Timing header.
+
+    When the matched endpoint declares a budget with @query_budget, requests
+    over it are logged, or rejected with a 500 when QUERY_BUDGET_MODE=strict.
+    """
+
+    def __init__(self, app: ASGIApp, mode: str = QUERY_BUDGET_MODE):
+        self.app = app
+        self.mode = mode
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        suppress_body = False
+
+        async def send_wrapper(message: Message):
+            nonlocal suppress_body
+            if suppress_body:
+                return
+
+            if message["type"] == "http.response.start":
+                budget = getattr(scope.get("endpoint"), "__query_budget__", None)
+                over_budget = budget is not None and stats.count > budget and self.mode != "off"
+
+                if over_budget:
+                    logger.warning(
+                        f"Query budget exceeded: {scope['method']} {route_template(scope)} "
+                        f"ran {stats.count} queries (budget {budget})"
+                    )
+                    if self.mode == "strict":
+                        suppress_body = True
+                        body = json.dumps({
+                            "detail": "Query budget exceeded",
+                            "queries": stats.count,
+                            "budget": budget
+                        }).encode()
+                        await send({
+                            "type": "http.response.start",
+                            "status": 500,
+                            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+                        })
+                        await send({"type": "http.response.body", "body": body})
+                        return
+
+                if stats.count:
+                    logger.info(
+                        f"{scope['method']} {scope['path']}: {stats.count} queries in {stats.duration * 1000:.1f}ms"
+                    )
+
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries"'.encode()
+                ))
+                message = {**message, "headers": headers}
+
+            await send(message)
+
+        with count_queries() as stats:
+            await self.app(scope, receive, send_wrapper)
@@ -5,6 +5,7 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
 import asyncio
 from collections import defaultdict, deque
+from app.utils.kv_store import KVStore, kv_store
 
 class InMemoryRateLimiter:
     """In-memory rate limiter using sliding window"""
@@ -31,8 +32,31 @@ class InMemoryRateLimiter:
             requests.append(now)
             return True
 
+class KVRateLimiter:
+    """Sliding window counter on the shared key-value store.
+    
+    Keeps one counter per fixed window and weights the previous window by
+    how much of it still overlaps, so state is two integers per client and
+    works across workers when the store is Redis.
+    """
+    
+    def __init__(self, store: KVStore):
+        self.store = store
+    
+    async def is_allowed(self, key: str, limit: int, window: int) -> bool:
+        """Check if request is allowed based on rate limit"""
+        now = time.time()
+        current_window = int(now // window)
+        overlap = 1 - (now % window) / window
+        
+        # Count first so concurrent workers cannot both slip under the limit
+        current = await self.store.incr(f"ratelimit:{key}:{current_window}", ttl=window * 2)
+        previous = await self.store.get(f"ratelimit:{key}:{current_window - 1}")
+        
+        return int(previous or 0) * overlap + current <= limit
+
 # Global rate limiter instance
-rate_limiter = InMemoryRateLimiter()
+rate_limiter = KVRateLimiter(kv_store)
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
     """Rate limiting middleware with different limits for different endpoints"""
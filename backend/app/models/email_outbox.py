@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, Text, Integer, DateTime, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from app.utils.database import Base
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(String(100), primary_key=True)
+    to_email = Column(String(255), nullable=False)
+    template_name = Column(String(100), nullable=False)
+    template_data = Column(JSONB, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    last_error = Column(Text, nullable=True)
+    # When the row may next be claimed: retry backoff, or lease expiry while 'sending'
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True, server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Claim query: unfinished rows by due time, so rows still backing off are never read
+        Index("idx_email_outbox_due", "next_attempt_at", postgresql_where=text("status IN ('pending', 'retry', 'sending')")),
+        # Stats by status and cleanup of old finished rows
+        Index("idx_email_outbox_status_created", "status", "created_at"),
+    )
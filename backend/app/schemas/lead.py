@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, field_serializer
-from typing import Optional, Union
+from typing import List, Optional, Union
 from datetime import datetime
 from uuid import UUID
 
@@ -38,6 +38,20 @@ class LeadResponse(BaseModel):
         from_attributes = True
         json_encoders = {UUID: str}
 
+class LeadPage(BaseModel):
+    items: List[LeadResponse]
+    next_cursor: Optional[str] = None
+
+class LeadBulkError(BaseModel):
+    row: int
+    errors: List[str]
+
+class LeadBulkResult(BaseModel):
+    received: int
+    created: int
+    failed: int
+    errors: List[LeadBulkError]
+
 class LeadUpdate(BaseModel):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
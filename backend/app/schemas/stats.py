@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+from datetime import datetime
+
+class LeadStats(BaseModel):
+    total: int
+    by_status: Dict[str, int]
+    by_assignee: Dict[str, int]
+
+class TaskStats(BaseModel):
+    total: int
+    by_status: Dict[str, int]
+    by_priority: Dict[str, int]
+
+class StatsSummary(BaseModel):
+    leads: LeadStats
+    tasks: TaskStats
+    reconciled_at: Optional[datetime] = None
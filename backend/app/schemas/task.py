@@ -1,5 +1,5 @@
 from pydantic import BaseModel, field_serializer
-from typing import Optional, Union
+from typing import List, Optional, Union
 from datetime import datetime
 from uuid import UUID
 
@@ -33,6 +33,10 @@ class TaskResponse(BaseModel):
         from_attributes = True
         json_encoders = {UUID: str}
 
+class TaskPage(BaseModel):
+    items: List[TaskResponse]
+    next_cursor: Optional[str] = None
+
 class TaskUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, field_serializer
-from typing import Optional, Union
+from typing import List, Optional, Union
 from datetime import datetime
 from enum import Enum
 from uuid import UUID
@@ -34,6 +34,10 @@ class UserResponse(BaseModel):
         from_attributes = True
         json_encoders = {UUID: str}
 
+class UserPage(BaseModel):
+    items: List[UserResponse]
+    next_cursor: Optional[str] = None
+
 class UserCredentials(BaseModel):
     username: str
     password: str
@@ -42,6 +46,7 @@ class UserCredentials(BaseModel):
     role: str
     email_status: Optional[str] = "not_sent"
     email_error: Optional[str] = None
+    email_id: Optional[str] = None
 
 class LoginRequest(BaseModel):
     username: str
@@ -1,22 +1,117 @@
 import os
+import time
+import asyncio
+import hashlib
 import secrets
 import string
+import threading
+import statistics
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, List, Optional, Tuple
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from dotenv import load_dotenv
+from app.utils.metrics import metrics
 
 load_dotenv()
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt cost: a fixed BCRYPT_ROUNDS, or BCRYPT_CALIBRATE=true to measure the
+# host at startup and pick the rounds closest to BCRYPT_TARGET_MS per verify
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS") or 0)
+BCRYPT_CALIBRATE = os.getenv("BCRYPT_CALIBRATE", "false").lower() == "true"
+BCRYPT_TARGET_MS = float(os.getenv("BCRYPT_TARGET_MS", "250"))
+BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", "10"))
+BCRYPT_MAX_ROUNDS = int(os.getenv("BCRYPT_MAX_ROUNDS", "15"))
+
 # JWT settings
 SECRET_KEY = os.getenv("JWT_SECRET", "your-super-secret-jwt-key-here")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# Verified token cache
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+# bcrypt runs on its own thread pool; callers beyond workers + queue size get a 503
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "32"))
+
+TOKEN_CACHE_REQUESTS = metrics.counter(
+    "crm_token_cache_requests_total", "Verified-JWT cache lookups by result", ("result",)
+)
+PASSWORD_HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PASSWORD_HASH_DURATION = metrics.histogram(
+    "crm_password_hash_seconds", "Time spent in bcrypt per call", ("operation",), buckets=PASSWORD_HASH_BUCKETS
+)
+PASSWORD_HASH_WAIT = metrics.histogram(
+    "crm_password_hash_wait_seconds", "Time bcrypt calls waited for a free worker", ("operation",), buckets=PASSWORD_HASH_BUCKETS
+)
+PASSWORD_HASH_PENDING = metrics.gauge(
+    "crm_password_hash_pending", "bcrypt calls running or waiting for a worker"
+)
+PASSWORD_HASH_REJECTED = metrics.counter(
+    "crm_password_hash_rejected_total", "bcrypt calls refused because the queue was full", ("operation",)
+)
+BCRYPT_ROUNDS_GAUGE = metrics.gauge(
+    "crm_bcrypt_rounds", "bcrypt cost factor used for new hashes"
+)
+BCRYPT_CALIBRATION_MS = metrics.gauge(
+    "crm_bcrypt_calibration_ms", "Startup calibration: target and measured bcrypt time", ("kind",)
+)
+BCRYPT_VERIFY_CAPACITY = metrics.gauge(
+    "crm_bcrypt_verify_capacity_per_second", "Estimated password verifications per second across the bcrypt pool"
+)
+PASSWORD_REHASHES = metrics.counter(
+    "crm_password_rehash_total", "Stored hashes rewritten at login because their cost changed"
+)
+
+@dataclass
+class BcryptCalibration:
+    rounds: int
+    target_ms: float
+    measured_ms: float
+
+def configure_bcrypt_rounds(rounds: int):
+    """Use this cost for new hashes; hashes at any other cost need an update"""
+    pwd_context.update(bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds)
+    BCRYPT_ROUNDS_GAUGE.set(rounds)
+
+if BCRYPT_ROUNDS:
+    configure_bcrypt_rounds(BCRYPT_ROUNDS)
+
+def _time_bcrypt(rounds: int, samples: int = 3) -> float:
+    """Median milliseconds for one hash (the same work as one verify) at a cost"""
+    hasher = pwd_context.handler("bcrypt").using(rounds=rounds)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.hash("calibration")
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def calibrate_bcrypt_rounds(
+    target_ms: float = BCRYPT_TARGET_MS,
+    min_rounds: int = BCRYPT_MIN_ROUNDS,
+    max_rounds: int = BCRYPT_MAX_ROUNDS
+) -> BcryptCalibration:
+    """Pick the cost whose verify time is closest to the target on this host.
+    
+    Each extra round doubles the work, so one measurement at min_rounds
+    predicts the rest; the chosen cost is then measured to confirm.
+    """
+    base_ms = _time_bcrypt(min_rounds)
+    rounds = min(
+        range(min_rounds, max_rounds + 1),
+        key=lambda candidate: abs(base_ms * 2 ** (candidate - min_rounds) - target_ms)
+    )
+    measured_ms = base_ms if rounds == min_rounds else _time_bcrypt(rounds, samples=1)
+    return BcryptCalibration(rounds=rounds, target_ms=target_ms, measured_ms=measured_ms)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -25,6 +120,106 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+class PasswordHasherBusy(Exception):
+    """Every bcrypt worker is busy and the wait queue is full"""
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated thread pool so it never stalls the event loop.
+    
+    bcrypt releases the GIL, so the workers hash in parallel with request
+    handling. At most workers + queue_size calls are admitted at once; the
+    rest are refused immediately rather than queueing unbounded latency.
+    workers=0 hashes inline on the event loop.
+    """
+    
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, queue_size: int = PASSWORD_HASH_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+    
+    async def _run(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        if self.workers <= 0:
+            with PASSWORD_HASH_DURATION.time(operation=operation):
+                return func(*args)
+        
+        if self.pending >= self.workers + self.queue_size:
+            PASSWORD_HASH_REJECTED.inc(operation=operation)
+            raise PasswordHasherBusy("Password hashing queue is full")
+        
+        submitted_at = time.perf_counter()
+        
+        def timed():
+            started_at = time.perf_counter()
+            result = func(*args)
+            return result, started_at - submitted_at, time.perf_counter() - started_at
+        
+        self.pending += 1
+        PASSWORD_HASH_PENDING.set(self.pending)
+        try:
+            result, waited, elapsed = await asyncio.get_running_loop().run_in_executor(self._get_executor(), timed)
+        finally:
+            self.pending -= 1
+            PASSWORD_HASH_PENDING.set(self.pending)
+        
+        PASSWORD_HASH_WAIT.observe(waited, operation=operation)
+        PASSWORD_HASH_DURATION.observe(elapsed, operation=operation)
+        return result
+    
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", pwd_context.verify, plain_password, hashed_password)
+    
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return await self._run("verify", pwd_context.verify_and_update, plain_password, hashed_password)
+    
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", pwd_context.hash, password)
+    
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+# Global bcrypt worker pool
+password_hasher = PasswordHasher()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the bcrypt pool; raises PasswordHasherBusy when saturated"""
+    return await password_hasher.verify(plain_password, hashed_password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; also returns a new hash when the stored one uses another cost"""
+    valid, new_hash = await password_hasher.verify_and_update(plain_password, hashed_password)
+    if new_hash is not None:
+        PASSWORD_REHASHES.inc()
+    return valid, new_hash
+
+async def configure_password_hashing():
+    """Apply BCRYPT_ROUNDS, or calibrate against BCRYPT_TARGET_MS when enabled"""
+    if BCRYPT_CALIBRATE:
+        result = await asyncio.to_thread(calibrate_bcrypt_rounds)
+        configure_bcrypt_rounds(result.rounds)
+        BCRYPT_CALIBRATION_MS.set(result.target_ms, kind="target")
+        BCRYPT_CALIBRATION_MS.set(result.measured_ms, kind="measured")
+        verify_ms = result.measured_ms
+    else:
+        rounds = pwd_context.to_dict().get("bcrypt__default_rounds") or pwd_context.handler("bcrypt").default_rounds
+        BCRYPT_ROUNDS_GAUGE.set(rounds)
+        verify_ms = await asyncio.to_thread(_time_bcrypt, rounds, 1)
+        BCRYPT_CALIBRATION_MS.set(verify_ms, kind="measured")
+    
+    BCRYPT_VERIFY_CAPACITY.set(max(password_hasher.workers, 1) * 1000 / verify_ms)
+    return verify_ms
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the bcrypt pool; raises PasswordHasherBusy when saturated"""
+    return await password_hasher.hash(password)
+
 def generate_unique_username(full_name: str) -> str:
     """Generate a unique username from full name"""
     # Remove spaces and special characters, convert to lowercase
@@ -35,6 +230,15 @@ def generate_unique_username(full_name: str) -> str:
     
     return f"{base_username}{random_suffix}"
 
+def generate_username_candidates(full_name: str, count: int = 5) -> List[str]:
+    """Distinct random usernames for one full name, in the order they should be tried"""
+    candidates: List[str] = []
+    while len(candidates) < count:
+        candidate = generate_unique_username(full_name)
+        if candidate not in candidates:
+            candidates.append(candidate)
+    return candidates
+
 def generate_secure_password(length: int = 12) -> str:
     """Generate a secure random password"""
     # Ensure password has at least one of each character type
@@ -73,10 +277,71 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+class TokenCache:
+    """Bounded LRU of verified token digests; entries expire at the token's exp"""
+    
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+    
+    def get(self, token: str) -> Optional[dict]:
+        key = self.digest(token)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+    
+    def set(self, token: str, payload: dict):
+        expires_at = payload.get("exp")
+        if not isinstance(expires_at, (int, float)):
+            # Never cache tokens without an expiry
+            return
+        key = self.digest(token)
+        with self.lock:
+            self.entries[key] = (float(expires_at), payload)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def revoke(self, token: str):
+        """Drop a token so its next use is verified from scratch"""
+        with self.lock:
+            self.entries.pop(self.digest(token), None)
+    
+    def clear(self):
+        """Drop every cached token, e.g. after rotating the signing key"""
+        with self.lock:
+            self.entries.clear()
+
+# Global verified token cache
+token_cache = TokenCache()
+
 def verify_token(token: str) -> Optional[dict]:
     """Verify JWT token and return payload"""
+    payload = token_cache.get(token)
+    if payload is not None:
+        TOKEN_CACHE_REQUESTS.inc(result="hit")
+        return dict(payload)
+    
+    TOKEN_CACHE_REQUESTS.inc(result="miss")
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+    
+    token_cache.set(token, dict(payload))
+    return payload
+
+def revoke_token(token: str):
+    """Revocation hook: forget a cached verification for this token"""
+    token_cache.revoke(token)
\ No newline at end of file
@@ -2,8 +2,11 @@ import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import Dict
-from app.services.email_service import email_service
+from app.services.email_service import email_service, EMAIL_CLEANUP_SECONDS, EMAIL_RETENTION_DAYS
+from app.services.user_directory import user_directory, USER_DIRECTORY_REFRESH_SECONDS
+from app.services.dashboard_stats import dashboard_stats, STATS_RECONCILE_SECONDS
 from app.utils.mock_database import get_mock_db
+from app.utils.metrics import BACKGROUND_LOOP_DURATION
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +31,18 @@ class BackgroundTaskManager:
         reminder_task = asyncio.create_task(self._check_task_reminders())
         self.tasks.append(reminder_task)
         
+        # Start user directory refresher
+        directory_task = asyncio.create_task(self._refresh_user_directory())
+        self.tasks.append(directory_task)
+        
+        # Start dashboard stats reconciliation
+        stats_task = asyncio.create_task(self._reconcile_dashboard_stats())
+        self.tasks.append(stats_task)
+        
+        # Start old email cleanup
+        cleanup_task = asyncio.create_task(self._clear_old_emails())
+        self.tasks.append(cleanup_task)
+        
         logger.info("Background tasks started")
 
     async def stop(self):
@@ -47,41 +62,75 @@ class BackgroundTaskManager:
         logger.info("Background tasks stopped")
 
     async def _process_email_queue(self):
-        """Process email queue every 30 seconds"""
+        """Send emails as soon as they are queued; the dispatcher sleeps until woken"""
         while self.running:
             try:
-                stats = email_service.process_email_queue()
-                if stats["sent"] > 0 or stats["failed"] > 0:
-                    logger.info(f"Email queue processed: {stats}")
-                
-                # Clean up old emails weekly
-                if datetime.now().hour == 2 and datetime.now().minute < 1:  # 2 AM daily
-                    email_service.clear_old_emails(days=7)
+                await email_service.wait_for_work()
+                with BACKGROUND_LOOP_DURATION.time(loop="email_queue"):
+                    stats = await email_service.process_email_queue()
+                    if stats["sent"] > 0 or stats["failed"] > 0:
+                        logger.info(f"Email queue processed: {stats}")
+                    # Keeps the queue depth gauges on /metrics current for outbox rows
+                    await email_service.refresh_outbox_stats()
                 
             except Exception as e:
                 logger.error(f"Error processing email queue: {e}")
-            
-            await asyncio.sleep(30)  # Process every 30 seconds
+                await asyncio.sleep(5)  # Don't spin while SMTP or the database is down
 
     async def _check_task_reminders(self):
         """Check for task reminders every hour"""
         while self.running:
             try:
-                await self._send_task_reminders()
+                with BACKGROUND_LOOP_DURATION.time(loop="task_reminders"):
+                    await self._send_task_reminders()
             except Exception as e:
                 logger.error(f"Error checking task reminders: {e}")
             
             await asyncio.sleep(3600)  # Check every hour
 
+    async def _refresh_user_directory(self):
+        """Pull changed users into the directory every minute"""
+        while self.running:
+            await asyncio.sleep(USER_DIRECTORY_REFRESH_SECONDS)
+            try:
+                with BACKGROUND_LOOP_DURATION.time(loop="user_directory"):
+                    changed = await user_directory.refresh()
+                    if changed:
+                        logger.debug(f"User directory refreshed: {changed} users changed")
+            except Exception as e:
+                logger.error(f"Error refreshing user directory: {e}")
+
+    async def _reconcile_dashboard_stats(self):
+        """Recount dashboard aggregates with GROUP BY every few minutes"""
+        while self.running:
+            await asyncio.sleep(STATS_RECONCILE_SECONDS)
+            try:
+                with BACKGROUND_LOOP_DURATION.time(loop="dashboard_stats"):
+                    await dashboard_stats.reconcile()
+            except Exception as e:
+                logger.error(f"Error reconciling dashboard stats: {e}")
+
+    async def _clear_old_emails(self):
+        """Delete finished emails past their retention once a day"""
+        while self.running:
+            await asyncio.sleep(EMAIL_CLEANUP_SECONDS)
+            try:
+                with BACKGROUND_LOOP_DURATION.time(loop="email_cleanup"):
+                    email_service.clear_old_emails(days=EMAIL_RETENTION_DAYS)
+                    await email_service.clear_old_outbox(days=EMAIL_RETENTION_DAYS)
+            except Exception as e:
+                logger.error(f"Error clearing old emails: {e}")
+
     async def _send_task_reminders(self):
         """Send reminders for upcoming and overdue tasks"""
         try:
             mock_db = await get_mock_db()
             tasks = await mock_db.get_all_tasks()
-            users = await mock_db.get_all_users()
             
-            # Create user lookup
-            user_lookup = {user["id"]: user for user in users}
+            # Assignees come from the in-memory user directory
+            user_lookup = await user_directory.resolve(
+                task["assigned_to"] for task in tasks if task.get("assigned_to")
+            )
             
             now = datetime.now()
             tomorrow = now + timedelta(days=1)
@@ -91,7 +140,7 @@ class BackgroundTaskManager:
                     continue
                 
                 assignee = user_lookup.get(task["assigned_to"])
-                if not assignee:
+                if not assignee or not assignee.is_active:
                     continue
                 
                 due_date_str = task.get("due_date")
@@ -108,8 +157,8 @@ class BackgroundTaskManager:
                 if due_date.date() == tomorrow.date() and task["status"] == "pending":
                     try:
                         email_id = email_service.send_task_reminder(
-                            to_email=assignee["email"],
-                            assignee_name=assignee["full_name"],
+                            to_email=assignee.email,
+                            assignee_name=assignee.full_name,
                             task_title=task["title"],
                             task_description=task.get("description", ""),
                             due_date=due_date.strftime("%Y-%m-%d"),
@@ -127,8 +176,8 @@ class BackgroundTaskManager:
                     if days_overdue > 0 and now.hour == 9:  # 9 AM
                         try:
                             email_id = email_service.send_task_overdue(
-                                to_email=assignee["email"],
-                                assignee_name=assignee["full_name"],
+                                to_email=assignee.email,
+                                assignee_name=assignee.full_name,
                                 task_title=task["title"],
                                 task_description=task.get("description", ""),
                                 due_date=due_date.strftime("%Y-%m-%d"),
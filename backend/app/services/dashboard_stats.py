@@ -0,0 +1,155 @@
+import os
+import json
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+from sqlalchemy import func, select
+from dotenv import load_dotenv
+from app.models.lead import Lead
+from app.models.task import Task
+from app.utils.database import AsyncSessionLocal
+from app.utils.kv_store import KVStore, KVStoreError, kv_store
+from app.utils.metrics import metrics
+from app.utils.mock_database import get_mock_db
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+STATS_RECONCILE_SECONDS = int(os.getenv("STATS_RECONCILE_SECONDS", "300"))
+
+SUMMARY_KEY = "stats:summary"
+
+# Grouping columns per entity: summary section -> row field
+DIMENSIONS = {
+    "leads": {"by_status": "status", "by_assignee": "assigned_to"},
+    "tasks": {"by_status": "status", "by_priority": "priority"},
+}
+MODELS = {"leads": Lead, "tasks": Task}
+
+# Group key for leads without an assignee
+UNASSIGNED = "unassigned"
+
+STATS_DRIFT = metrics.counter(
+    "crm_stats_reconcile_drift_total", "Dashboard counters corrected by reconciliation", ("entity",)
+)
+
+def _group_value(value: Any) -> str:
+    return UNASSIGNED if value is None else str(value)
+
+def _empty_section(entity: str) -> Dict[str, Any]:
+    return {"total": 0, **{name: {} for name in DIMENSIONS[entity]}}
+
+class DashboardStats:
+    """Lead and task counts for the dashboards, kept as one document in the shared store.
+
+    The leads and tasks routers apply deltas after each committed write, so
+    reading the summary is a single get regardless of table size. A periodic
+    reconciliation recomputes everything with GROUP BY and overwrites the
+    document, correcting drift from failed updates or writes made elsewhere.
+    """
+
+    def __init__(self, store: KVStore):
+        self.store = store
+        self.use_real_db = False
+
+    async def warm(self, use_real_db: bool):
+        self.use_real_db = use_real_db
+        await self.reconcile()
+
+    async def _count_groups(self) -> Dict[str, Any]:
+        summary = {entity: _empty_section(entity) for entity in DIMENSIONS}
+
+        if self.use_real_db:
+            async with AsyncSessionLocal() as session:
+                for entity, dimensions in DIMENSIONS.items():
+                    model = MODELS[entity]
+                    for name, field in dimensions.items():
+                        column = getattr(model, field)
+                        result = await session.execute(select(column, func.count()).group_by(column))
+                        summary[entity][name] = {_group_value(value): count for value, count in result}
+                    summary[entity]["total"] = sum(summary[entity]["by_status"].values())
+            return summary
+
+        mock_db = await get_mock_db()
+        rows = {"leads": await mock_db.get_all_leads(), "tasks": await mock_db.get_all_tasks()}
+        for entity, dimensions in DIMENSIONS.items():
+            summary[entity]["total"] = len(rows[entity])
+            for name, field in dimensions.items():
+                summary[entity][name] = dict(Counter(_group_value(row.get(field)) for row in rows[entity]))
+        return summary
+
+    async def reconcile(self) -> Dict[str, Any]:
+        """Recompute every count from the tables and replace the stored summary"""
+        async with self.store.lock(SUMMARY_KEY, ttl=30):
+            summary = await self._count_groups()
+            summary["reconciled_at"] = datetime.now(timezone.utc).isoformat()
+
+            previous = await self._load()
+            if previous is not None:
+                for entity in DIMENSIONS:
+                    if previous.get(entity) != summary[entity]:
+                        STATS_DRIFT.inc(entity=entity)
+                        logger.info(f"Dashboard {entity} counts corrected by reconciliation")
+
+            await self.store.set(SUMMARY_KEY, json.dumps(summary))
+        return summary
+
+    async def _load(self) -> Optional[Dict[str, Any]]:
+        raw = await self.store.get(SUMMARY_KEY)
+        return json.loads(raw) if raw else None
+
+    async def summary(self) -> Dict[str, Any]:
+        """Current counts; rebuilt from the tables only if the document is missing"""
+        summary = await self._load()
+        if summary is None:
+            summary = await self.reconcile()
+        return summary
+
+    async def _apply(self, entity: str, removed: Iterable[Dict[str, Any]], added: Iterable[Dict[str, Any]]):
+        deltas: Counter = Counter()
+        for rows, sign in ((removed, -1), (added, 1)):
+            for row in rows:
+                deltas["total", None] += sign
+                for name, field in DIMENSIONS[entity].items():
+                    deltas[name, _group_value(row.get(field))] += sign
+
+        if not any(deltas.values()):
+            return
+
+        try:
+            async with self.store.lock(SUMMARY_KEY, ttl=5, timeout=2):
+                summary = await self._load()
+                if summary is None:
+                    # Nothing to adjust; the next read rebuilds from the tables
+                    return
+                section = summary[entity]
+                for (name, group), delta in deltas.items():
+                    if name == "total":
+                        section["total"] += delta
+                        continue
+                    count = section[name].get(group, 0) + delta
+                    if count:
+                        section[name][group] = count
+                    else:
+                        section[name].pop(group, None)
+                await self.store.set(SUMMARY_KEY, json.dumps(summary))
+        except KVStoreError as e:
+            # Drop the document so the next read recomputes it instead of serving stale counts
+            logger.warning(f"Could not update dashboard stats, forcing rebuild: {e}")
+            try:
+                await self.store.delete(SUMMARY_KEY)
+            except KVStoreError:
+                pass
+
+    async def record_created(self, entity: str, rows: Iterable[Dict[str, Any]]):
+        """Count newly committed leads or tasks"""
+        await self._apply(entity, (), rows)
+
+    async def record_updated(self, entity: str, before: Dict[str, Any], after: Dict[str, Any]):
+        """Move one row between groups after an update"""
+        await self._apply(entity, (before,), (after,))
+
+# Global dashboard stats
+dashboard_stats = DashboardStats(kv_store)
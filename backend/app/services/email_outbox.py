@@ -0,0 +1,174 @@
+"""
+Durable email outbox
+Emails queued while a user or task is created are written to the
+email_outbox table in the same transaction, so they survive restarts and
+are visible to every worker. Workers claim due rows in batches with
+FOR UPDATE SKIP LOCKED and mark them 'sending', pushing next_attempt_at out
+by a lease; rows whose lease runs out (a worker died mid-send) become
+claimable again. Failed sends set next_attempt_at to their backoff time.
+Once a row is sent or has failed for good, secret parameters (generated
+passwords) are masked in template_data so they do not sit in the table.
+"""
+import os
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import bindparam, case, cast, delete, func, literal, select, update
+from sqlalchemy.dialects.postgresql import JSONB, array
+from sqlalchemy.ext.asyncio import AsyncSession
+from dotenv import load_dotenv
+from app.models.email_outbox import EmailOutbox
+from app.services.email_templates import REDACTED_VALUE, SECRET_FIELDS
+from app.utils.database import AsyncSessionLocal
+
+load_dotenv()
+
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+EMAIL_OUTBOX_LEASE_SECONDS = int(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", "300"))
+
+# Unfinished rows; each is claimable once its next_attempt_at has passed
+CLAIMABLE_STATUSES = ("pending", "retry", "sending")
+
+# Rows that will not be sent again
+FINISHED_STATUSES = ("sent", "failed")
+
+OUTBOX_COLUMNS = (
+    EmailOutbox.id, EmailOutbox.to_email, EmailOutbox.template_name, EmailOutbox.template_data,
+    EmailOutbox.status, EmailOutbox.attempts, EmailOutbox.max_attempts, EmailOutbox.last_error,
+    EmailOutbox.created_at, EmailOutbox.sent_at, EmailOutbox.next_attempt_at
+)
+
+def claim_statement(limit: int, lease_seconds: int = EMAIL_OUTBOX_LEASE_SECONDS):
+    """UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED) RETURNING the claimed rows"""
+    ready = (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.status.in_(CLAIMABLE_STATUSES), EmailOutbox.next_attempt_at <= func.now())
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return (
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(ready.scalar_subquery()))
+        .values(status="sending", next_attempt_at=func.now() + timedelta(seconds=lease_seconds))
+        .returning(*OUTBOX_COLUMNS)
+    )
+
+def complete_statement():
+    """Per-row outcome of a send attempt, executed for the whole batch at once"""
+    secrets = sorted(SECRET_FIELDS)
+    redacted = cast(json.dumps({name: REDACTED_VALUE for name in secrets}), JSONB)
+    new_status = bindparam("new_status", type_=EmailOutbox.status.type)
+    # Literal elements, not a plain tuple: an expanding IN cannot be used with executemany
+    finished = new_status.in_([literal(status) for status in FINISHED_STATUSES])
+    return (
+        update(EmailOutbox)
+        .where(EmailOutbox.id == bindparam("job_id"))
+        .values(
+            status=new_status,
+            # Finished rows keep their parameters for status lookups, minus the secrets
+            template_data=case(
+                (
+                    finished & EmailOutbox.template_data.has_any(array(secrets)),
+                    EmailOutbox.template_data.op("||")(redacted)
+                ),
+                else_=EmailOutbox.template_data
+            ),
+            attempts=bindparam("new_attempts"),
+            last_error=bindparam("new_error"),
+            sent_at=bindparam("new_sent_at"),
+            next_attempt_at=bindparam("new_next_attempt_at")
+        )
+    )
+
+class EmailOutboxStore:
+    """Reads and writes outbox rows; sending itself stays in EmailService"""
+
+    def __init__(self, batch_size: int = EMAIL_OUTBOX_BATCH_SIZE, lease_seconds: int = EMAIL_OUTBOX_LEASE_SECONDS):
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+
+    @staticmethod
+    def new_id(template_name: str) -> str:
+        return f"{template_name}_{uuid.uuid4().hex}"
+
+    def stage(self, session: AsyncSession, template_name: str, to_email: str, template_data: Dict[str, Any], max_attempts: int = 3) -> str:
+        """Add an outbox row to the caller's transaction; it commits with their insert"""
+        email_id = self.new_id(template_name)
+        session.add(EmailOutbox(
+            id=email_id,
+            to_email=to_email,
+            template_name=template_name,
+            template_data=template_data,
+            status="pending",
+            attempts=0,
+            max_attempts=max_attempts
+        ))
+        return email_id
+
+    async def claim(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Lease up to limit ready rows for this worker"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(claim_statement(limit or self.batch_size, self.lease_seconds))
+            rows = [dict(row) for row in result.mappings()]
+            await session.commit()
+        return rows
+
+    async def complete(self, outcomes: Iterable[Dict[str, Any]]):
+        """Record send results: dicts with job_id, new_status, new_attempts, new_error, new_sent_at, new_next_attempt_at"""
+        outcomes = list(outcomes)
+        if not outcomes:
+            return
+        async with AsyncSessionLocal() as session:
+            await session.execute(complete_statement(), outcomes)
+            await session.commit()
+
+    async def get(self, email_id: str) -> Optional[Dict[str, Any]]:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(*OUTBOX_COLUMNS).where(EmailOutbox.id == email_id))
+            row = result.mappings().first()
+            return dict(row) if row else None
+
+    async def stats(self) -> Dict[str, int]:
+        """Row counts per status from the (status, created_at) index"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)
+            )
+            counts = dict(result.all())
+        stats = {
+            "total": sum(counts.values()),
+            "pending": counts.get("pending", 0) + counts.get("sending", 0),
+            "sent": counts.get("sent", 0),
+            "failed": counts.get("failed", 0),
+            "retry": counts.get("retry", 0)
+        }
+        return stats
+
+    async def retry_schedule(self) -> Dict[str, Any]:
+        """How many rows are backing off, how many are due, and the earliest due time"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(
+                    func.count(),
+                    func.count().filter(EmailOutbox.next_attempt_at <= func.now()),
+                    func.min(EmailOutbox.next_attempt_at)
+                ).where(EmailOutbox.status == "retry")
+            )
+            waiting, due, next_attempt_at = result.one()
+        return {"waiting": waiting, "due": due, "next_attempt_at": next_attempt_at}
+
+    async def clear_old(self, days: int) -> int:
+        """Delete finished rows older than the cutoff"""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                delete(EmailOutbox)
+                .where(EmailOutbox.status.in_(("sent", "failed")), EmailOutbox.created_at < cutoff)
+            )
+            await session.commit()
+            return result.rowcount
+
+# Global outbox store
+email_outbox = EmailOutboxStore()
@@ -1,14 +1,23 @@
 import os
-import smtplib
 import asyncio
+import heapq
 import logging
+import random
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Optional, Dict, List
-from datetime import datetime, timedelta
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
 from dataclasses import dataclass
 from enum import Enum
 from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.email_outbox import email_outbox
+from app.services.email_templates import RenderedEmail, redact_secrets, template_registry
+from app.services.smtp_pool import SMTPConnectionPool
+from app.utils.metrics import metrics
+import aiosmtplib
 import json
 import time
 
@@ -20,22 +29,64 @@ EMAIL_PORT = int(os.getenv("EMAIL_PORT", "587"))
 EMAIL_USER = os.getenv("EMAIL_USER", "your-actual-email@gmail.com")
 EMAIL_PASS = os.getenv("EMAIL_PASS", "")
 
+# Pooled SMTP connections, which is also the number of emails sent at once
+EMAIL_SEND_CONCURRENCY = int(os.getenv("EMAIL_SEND_CONCURRENCY", "4"))
+
+# Retry backoff: the first retry waits about EMAIL_RETRY_BASE_SECONDS, doubling up to the cap
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "3600"))
+
+# Dispatcher: emails queued within the batch window go out in one pass; the idle
+# check picks up outbox rows committed by other processes
+EMAIL_DISPATCH_BATCH_MS = float(os.getenv("EMAIL_DISPATCH_BATCH_MS", "5"))
+EMAIL_DISPATCH_IDLE_SECONDS = float(os.getenv("EMAIL_DISPATCH_IDLE_SECONDS", "30"))
+
+# Outbox row counts shown on /metrics are refreshed at most this often
+EMAIL_OUTBOX_STATS_SECONDS = float(os.getenv("EMAIL_OUTBOX_STATS_SECONDS", "5"))
+
+# Finished emails older than the retention are deleted on this interval
+EMAIL_CLEANUP_SECONDS = int(os.getenv("EMAIL_CLEANUP_SECONDS", "86400"))
+EMAIL_RETENTION_DAYS = int(os.getenv("EMAIL_RETENTION_DAYS", "7"))
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+EMAIL_SEND_FAILURES = metrics.counter(
+    "crm_email_send_failures_total", "Failed email send attempts by kind", ("kind",)
+)
+EMAIL_QUEUE_LATENCY = metrics.histogram(
+    "crm_email_queue_latency_seconds", "Time from queueing an email to its first successful send",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+
+def retry_delay(attempt: int, base: float = EMAIL_RETRY_BASE_SECONDS, cap: float = EMAIL_RETRY_MAX_SECONDS) -> float:
+    """Seconds before retry number attempt: exponential and capped, half of it random
+    so emails that failed together do not retry together"""
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def is_permanent_failure(error: Exception) -> bool:
+    """5xx replies about this message (unknown mailbox, rejected content) will not change on retry"""
+    if isinstance(error, aiosmtplib.SMTPAuthenticationError):
+        # Bad credentials hit every message and are fixed by reconfiguring, so keep backing off
+        return False
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(recipient.code >= 500 for recipient in error.recipients)
+    return isinstance(error, aiosmtplib.SMTPResponseException) and error.code >= 500
+
 class EmailStatus(Enum):
     PENDING = "pending"
     SENT = "sent"
     FAILED = "failed"
     RETRY = "retry"
 
-@dataclass
+@dataclass(slots=True)
 class EmailJob:
+    """A queued email. Only the template name and parameters are kept;
+    subject and body are rendered on demand."""
     id: str
     to_email: str
-    subject: str
-    body: str
     template_name: str
     template_data: Dict
     status: EmailStatus
@@ -44,11 +95,40 @@ class EmailJob:
     retry_count: int = 0
     max_retries: int = 3
     error_message: Optional[str] = None
+    next_attempt_at: Optional[datetime] = None
+    
+    def render(self) -> RenderedEmail:
+        return template_registry.render(self.template_name, self.template_data)
+    
+    @property
+    def subject(self) -> str:
+        return self.render().subject
+    
+    @property
+    def body(self) -> str:
+        return self.render().text
+
+# Statuses whose jobs are waiting to be sent
+READY_STATUSES = (EmailStatus.PENDING, EmailStatus.RETRY)
 
 class EmailService:
     def __init__(self):
-        self.email_queue: List[EmailJob] = []
-        self.templates = self._load_templates()
+        # Jobs by id in creation order, new job ids, retries by due time, and live counts per status
+        self.jobs: Dict[str, EmailJob] = {}
+        self.pending: deque = deque()
+        self.retries: List[tuple] = []  # min-heap of (due timestamp, job id)
+        self.status_counts: Counter = Counter()
+        self._sequence = 0
+        self.templates = template_registry
+        self.pool: Optional[SMTPConnectionPool] = None
+        # With a real database, emails are written to the email_outbox table instead
+        self.use_outbox = False
+        # Set when work arrives; bound to the dispatcher's event loop
+        self._wakeup: Optional[asyncio.Event] = None
+        self._wakeup_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Last outbox row counts, for scrape-time metrics that cannot query the table
+        self.outbox_stats: Dict[str, int] = {}
+        self._outbox_stats_at = 0.0
         
         # Load configuration at runtime
         self._load_config()
@@ -71,138 +151,118 @@ class EmailService:
         logger.info(f"  Password length: {len(self.password)}")
         logger.info(f"  Password (first 4 chars): {self.password[:4]}****" if self.password else "  Password: NOT SET")
         
-    def _load_templates(self) -> Dict[str, Dict]:
-        """Load email templates"""
-        return {
-            "user_credentials": {
-                "subject": "Welcome to CRM System - Your Account Credentials",
-                "body": """
-Dear {full_name},
-
-Welcome to our CRM System! Your account has been created successfully.
-
-Here are your login credentials:
-
-Username: {username}
-Password: {password}
-Role: {role_display}
-
-Login URL: {login_url}
-
-Please keep these credentials secure and change your password after your first login.
-
-If you have any questions, please contact your system administrator.
-
-Best regards,
-CRM System Team
-                """
-            },
-            "task_assignment": {
-                "subject": "New Task Assigned: {task_title}",
-                "body": """
-Dear {assignee_name},
-
-You have been assigned a new task in the CRM System.
-
-Task Details:
-Title: {task_title}
-Description: {task_description}
-{due_date_text}
-Priority: {priority}
-
-Please log in to the CRM system to view more details and update the task status.
-
-Login URL: {login_url}
-
-Best regards,
-CRM System Team
-                """
-            },
-            "task_reminder": {
-                "subject": "Task Reminder: {task_title}",
-                "body": """
-Dear {assignee_name},
-
-This is a reminder about your upcoming task.
-
-Task Details:
-Title: {task_title}
-Description: {task_description}
-Due Date: {due_date}
-Status: {status}
-
-Please log in to the CRM system to update the task status.
-
-Login URL: {login_url}
-
-Best regards,
-CRM System Team
-                """
-            },
-            "task_overdue": {
-                "subject": "Overdue Task: {task_title}",
-                "body": """
-Dear {assignee_name},
-
-The following task is now overdue and requires immediate attention.
-
-Task Details:
-Title: {task_title}
-Description: {task_description}
-Due Date: {due_date}
-Days Overdue: {days_overdue}
-
-Please log in to the CRM system immediately to update the task status.
-
-Login URL: {login_url}
-
-Best regards,
-CRM System Team
-                """
-            }
-        }
-
-    def queue_email(self, template_name: str, to_email: str, template_data: Dict) -> str:
-        """Queue an email for sending"""
-        template = self.templates.get(template_name)
-        if not template:
-            raise ValueError(f"Template '{template_name}' not found")
+    @property
+    def email_queue(self) -> List[EmailJob]:
+        """Every retained job in creation order"""
+        return list(self.jobs.values())
+
+    def _set_status(self, job: EmailJob, status: EmailStatus):
+        """Move a job to a new status, keeping counts and ready queues in step"""
+        if status in (EmailStatus.SENT, EmailStatus.FAILED):
+            # Finished jobs stay around for status lookups; their secrets need not
+            job.template_data = redact_secrets(job.template_data)
+        if self.jobs.get(job.id) is not job:
+            # Outbox jobs are tracked in the table, not in memory
+            job.status = status
+            return
+        self.status_counts[job.status] -= 1
+        self.status_counts[status] += 1
+        job.status = status
+        if status == EmailStatus.PENDING:
+            self.pending.append(job.id)
+        elif status == EmailStatus.RETRY:
+            due = job.next_attempt_at.timestamp() if job.next_attempt_at else 0
+            heapq.heappush(self.retries, (due, job.id))
+
+    def queue_email(self, template_name: str, to_email: str, template_data: Dict, session: Optional[AsyncSession] = None) -> str:
+        """Queue an email for sending; rendering happens at send time.
+        
+        With a session the email goes to the outbox table and is committed
+        (or rolled back) together with the caller's transaction.
+        """
+        template = self.templates.validate(template_name, template_data)
         
-        # Generate unique ID
-        email_id = f"{template_name}_{int(time.time())}_{len(self.email_queue)}"
+        # Keep only the parameters the template actually uses
+        template_data = {key: value for key, value in template_data.items() if key in template.fields}
         
-        # Format template
-        subject = template["subject"].format(**template_data)
-        body = template["body"].format(**template_data)
+        if session is not None:
+            email_id = email_outbox.stage(session, template_name, to_email, template_data)
+            # The row is only visible to the dispatcher once the caller commits
+            event.listen(getattr(session, "sync_session", session), "after_commit", lambda _: self.notify(), once=True)
+            logger.info(f"Email staged in outbox: {email_id} to {to_email}")
+            return email_id
+        
+        # Generate unique ID (the sequence never repeats, even after old jobs are cleared)
+        self._sequence += 1
+        email_id = f"{template_name}_{int(time.time())}_{self._sequence}"
         
         # Create email job
         job = EmailJob(
             id=email_id,
             to_email=to_email,
-            subject=subject,
-            body=body,
             template_name=template_name,
             template_data=template_data,
             status=EmailStatus.PENDING,
             created_at=datetime.now()
         )
         
-        self.email_queue.append(job)
+        self.jobs[email_id] = job
+        self.status_counts[job.status] += 1
+        self.pending.append(email_id)
+        self.notify()
         logger.info(f"Email queued: {email_id} to {to_email}")
         return email_id
 
-    def send_user_credentials(self, to_email: str, full_name: str, username: str, password: str, role: str) -> str:
+    def notify(self):
+        """Wake the dispatcher; safe to call from any thread"""
+        wakeup, loop = self._wakeup, self._wakeup_loop
+        if wakeup is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            wakeup.set()
+        else:
+            loop.call_soon_threadsafe(wakeup.set)
+
+    async def wait_for_work(self, max_wait: float = EMAIL_DISPATCH_IDLE_SECONDS):
+        """Sleep until an email is queued or the next retry falls due (at most max_wait),
+        then linger for the batch window so a burst of emails is sent as one pass"""
+        loop = asyncio.get_running_loop()
+        if self._wakeup_loop is not loop:
+            self._wakeup_loop = loop
+            self._wakeup = asyncio.Event()
+        wakeup = self._wakeup
+        
+        timeout = max_wait
+        if self.pending:
+            timeout = 0
+        elif self.retries:
+            timeout = min(timeout, max(0.0, self.retries[0][0] - time.time()))
+        
+        if timeout > 0:
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        
+        # Emails queued in the next few milliseconds join this pass
+        await asyncio.sleep(EMAIL_DISPATCH_BATCH_MS / 1000)
+        wakeup.clear()
+
+    def send_user_credentials(self, to_email: str, full_name: str, username: str, password: str, role: str, session: Optional[AsyncSession] = None) -> str:
         """Queue user credentials email"""
         template_data = {
             "full_name": full_name,
             "username": username,
             "password": password,
-            "role_display": role.replace('_', ' ').title(),
-            "login_url": "http://localhost:3000/login"
+            "role_display": role.replace('_', ' ').title()
         }
-        return self.queue_email("user_credentials", to_email, template_data)
+        return self.queue_email("user_credentials", to_email, template_data, session)
 
-    def send_task_assignment(self, to_email: str, assignee_name: str, task_title: str, task_description: str, due_date: Optional[str] = None, priority: str = "Medium") -> str:
+    def send_task_assignment(self, to_email: str, assignee_name: str, task_title: str, task_description: str, due_date: Optional[str] = None, priority: str = "Medium", session: Optional[AsyncSession] = None) -> str:
         """Queue task assignment email"""
         due_date_text = f"Due Date: {due_date}" if due_date else "No due date specified"
         
@@ -211,10 +271,28 @@ CRM System Team
             "task_title": task_title,
             "task_description": task_description,
             "due_date_text": due_date_text,
-            "priority": priority,
-            "login_url": "http://localhost:3000/login"
+            "priority": priority
+        }
+        return self.queue_email("task_assignment", to_email, template_data, session)
+
+    def send_task_assignment_batch(self, to_email: str, assignee_name: str, tasks: List[Dict], session: Optional[AsyncSession] = None) -> str:
+        """Queue one email covering several task assignments for the same assignee"""
+        if len(tasks) == 1:
+            return self.send_task_assignment(to_email, assignee_name, session=session, **tasks[0])
+        
+        lines = []
+        for number, task in enumerate(tasks, start=1):
+            due_date_text = f"Due: {task['due_date']}" if task.get("due_date") else "No due date"
+            lines.append(f"{number}. {task['task_title']} (Priority: {task.get('priority', 'Medium')}, {due_date_text})")
+            if task.get("task_description"):
+                lines.append(f"   {task['task_description']}")
+        
+        template_data = {
+            "assignee_name": assignee_name,
+            "task_count": len(tasks),
+            "task_list": "\n".join(lines)
         }
-        return self.queue_email("task_assignment", to_email, template_data)
+        return self.queue_email("task_assignment_batch", to_email, template_data, session)
 
     def send_task_reminder(self, to_email: str, assignee_name: str, task_title: str, task_description: str, due_date: str, status: str) -> str:
         """Queue task reminder email"""
@@ -223,8 +301,7 @@ CRM System Team
             "task_title": task_title,
             "task_description": task_description,
             "due_date": due_date,
-            "status": status,
-            "login_url": "http://localhost:3000/login"
+            "status": status
         }
         return self.queue_email("task_reminder", to_email, template_data)
 
@@ -235,115 +312,248 @@ CRM System Team
             "task_title": task_title,
             "task_description": task_description,
             "due_date": due_date,
-            "days_overdue": days_overdue,
-            "login_url": "http://localhost:3000/login"
+            "days_overdue": days_overdue
         }
         return self.queue_email("task_overdue", to_email, template_data)
 
-    def _send_email(self, job: EmailJob) -> bool:
-        """Send a single email"""
+    def _get_pool(self) -> SMTPConnectionPool:
+        """Connection pool for the current settings; replaced when they change"""
+        pool = self.pool
+        if pool is None or (pool.host, pool.port, pool.username, pool.password) != (self.host, self.port, self.username, self.password):
+            if pool is not None:
+                asyncio.ensure_future(pool.close())
+            pool = self.pool = SMTPConnectionPool(
+                self.host, self.port, self.username, self.password, size=EMAIL_SEND_CONCURRENCY
+            )
+        return pool
+
+    async def _send_email(self, job: EmailJob) -> bool:
+        """Send a single email over a pooled connection"""
         try:
-            # Reload config to get latest environment variables
-            self._load_config()
-            
-            # Debug logging
             logger.info(f"Attempting to send email {job.id} using {self.username} to {self.host}:{self.port}")
-            logger.info(f"Using password length: {len(self.password)} characters")
             
             if not self.password:
                 raise Exception("EMAIL_PASS not configured")
             
-            # Create message
-            msg = MIMEMultipart()
+            # Render now; identical payloads come from the render cache
+            rendered = job.render()
+            
+            # Create message, with an HTML alternative when the template has one
+            msg = MIMEMultipart('alternative') if rendered.html else MIMEMultipart()
             msg['From'] = self.username
             msg['To'] = job.to_email
-            msg['Subject'] = job.subject
+            msg['Subject'] = rendered.subject
 
-            msg.attach(MIMEText(job.body, 'plain'))
+            msg.attach(MIMEText(rendered.text, 'plain'))
+            if rendered.html:
+                msg.attach(MIMEText(rendered.html, 'html'))
 
             # Send email
-            server = smtplib.SMTP(self.host, self.port)
-            server.starttls()
-            server.login(self.username, self.password)
-            text = msg.as_string()
-            server.sendmail(self.username, job.to_email, text)
-            server.quit()
-
-            job.status = EmailStatus.SENT
+            await self._get_pool().send_message(msg)
+
             job.sent_at = datetime.now()
+            if job.retry_count == 0:
+                EMAIL_QUEUE_LATENCY.observe((datetime.now(timezone.utc) - job.created_at.astimezone(timezone.utc)).total_seconds())
+            self._set_status(job, EmailStatus.SENT)
             logger.info(f"Email sent successfully: {job.id}")
             return True
 
         except Exception as e:
             job.error_message = str(e)
             job.retry_count += 1
+            job.next_attempt_at = None
             
-            if job.retry_count >= job.max_retries:
-                job.status = EmailStatus.FAILED
+            if is_permanent_failure(e):
+                EMAIL_SEND_FAILURES.inc(kind="permanent")
+                self._set_status(job, EmailStatus.FAILED)
+                logger.error(f"Email rejected permanently: {job.id} - {str(e)}")
+            elif job.retry_count >= job.max_retries:
+                EMAIL_SEND_FAILURES.inc(kind="transient")
+                self._set_status(job, EmailStatus.FAILED)
                 logger.error(f"Email failed permanently: {job.id} - {str(e)}")
             else:
-                job.status = EmailStatus.RETRY
-                logger.warning(f"Email failed, will retry: {job.id} - {str(e)}")
+                EMAIL_SEND_FAILURES.inc(kind="transient")
+                delay = retry_delay(job.retry_count)
+                job.next_attempt_at = datetime.now() + timedelta(seconds=delay)
+                self._set_status(job, EmailStatus.RETRY)
+                logger.warning(f"Email failed, retrying in {delay:.0f}s: {job.id} - {str(e)}")
             
             return False
 
-    def process_email_queue(self) -> Dict[str, int]:
-        """Process all pending emails in the queue"""
+    def _outbox_job(self, row: Dict) -> EmailJob:
+        """In-memory view of an outbox row"""
+        return EmailJob(
+            id=row["id"],
+            to_email=row["to_email"],
+            template_name=row["template_name"],
+            template_data=row["template_data"] or {},
+            # Leased rows ("sending") still count as pending
+            status=EmailStatus.PENDING if row["status"] == "sending" else EmailStatus(row["status"]),
+            created_at=row["created_at"],
+            sent_at=row["sent_at"],
+            retry_count=row["attempts"],
+            max_retries=row["max_attempts"],
+            error_message=row["last_error"],
+            next_attempt_at=row["next_attempt_at"]
+        )
+
+    async def process_email_queue(self) -> Dict[str, int]:
+        """Send all pending emails concurrently, bounded by the connection pool"""
         stats = {"sent": 0, "failed": 0, "retried": 0}
         
-        for job in self.email_queue:
-            if job.status in [EmailStatus.PENDING, EmailStatus.RETRY]:
-                if self._send_email(job):
-                    stats["sent"] += 1
-                else:
-                    if job.status == EmailStatus.RETRY:
-                        stats["retried"] += 1
-                    else:
-                        stats["failed"] += 1
+        # Take every new job, plus retries whose backoff has passed; later ones stay in the heap untouched
+        jobs = []
+        while self.pending:
+            job = self.jobs.get(self.pending.popleft())
+            if job is not None and job.status == EmailStatus.PENDING:
+                jobs.append(job)
+        now = time.time()
+        while self.retries and self.retries[0][0] <= now:
+            _, email_id = heapq.heappop(self.retries)
+            job = self.jobs.get(email_id)
+            if job is not None and job.status == EmailStatus.RETRY:
+                jobs.append(job)
+        
+        # Plus one batch leased from the outbox; other workers skip these rows
+        claimed = []
+        if self.use_outbox:
+            claimed = [self._outbox_job(row) for row in await email_outbox.claim()]
+            jobs.extend(claimed)
+            if len(claimed) >= email_outbox.batch_size:
+                # More rows are probably waiting; go round again straight away
+                self.notify()
+        if not jobs:
+            return stats
+        
+        # Reload config to get latest environment variables
+        self._load_config()
+        
+        results = await asyncio.gather(*(self._send_email(job) for job in jobs))
+        for job, sent in zip(jobs, results):
+            if sent:
+                stats["sent"] += 1
+            elif job.status == EmailStatus.RETRY:
+                stats["retried"] += 1
+            else:
+                stats["failed"] += 1
+        
+        if claimed:
+            await email_outbox.complete(
+                {
+                    "job_id": job.id,
+                    "new_status": job.status.value,
+                    "new_attempts": job.retry_count,
+                    "new_error": job.error_message,
+                    "new_sent_at": job.sent_at.astimezone() if job.sent_at else None,
+                    "new_next_attempt_at": job.next_attempt_at.astimezone() if job.next_attempt_at else None
+                }
+                for job in claimed
+            )
         
         logger.info(f"Email queue processed: {stats}")
         return stats
 
     def get_email_status(self, email_id: str) -> Optional[EmailJob]:
         """Get status of a specific email"""
-        for job in self.email_queue:
-            if job.id == email_id:
-                return job
-        return None
+        return self.jobs.get(email_id)
+
+    async def find_email(self, email_id: str) -> Optional[EmailJob]:
+        """Look an email up in memory, then by primary key in the outbox"""
+        job = self.jobs.get(email_id)
+        if job is None and self.use_outbox:
+            row = await email_outbox.get(email_id)
+            if row is not None:
+                job = self._outbox_job(row)
+        return job
 
     def get_queue_stats(self) -> Dict[str, int]:
         """Get email queue statistics"""
-        stats = {
-            "total": len(self.email_queue),
-            "pending": 0,
-            "sent": 0,
-            "failed": 0,
-            "retry": 0
+        stats = {"total": len(self.jobs)}
+        for status in EmailStatus:
+            stats[status.value] = self.status_counts[status]
+        return stats
+
+    def get_retry_schedule(self) -> Dict:
+        """Retries waiting in memory, how many are due, and the earliest due time"""
+        now = time.time()
+        return {
+            "waiting": self.status_counts[EmailStatus.RETRY],
+            "due": sum(1 for due, _ in self.retries if due <= now),
+            "next_attempt_at": datetime.fromtimestamp(self.retries[0][0]).astimezone() if self.retries else None
         }
+
+    async def retry_schedule(self) -> Dict:
+        """Retry timing across memory and the outbox, with the backoff settings"""
+        schedules = [self.get_retry_schedule()]
+        if self.use_outbox:
+            schedules.append(await email_outbox.retry_schedule())
         
-        for job in self.email_queue:
-            stats[job.status.value] += 1
-        
+        due_times = [schedule["next_attempt_at"] for schedule in schedules if schedule["next_attempt_at"]]
+        return {
+            "waiting": sum(schedule["waiting"] for schedule in schedules),
+            "due": sum(schedule["due"] for schedule in schedules),
+            "next_attempt_at": min(due_times).isoformat() if due_times else None,
+            "backoff_base_seconds": EMAIL_RETRY_BASE_SECONDS,
+            "backoff_max_seconds": EMAIL_RETRY_MAX_SECONDS
+        }
+
+    async def queue_stats(self) -> Dict[str, int]:
+        """Queue statistics including the outbox table"""
+        if self.use_outbox:
+            await self.refresh_outbox_stats(max_age=0)
+        return self.cached_queue_stats()
+
+    async def refresh_outbox_stats(self, max_age: float = EMAIL_OUTBOX_STATS_SECONDS):
+        """Re-read outbox row counts unless the cached ones are younger than max_age"""
+        if not self.use_outbox or time.monotonic() - self._outbox_stats_at < max_age:
+            return
+        self.outbox_stats = await email_outbox.stats()
+        self._outbox_stats_at = time.monotonic()
+
+    def cached_queue_stats(self) -> Dict[str, int]:
+        """In-memory counts plus the last outbox counts, without a query"""
+        stats = self.get_queue_stats()
+        for key, count in self.outbox_stats.items():
+            stats[key] += count
         return stats
 
     def clear_old_emails(self, days: int = 7) -> int:
         """Clear emails older than specified days"""
         cutoff_date = datetime.now() - timedelta(days=days)
-        initial_count = len(self.email_queue)
         
-        self.email_queue = [
-            job for job in self.email_queue 
-            if job.created_at > cutoff_date or job.status in [EmailStatus.PENDING, EmailStatus.RETRY]
-        ]
+        # Jobs are kept in creation order, so only the old prefix is visited
+        expired = []
+        for job in self.jobs.values():
+            if job.created_at > cutoff_date:
+                break
+            if job.status not in READY_STATUSES:
+                expired.append(job)
         
-        cleared_count = initial_count - len(self.email_queue)
+        for job in expired:
+            del self.jobs[job.id]
+            self.status_counts[job.status] -= 1
+        
+        cleared_count = len(expired)
         logger.info(f"Cleared {cleared_count} old emails from queue")
         return cleared_count
     
+    async def clear_old_outbox(self, days: int = 7) -> int:
+        """Clear finished outbox rows older than specified days"""
+        if not self.use_outbox:
+            return 0
+        cleared_count = await email_outbox.clear_old(days)
+        logger.info(f"Cleared {cleared_count} old emails from outbox")
+        return cleared_count
+    
     def reload_config(self):
         """Reload email configuration from environment variables"""
         logger.info("Reloading email configuration...")
         self._load_config()
+    
+    async def close(self):
+        """Close pooled SMTP connections"""
+        if self.pool is not None:
+            await self.pool.close()
 
 # Global email service instance
 email_service = EmailService()
\ No newline at end of file
@@ -0,0 +1,337 @@
+"""
+Email template engine
+Templates are compiled once: bodies are normalized and their placeholders
+extracted up front, so queueing only checks that the parameters are
+present and rendering is a single format_map. Queued jobs keep just the
+template name and parameters; subject and body are rendered at send time
+through a small LRU, so identical payloads (reminder batches, retries,
+status lookups) are rendered once. Templates can also be loaded from
+EMAIL_TEMPLATE_DIR as <name>.subject, <name>.txt and optional <name>.html
+files, which are reloaded when their mtime changes.
+"""
+import os
+import html
+import string
+import time
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterator, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+EMAIL_TEMPLATE_DIR = os.getenv("EMAIL_TEMPLATE_DIR", "")
+EMAIL_RENDER_CACHE_SIZE = int(os.getenv("EMAIL_RENDER_CACHE_SIZE", "1024"))
+LOGIN_URL = os.getenv("LOGIN_URL", "http://localhost:3000/login")
+
+# How often the template directory is checked for changed files
+RELOAD_CHECK_SECONDS = 2.0
+
+# Parameters every template can use without the caller passing them
+DEFAULT_TEMPLATE_DATA = {"login_url": LOGIN_URL}
+
+# Templates using any of these placeholders are never kept in the render cache
+SECRET_FIELDS = frozenset({"password"})
+
+# What secret parameters are replaced with once an email is finished
+REDACTED_VALUE = "********"
+
+def redact_secrets(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of template parameters with secret values masked; the result still renders"""
+    return {key: REDACTED_VALUE if key in SECRET_FIELDS else value for key, value in data.items()}
+
+BUILTIN_TEMPLATES: Dict[str, Dict[str, str]] = {
+    "user_credentials": {
+        "subject": "Welcome to CRM System - Your Account Credentials",
+        "body": """
+Dear {full_name},
+
+Welcome to our CRM System! Your account has been created successfully.
+
+Here are your login credentials:
+
+Username: {username}
+Password: {password}
+Role: {role_display}
+
+Login URL: {login_url}
+
+Please keep these credentials secure and change your password after your first login.
+
+If you have any questions, please contact your system administrator.
+
+Best regards,
+CRM System Team
+        """
+    },
+    "task_assignment": {
+        "subject": "New Task Assigned: {task_title}",
+        "body": """
+Dear {assignee_name},
+
+You have been assigned a new task in the CRM System.
+
+Task Details:
+Title: {task_title}
+Description: {task_description}
+{due_date_text}
+Priority: {priority}
+
+Please log in to the CRM system to view more details and update the task status.
+
+Login URL: {login_url}
+
+Best regards,
+CRM System Team
+        """
+    },
+    "task_assignment_batch": {
+        "subject": "{task_count} New Tasks Assigned",
+        "body": """
+Dear {assignee_name},
+
+You have been assigned {task_count} new tasks in the CRM System.
+
+{task_list}
+
+Please log in to the CRM system to view more details and update the task status.
+
+Login URL: {login_url}
+
+Best regards,
+CRM System Team
+        """
+    },
+    "task_reminder": {
+        "subject": "Task Reminder: {task_title}",
+        "body": """
+Dear {assignee_name},
+
+This is a reminder about your upcoming task.
+
+Task Details:
+Title: {task_title}
+Description: {task_description}
+Due Date: {due_date}
+Status: {status}
+
+Please log in to the CRM system to update the task status.
+
+Login URL: {login_url}
+
+Best regards,
+CRM System Team
+        """
+    },
+    "task_overdue": {
+        "subject": "Overdue Task: {task_title}",
+        "body": """
+Dear {assignee_name},
+
+The following task is now overdue and requires immediate attention.
+
+Task Details:
+Title: {task_title}
+Description: {task_description}
+Due Date: {due_date}
+Days Overdue: {days_overdue}
+
+Please log in to the CRM system immediately to update the task status.
+
+Login URL: {login_url}
+
+Best regards,
+CRM System Team
+        """
+    }
+}
+
+_formatter = string.Formatter()
+
+def _placeholders(text: str) -> FrozenSet[str]:
+    """Top-level field names referenced by a format string"""
+    names = set()
+    for _, field_name, _, _ in _formatter.parse(text):
+        if field_name:
+            names.add(field_name.split(".", 1)[0].split("[", 1)[0])
+    return frozenset(names)
+
+@dataclass(frozen=True)
+class RenderedEmail:
+    subject: str
+    text: str
+    html: Optional[str] = None
+
+@dataclass
+class EmailTemplate:
+    """A template normalized and analysed once at load time"""
+    name: str
+    subject: str
+    text: str
+    html: Optional[str] = None
+    version: int = 0
+    fields: FrozenSet[str] = field(init=False)
+
+    def __post_init__(self):
+        self.subject = self.subject.strip()
+        self.text = self.text.strip() + "\n"
+        fields = _placeholders(self.subject) | _placeholders(self.text)
+        if self.html is not None:
+            fields |= _placeholders(self.html)
+        self.fields = frozenset(fields)
+
+    @property
+    def cacheable(self) -> bool:
+        return not (self.fields & SECRET_FIELDS)
+
+    def missing_fields(self, data: Dict[str, Any]) -> FrozenSet[str]:
+        return frozenset(name for name in self.fields if name not in data and name not in DEFAULT_TEMPLATE_DATA)
+
+    def render(self, data: Dict[str, Any]) -> RenderedEmail:
+        values = {**DEFAULT_TEMPLATE_DATA, **data}
+        rendered_html = None
+        if self.html is not None:
+            escaped = {key: html.escape(str(value)) for key, value in values.items()}
+            rendered_html = self.html.format_map(escaped)
+        return RenderedEmail(
+            subject=self.subject.format_map(values),
+            text=self.text.format_map(values),
+            html=rendered_html
+        )
+
+class TemplateRegistry:
+    """Compiled templates plus a render cache keyed by template version and parameters"""
+
+    def __init__(
+        self,
+        builtin: Dict[str, Dict[str, str]] = BUILTIN_TEMPLATES,
+        directory: str = EMAIL_TEMPLATE_DIR,
+        cache_size: int = EMAIL_RENDER_CACHE_SIZE
+    ):
+        self.builtin = builtin
+        self.directory = directory
+        self.cache_size = cache_size
+        self.templates: Dict[str, EmailTemplate] = {}
+        self.render_cache: "OrderedDict[Tuple, RenderedEmail]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._mtimes: Dict[str, float] = {}
+        self._last_check = 0.0
+        self._version = 0
+
+        for name, spec in builtin.items():
+            self.templates[name] = self._compile(name, spec["subject"], spec["body"], spec.get("html"))
+        self._reload_files(force=True)
+
+    def _compile(self, name: str, subject: str, text: str, html_body: Optional[str]) -> EmailTemplate:
+        self._version += 1
+        return EmailTemplate(name=name, subject=subject, text=text, html=html_body, version=self._version)
+
+    def _read(self, path: str) -> Optional[str]:
+        try:
+            with open(path, encoding="utf-8") as handle:
+                return handle.read()
+        except OSError:
+            return None
+
+    def _reload_files(self, force: bool = False):
+        """Recompile templates whose files changed since the last check"""
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_check < RELOAD_CHECK_SECONDS:
+            return
+        self._last_check = now
+
+        try:
+            entries = os.listdir(self.directory)
+        except OSError as e:
+            logger.warning(f"Email template directory unavailable: {e}")
+            return
+
+        mtimes = {}
+        for entry in entries:
+            if entry.endswith((".subject", ".txt", ".html")):
+                try:
+                    mtimes[entry] = os.path.getmtime(os.path.join(self.directory, entry))
+                except OSError:
+                    continue
+        if mtimes == self._mtimes:
+            return
+
+        changed = {
+            entry.rsplit(".", 1)[0]
+            for entry in set(mtimes) | set(self._mtimes)
+            if mtimes.get(entry) != self._mtimes.get(entry)
+        }
+        self._mtimes = mtimes
+
+        for name in changed:
+            base = os.path.join(self.directory, name)
+            builtin = self.builtin.get(name, {})
+            subject = self._read(base + ".subject") or builtin.get("subject")
+            text = self._read(base + ".txt") or builtin.get("body")
+            html_body = self._read(base + ".html") or builtin.get("html")
+            if subject is None or text is None:
+                logger.warning(f"Email template {name!r} needs both a .subject and a .txt file")
+                continue
+            try:
+                self.templates[name] = self._compile(name, subject, text, html_body)
+                logger.info(f"Email template loaded: {name}")
+            except ValueError as e:
+                logger.error(f"Invalid email template {name!r}: {e}")
+
+    def get(self, name: str) -> Optional[EmailTemplate]:
+        self._reload_files()
+        return self.templates.get(name)
+
+    def keys(self):
+        return self.templates.keys()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.templates
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.templates)
+
+    def validate(self, name: str, data: Dict[str, Any]) -> EmailTemplate:
+        """Check a template exists and every placeholder has a value"""
+        template = self.get(name)
+        if template is None:
+            raise ValueError(f"Template '{name}' not found")
+        missing = template.missing_fields(data)
+        if missing:
+            raise ValueError(f"Template '{name}' is missing fields: {', '.join(sorted(missing))}")
+        return template
+
+    def render(self, name: str, data: Dict[str, Any]) -> RenderedEmail:
+        """Render a template, reusing the result for identical parameters"""
+        template = self.validate(name, data)
+        if not template.cacheable:
+            # Secrets must not outlive the send in memory
+            return template.render(data)
+        try:
+            key = (name, template.version, tuple(sorted(data.items())))
+            hash(key)
+        except TypeError:
+            # Unhashable parameters: render without caching
+            return template.render(data)
+
+        rendered = self.render_cache.get(key)
+        if rendered is not None:
+            self.render_cache.move_to_end(key)
+            self.cache_hits += 1
+            return rendered
+
+        self.cache_misses += 1
+        rendered = template.render(data)
+        self.render_cache[key] = rendered
+        if len(self.render_cache) > self.cache_size:
+            self.render_cache.popitem(last=False)
+        return rendered
+
+# Global template registry
+template_registry = TemplateRegistry()
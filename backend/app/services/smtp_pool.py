@@ -0,0 +1,121 @@
+"""
+Pooled async SMTP delivery
+Keeps a few authenticated aiosmtplib connections open and reuses them for
+successive messages, so the TCP/TLS handshake, STARTTLS and AUTH are paid
+once per connection rather than once per email. The pool size also caps
+how many messages are sent concurrently.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from email.message import Message
+from typing import AsyncIterator, List, Optional
+import aiosmtplib
+
+logger = logging.getLogger(__name__)
+
+# Failures that leave the connection unusable; the send is retried once on a fresh one
+CONNECTION_ERRORS = (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, aiosmtplib.SMTPTimeoutError, ConnectionError, OSError)
+
+class SMTPConnectionPool:
+    """Bounded pool of logged-in SMTP connections for one server and account"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        size: int = 4,
+        timeout: float = 30.0,
+        max_idle_seconds: float = 60.0,
+        validate_certs: bool = True
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.timeout = timeout
+        self.max_idle_seconds = max_idle_seconds
+        self.validate_certs = validate_certs
+        self.connections_opened = 0
+        self._idle: List[tuple] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind_loop(self):
+        # Connections belong to the loop that opened them; start over on a new loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._idle = []
+            self._slots = asyncio.Semaphore(self.size)
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.host,
+            port=self.port,
+            username=self.username or None,
+            password=self.password or None,
+            use_tls=self.port == 465,
+            timeout=self.timeout,
+            validate_certs=self.validate_certs
+        )
+        # Upgrades with STARTTLS when offered, then logs in
+        await smtp.connect()
+        self.connections_opened += 1
+        logger.debug(f"SMTP connection opened to {self.host}:{self.port}")
+        return smtp
+
+    @staticmethod
+    async def _discard(smtp: aiosmtplib.SMTP):
+        try:
+            if smtp.is_connected:
+                await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    async def _checkout(self) -> aiosmtplib.SMTP:
+        now = time.monotonic()
+        while self._idle:
+            smtp, idle_since = self._idle.pop()
+            if smtp.is_connected and now - idle_since < self.max_idle_seconds:
+                return smtp
+            await self._discard(smtp)
+        return await self._connect()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosmtplib.SMTP]:
+        """Borrow a connection; it goes back to the pool unless it broke"""
+        self._bind_loop()
+        async with self._slots:
+            smtp = await self._checkout()
+            try:
+                yield smtp
+            except (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused):
+                # The server refused this message; the session itself is fine
+                self._idle.append((smtp, time.monotonic()))
+                raise
+            except BaseException:
+                await self._discard(smtp)
+                raise
+            self._idle.append((smtp, time.monotonic()))
+
+    async def send_message(self, message: Message):
+        """Send on a pooled connection, reconnecting once if it had gone stale"""
+        for attempt in range(2):
+            try:
+                async with self.connection() as smtp:
+                    return await smtp.send_message(message)
+            except CONNECTION_ERRORS as e:
+                if attempt:
+                    raise
+                logger.info(f"SMTP connection lost ({e}), reconnecting")
+
+    async def close(self):
+        """Quit every idle connection"""
+        idle, self._idle = self._idle, []
+        for smtp, _ in idle:
+            await self._discard(smtp)
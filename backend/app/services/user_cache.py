@@ -0,0 +1,77 @@
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+from dotenv import load_dotenv
+from app.utils.metrics import metrics
+
+load_dotenv()
+
+# Short enough that role or status changes made elsewhere show up quickly
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+USER_CACHE_REQUESTS = metrics.counter(
+    "crm_user_cache_requests_total", "Current-user cache lookups by result", ("result",)
+)
+USER_CACHE_HIT_RATIO = metrics.gauge(
+    "crm_user_cache_hit_ratio", "Share of current-user lookups served from the cache"
+)
+USER_CACHE_ENTRIES = metrics.gauge(
+    "crm_user_cache_entries", "Users currently held in the cache"
+)
+
+class UserCache:
+    """Per-process TTL cache of user rows keyed by user id"""
+    
+    def __init__(self, ttl: float = USER_CACHE_TTL_SECONDS, max_entries: int = USER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+    
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached user, or None if missing or expired"""
+        entry = self.entries.get(str(user_id))
+        if entry is not None and entry[0] > time.monotonic():
+            USER_CACHE_REQUESTS.inc(result="hit")
+            return entry[1]
+        
+        if entry is not None:
+            del self.entries[str(user_id)]
+        USER_CACHE_REQUESTS.inc(result="miss")
+        return None
+    
+    def set(self, user_id: str, user: Dict[str, Any]):
+        """Cache a user for the TTL"""
+        if len(self.entries) >= self.max_entries:
+            self._prune()
+        self.entries[str(user_id)] = (time.monotonic() + self.ttl, user)
+    
+    def invalidate(self, user_id: str):
+        """Drop one user after it was written"""
+        self.entries.pop(str(user_id), None)
+    
+    def clear(self):
+        """Drop every cached user"""
+        self.entries.clear()
+    
+    def _prune(self):
+        now = time.monotonic()
+        self.entries = {key: entry for key, entry in self.entries.items() if entry[0] > now}
+        # Still full of live entries: drop the oldest insertions
+        while len(self.entries) >= self.max_entries:
+            del self.entries[next(iter(self.entries))]
+    
+    def hit_ratio(self) -> float:
+        hits = USER_CACHE_REQUESTS.get(result="hit")
+        total = hits + USER_CACHE_REQUESTS.get(result="miss")
+        return hits / total if total else 0.0
+
+# Global user cache instance
+user_cache = UserCache()
+
+def collect_user_cache_metrics():
+    """Refresh user cache gauges"""
+    USER_CACHE_HIT_RATIO.set(round(user_cache.hit_ratio(), 4))
+    USER_CACHE_ENTRIES.set(len(user_cache.entries))
+
+metrics.register_collector(collect_user_cache_metrics)
@@ -0,0 +1,150 @@
+import os
+import uuid
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from sqlalchemy import select
+from dotenv import load_dotenv
+from app.models.user import User
+from app.utils.database import AsyncSessionLocal
+from app.utils.metrics import metrics
+from app.utils.mock_database import get_mock_db
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+USER_DIRECTORY_REFRESH_SECONDS = int(os.getenv("USER_DIRECTORY_REFRESH_SECONDS", "60"))
+
+# Each refresh re-reads this far behind the watermark. updated_at is stamped when a
+# transaction writes, not when it commits, so a slow commit (or replica lag) can
+# surface a row older than a watermark already seen.
+USER_DIRECTORY_REFRESH_OVERLAP_SECONDS = float(os.getenv("USER_DIRECTORY_REFRESH_OVERLAP_SECONDS", "30"))
+
+USER_DIRECTORY_SIZE = metrics.gauge(
+    "crm_user_directory_entries", "Users held in the in-memory directory"
+)
+USER_DIRECTORY_MISSES = metrics.counter(
+    "crm_user_directory_misses_total", "Directory lookups that had to query the database"
+)
+
+class DirectoryUser(NamedTuple):
+    id: str
+    email: str
+    full_name: str
+    role: str
+    is_active: bool
+
+DIRECTORY_COLUMNS = (User.id, User.email, User.full_name, User.role, User.is_active, User.updated_at)
+
+class UserDirectory:
+    """In-memory id -> (email, full_name, role, is_active) for assignee lookups.
+    
+    Warmed once at startup, then kept fresh by pulling rows whose updated_at
+    is past the last seen value minus an overlap window; rows read twice are
+    deduplicated by id. Writes through the users router update it directly.
+    """
+    
+    def __init__(self):
+        self.users: Dict[str, DirectoryUser] = {}
+        self.watermark: Optional[datetime] = None
+        self.use_real_db = False
+        self.warmed = False
+    
+    @staticmethod
+    def _entry(row) -> DirectoryUser:
+        return DirectoryUser(
+            id=str(row["id"]),
+            email=row["email"],
+            full_name=row["full_name"],
+            role=row["role"],
+            is_active=bool(row["is_active"])
+        )
+    
+    def _absorb(self, rows: Iterable) -> int:
+        """Store rows by id, returning how many were new or changed"""
+        count = 0
+        for row in rows:
+            entry = self._entry(row)
+            if self.users.get(entry.id) != entry:
+                self.users[entry.id] = entry
+                count += 1
+            updated_at = row["updated_at"]
+            if updated_at is not None and (self.watermark is None or updated_at > self.watermark):
+                self.watermark = updated_at
+        USER_DIRECTORY_SIZE.set(len(self.users))
+        return count
+    
+    async def _load_since(self, since: Optional[datetime]) -> List:
+        if self.use_real_db:
+            query = select(*DIRECTORY_COLUMNS)
+            if since is not None:
+                query = query.where(User.updated_at >= since)
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(query)
+                return list(result.mappings())
+        
+        mock_db = await get_mock_db()
+        return await mock_db.get_users_updated_since(since)
+    
+    async def _load_ids(self, user_ids: List[str]) -> List:
+        if self.use_real_db:
+            valid_ids = []
+            for user_id in user_ids:
+                try:
+                    valid_ids.append(uuid.UUID(user_id))
+                except ValueError:
+                    continue
+            if not valid_ids:
+                return []
+            
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(select(*DIRECTORY_COLUMNS).where(User.id.in_(valid_ids)))
+                return list(result.mappings())
+        
+        mock_db = await get_mock_db()
+        return list((await mock_db.get_users_by_ids(user_ids)).values())
+    
+    async def warm(self, use_real_db: bool):
+        """Load every user; called once the database mode is known"""
+        self.use_real_db = use_real_db
+        self.users.clear()
+        self.watermark = None
+        count = self._absorb(await self._load_since(None))
+        self.warmed = True
+        logger.info(f"User directory warmed with {count} users")
+    
+    async def refresh(self) -> int:
+        """Pull users changed since the last refresh, returning how many changed"""
+        if not self.warmed:
+            await self.warm(self.use_real_db)
+            return len(self.users)
+        since = self.watermark
+        if since is not None:
+            since -= timedelta(seconds=USER_DIRECTORY_REFRESH_OVERLAP_SECONDS)
+        return self._absorb(await self._load_since(since))
+    
+    def get(self, user_id: str) -> Optional[DirectoryUser]:
+        return self.users.get(str(user_id))
+    
+    async def resolve(self, user_ids: Iterable[str]) -> Dict[str, DirectoryUser]:
+        """Look up users, fetching any the directory has not seen in one query"""
+        wanted = list(dict.fromkeys(str(user_id) for user_id in user_ids))
+        missing = [user_id for user_id in wanted if user_id not in self.users]
+        if missing:
+            USER_DIRECTORY_MISSES.inc()
+            self._absorb(await self._load_ids(missing))
+        return {user_id: self.users[user_id] for user_id in wanted if user_id in self.users}
+    
+    def upsert(self, user: Dict):
+        """Record a user written through the API"""
+        self.users[str(user["id"])] = self._entry(user)
+        USER_DIRECTORY_SIZE.set(len(self.users))
+    
+    def invalidate(self, user_id: str):
+        """Forget a user so the next lookup reloads it"""
+        self.users.pop(str(user_id), None)
+        USER_DIRECTORY_SIZE.set(len(self.users))
+
+# Global user directory instance
+user_directory = UserDirectory()
@@ -0,0 +1,60 @@
+"""
+Conditional GET support
+List endpoints derive a strong ETag from the ids and updated_at of the rows
+they are about to return, plus the query string. The validator is computed
+from the same snapshot as the response, so it is right whichever worker or
+replica served it; a 304 skips model building and serialization. Detail
+endpoints use the row's own updated_at.
+"""
+import hashlib
+from typing import Any, Dict, Iterable, List, Mapping
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Cacheable by the browser only, and always revalidated with If-None-Match
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+# Columns every list query fetches so its ETag can be computed
+VALIDATOR_FIELDS = ("id", "updated_at")
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag over the given version parts"""
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check If-None-Match against the current ETag (weak comparison, as for GET)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+
+def not_modified(etag: str) -> Response:
+    """Bodyless 304 carrying the validator"""
+    return Response(status_code=304, headers=cache_headers(etag))
+
+def with_validator_fields(fields: List[str]) -> List[str]:
+    """Selected fields plus the validator columns"""
+    return list(dict.fromkeys([*fields, *VALIDATOR_FIELDS]))
+
+def _validator_values(row: Any):
+    if isinstance(row, Mapping):
+        return row.get("id"), row.get("updated_at")
+    return row.id, row.updated_at
+
+def rows_fingerprint(rows: Iterable[Any]) -> str:
+    """Digest of each row's id and updated_at, in order (dicts or ORM rows)"""
+    digest = hashlib.sha256()
+    for row in rows:
+        row_id, updated_at = _validator_values(row)
+        digest.update(f"{row_id}|{updated_at};".encode())
+    return digest.hexdigest()
+
+def list_etag(request: Request, scope: str, rows: Iterable[Any]) -> str:
+    """ETag for a list response built from these rows"""
+    return make_etag(scope, rows_fingerprint(rows), request.url.query)
@@ -0,0 +1,78 @@
+"""
+Shared current-user dependency
+Resolves the bearer token to a user dict once per request. The row comes
+from the per-process user cache when possible, otherwise from the database
+(or mock database), and is memoized on request.state so every dependency
+and handler in the same request sees the same object.
+"""
+from typing import Any, Dict, Optional
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.user import User
+from app.services.auth_service import verify_token
+from app.services.user_cache import user_cache
+from app.utils.database import get_read_db
+from app.utils.mock_database import get_mock_db
+
+security = HTTPBearer()
+
+USER_FIELDS = ("id", "username", "email", "full_name", "role", "is_active", "created_at", "updated_at")
+
+async def load_user(request: Request, db: AsyncSession, user_id: str) -> Optional[Dict[str, Any]]:
+    """Fetch a user by id through the cache"""
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    
+    use_real_db = getattr(request.app.state, 'use_real_db', False)
+    
+    if use_real_db:
+        result = await db.execute(
+            select(*(getattr(User, field) for field in USER_FIELDS)).where(User.id == user_id)
+        )
+        row = result.mappings().first()
+        user = {**row, "id": str(row["id"])} if row else None
+    else:
+        mock_db = await get_mock_db()
+        row = await mock_db.get_user_by_id(user_id)
+        user = {field: row.get(field) for field in USER_FIELDS} if row else None
+    
+    if user is not None:
+        user_cache.set(user_id, user)
+    return user
+
+async def get_current_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_read_db)
+) -> Dict[str, Any]:
+    """Authenticated user for this request"""
+    cached = getattr(request.state, "current_user", None)
+    if cached is not None:
+        return cached
+    
+    payload = verify_token(credentials.credentials)
+    if not payload:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token"
+        )
+    
+    user_id = payload.get("sub")
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token payload"
+        )
+    
+    user = await load_user(request, db, str(user_id))
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    request.state.current_user = user
+    return user
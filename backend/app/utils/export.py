@@ -0,0 +1,72 @@
+"""
+Streaming export helpers for large tables
+Rows are pulled through a server-side cursor in fixed-size batches and
+encoded as NDJSON or CSV chunk by chunk, so memory stays flat regardless
+of table size.
+"""
+import io
+import csv
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Sequence
+from uuid import UUID
+from sqlalchemy import select
+from app.utils.database import AsyncReadSessionLocal
+
+EXPORT_FETCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _json_default(value: Any):
+    """Serialize values the json module does not handle natively"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+async def stream_table_batches(table, fetch_size: int = EXPORT_FETCH_SIZE) -> AsyncIterator[Sequence[Dict[str, Any]]]:
+    """Yield batches of row mappings from a server-side cursor"""
+    async with AsyncReadSessionLocal() as session:
+        result = await session.stream(
+            select(table).execution_options(yield_per=fetch_size)
+        )
+        async for partition in result.mappings().partitions():
+            yield partition
+
+async def encode_ndjson(batches: AsyncIterator[Sequence[Dict[str, Any]]], columns: List[str]) -> AsyncIterator[str]:
+    """Encode row batches as newline-delimited JSON, one chunk per batch"""
+    async for batch in batches:
+        yield "".join(
+            json.dumps({column: row.get(column) for column in columns}, default=_json_default) + "\n"
+            for row in batch
+        )
+
+async def encode_csv(batches: AsyncIterator[Sequence[Dict[str, Any]]], columns: List[str]) -> AsyncIterator[str]:
+    """Encode row batches as CSV with a header row, one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    async for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(row.get(column)) for column in columns] for row in batch)
+        yield buffer.getvalue()
+
+def encode_export(batches: AsyncIterator[Sequence[Dict[str, Any]]], columns: List[str], export_format: str) -> AsyncIterator[str]:
+    """Pick the encoder for the requested export format"""
+    if export_format == "csv":
+        return encode_csv(batches, columns)
+    return encode_ndjson(batches, columns)
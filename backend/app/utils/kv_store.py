@@ -0,0 +1,306 @@
+"""
+Shared key-value store
+A small async get/set/incr/expire/lock interface with two backends:
+an in-process LRU with TTL eviction (the default, one worker only) and a
+Redis-protocol client for state that has to be shared between workers.
+The backend is picked from CACHE_URL (memory:// or redis://host:port/db),
+so rate limiting and caches built on kv_store move between them without
+changes at the call sites.
+"""
+import os
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, Optional, Tuple, Union
+from urllib.parse import urlparse, unquote
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CACHE_URL = os.getenv("CACHE_URL", "memory://")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "100000"))
+CACHE_POOL_SIZE = int(os.getenv("CACHE_POOL_SIZE", "10"))
+
+# Releases a lock only if it still holds our token
+UNLOCK_SCRIPT = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then "
+    "return redis.call('del', KEYS[1]) else return 0 end"
+)
+
+# INCRBY, then set a TTL only if the key has none; one round trip and atomic.
+# (PEXPIRE ... NX would do the same but needs Redis 7.)
+INCR_SCRIPT = (
+    "local value = redis.call('incrby', KEYS[1], ARGV[1]) "
+    "if redis.call('pttl', KEYS[1]) == -1 then redis.call('pexpire', KEYS[1], ARGV[2]) end "
+    "return value"
+)
+
+Value = Union[str, bytes, int, float]
+
+class KVStoreError(Exception):
+    """Backend failure or protocol error"""
+
+class LockNotAcquired(KVStoreError):
+    """A lock could not be acquired before the timeout"""
+
+class KVStore:
+    """Interface shared by the cache backends. Values are stored as strings."""
+
+    async def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Value, ttl: Optional[float] = None, nx: bool = False) -> bool:
+        """Store a value; with nx=True only if the key does not exist"""
+        raise NotImplementedError
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Increment a counter; ttl is applied when the counter is created"""
+        raise NotImplementedError
+
+    async def expire(self, key: str, ttl: float) -> bool:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def _release(self, key: str, token: str):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    @asynccontextmanager
+    async def lock(self, key: str, ttl: float = 10.0, timeout: Optional[float] = None, poll_interval: float = 0.05) -> AsyncIterator[str]:
+        """Mutual exclusion across everything sharing this store.
+
+        ttl bounds how long a crashed holder can keep the lock; timeout=None
+        waits forever, 0 tries once.
+        """
+        token = uuid.uuid4().hex
+        lock_key = f"lock:{key}"
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while not await self.set(lock_key, token, ttl=ttl, nx=True):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise LockNotAcquired(f"Could not acquire lock {key!r}")
+            await asyncio.sleep(poll_interval)
+
+        try:
+            yield token
+        finally:
+            await self._release(lock_key, token)
+
+def _to_str(value: Value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+class MemoryKVStore(KVStore):
+    """In-process LRU with per-key TTL; expired keys are dropped lazily"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+
+    def _live(self, key: str) -> Optional[Tuple[str, Optional[float]]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: str, value: str, expires_at: Optional[float]):
+        self.entries[key] = (value, expires_at)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            now = time.monotonic()
+            expired = [k for k, (_, at) in self.entries.items() if at is not None and at <= now]
+            for k in expired:
+                del self.entries[k]
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._live(key)
+        return entry[0] if entry else None
+
+    async def set(self, key: str, value: Value, ttl: Optional[float] = None, nx: bool = False) -> bool:
+        if nx and self._live(key) is not None:
+            return False
+        self._store(key, _to_str(value), time.monotonic() + ttl if ttl is not None else None)
+        return True
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        entry = self._live(key)
+        if entry is None:
+            value, expires_at = amount, (time.monotonic() + ttl if ttl is not None else None)
+        else:
+            try:
+                value = int(entry[0]) + amount
+            except ValueError:
+                raise KVStoreError(f"Value at {key!r} is not an integer")
+            expires_at = entry[1]
+        self._store(key, str(value), expires_at)
+        return value
+
+    async def expire(self, key: str, ttl: float) -> bool:
+        entry = self._live(key)
+        if entry is None:
+            return False
+        self.entries[key] = (entry[0], time.monotonic() + ttl)
+        return True
+
+    async def delete(self, key: str) -> bool:
+        return self.entries.pop(key, None) is not None
+
+    async def _release(self, key: str, token: str):
+        entry = self._live(key)
+        if entry is not None and entry[0] == token:
+            del self.entries[key]
+
+class RedisKVStore(KVStore):
+    """Minimal RESP client with a small connection pool.
+
+    Speaks the plain Redis protocol over asyncio streams, so it works with
+    Redis, Valkey, KeyDB or a local stand-in without a client dependency.
+    """
+
+    def __init__(self, url: str, pool_size: int = CACHE_POOL_SIZE, connect_timeout: float = 5.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.connect_timeout = connect_timeout
+        self.pool_size = pool_size
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(pool_size)
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.connect_timeout
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise KVStoreError(f"Cannot connect to {self.host}:{self.port}: {e}") from e
+
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.username, self.password) if self.username else ("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            await self._roundtrip(reader, writer, setup)
+        return reader, writer
+
+    @staticmethod
+    def _encode(command: Tuple[Any, ...]) -> bytes:
+        parts = [f"*{len(command)}\r\n".encode()]
+        for arg in command:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        return b"".join(parts)
+
+    @classmethod
+    async def _read_reply(cls, reader: asyncio.StreamReader) -> Any:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            return KVStoreError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = await reader.readexactly(length + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [await cls._read_reply(reader) for _ in range(length)]
+        raise KVStoreError(f"Unexpected reply: {line!r}")
+
+    async def _roundtrip(self, reader, writer, commands: List[Tuple[Any, ...]]) -> List[Any]:
+        # Pipelined: every command goes out in one write, replies come back in order
+        writer.write(b"".join(self._encode(command) for command in commands))
+        await writer.drain()
+        replies = [await self._read_reply(reader) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, KVStoreError):
+                raise reply
+        return replies
+
+    async def pipeline(self, *commands: Tuple[Any, ...]) -> List[Any]:
+        """Run raw commands in one round trip"""
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else await self._connect()
+            try:
+                replies = await self._roundtrip(*connection, list(commands))
+            except KVStoreError:
+                # Server-side errors leave the connection usable
+                self._idle.append(connection)
+                raise
+            except (OSError, ConnectionError, asyncio.IncompleteReadError) as e:
+                connection[1].close()
+                raise KVStoreError(f"Redis connection lost: {e}") from e
+            except BaseException:
+                # Cancelled mid-reply: the stream position is unknown
+                connection[1].close()
+                raise
+            self._idle.append(connection)
+            return replies
+
+    async def execute(self, *command: Any) -> Any:
+        return (await self.pipeline(command))[0]
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.execute("GET", key)
+
+    async def set(self, key: str, value: Value, ttl: Optional[float] = None, nx: bool = False) -> bool:
+        command: List[Any] = ["SET", key, value]
+        if ttl is not None:
+            command += ["PX", max(1, int(ttl * 1000))]
+        if nx:
+            command.append("NX")
+        return await self.execute(*command) == "OK"
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        if ttl is None:
+            return await self.execute("INCRBY", key, amount)
+        return await self.execute("EVAL", INCR_SCRIPT, 1, key, amount, max(1, int(ttl * 1000)))
+
+    async def expire(self, key: str, ttl: float) -> bool:
+        return await self.execute("PEXPIRE", key, max(1, int(ttl * 1000))) == 1
+
+    async def delete(self, key: str) -> bool:
+        return await self.execute("DEL", key) == 1
+
+    async def _release(self, key: str, token: str):
+        await self.execute("EVAL", UNLOCK_SCRIPT, 1, key, token)
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+def create_kv_store(url: str = CACHE_URL) -> KVStore:
+    """Build the backend named by a memory:// or redis:// URL"""
+    scheme = urlparse(url).scheme
+    if scheme in ("", "memory"):
+        return MemoryKVStore()
+    if scheme in ("redis", "valkey"):
+        return RedisKVStore(url)
+    raise ValueError(f"Unsupported cache backend: {url}")
+
+# Global shared store
+kv_store = create_kv_store()
@@ -2,16 +2,23 @@
 Mock database for development when real database is not accessible
 This allows us to continue development and testing
 """
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any
+import asyncio
 import uuid
 from datetime import datetime
 from app.schemas.user import UserResponse, UserCredentials, UserRole
+from app.utils.query_optimizer import encode_cursor, decode_cursor, project_rows
 
 class MockDatabase:
     def __init__(self):
         # Mock data storage
         self.users = []
         self.leads = []
+        
+        # Unique-key indexes over users, like the real table's unique constraints
+        self.users_by_id: Dict[str, Dict[str, Any]] = {}
+        self.users_by_username: Dict[str, Dict[str, Any]] = {}
+        self.users_by_email: Dict[str, Dict[str, Any]] = {}
         self.tasks = []
         self.sessions = []
         
@@ -34,43 +41,88 @@ class MockDatabase:
             "updated_at": datetime.utcnow(),
             "created_by": None
         }
-        self.users.append(admin_user)
+        self._add_user(admin_user)
+    
+    def _add_user(self, user: Dict[str, Any]):
+        self.users.append(user)
+        self.users_by_id[user["id"]] = user
+        self.users_by_username[user["username"]] = user
+        self.users_by_email[user["email"]] = user
+    
+    @staticmethod
+    def _keyset_page(rows: List[Dict[str, Any]], limit: int, cursor: Optional[str] = None, max_page_size: int = 100, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Page rows newest first by (created_at, id), mirroring the SQL keyset query"""
+        limit = min(limit, max_page_size)
+        ordered = sorted(rows, key=lambda row: (row["created_at"], str(row["id"])), reverse=True)
+        
+        if cursor:
+            position = decode_cursor(cursor)
+            ordered = [row for row in ordered if (row["created_at"], str(row["id"])) < position]
+        
+        items = ordered[:limit]
+        next_cursor = None
+        if len(ordered) > limit:
+            next_cursor = encode_cursor(items[-1]["created_at"], items[-1]["id"])
+        
+        if fields:
+            items = project_rows(items, fields)
+        
+        return {
+            "items": items,
+            "next_cursor": next_cursor,
+            "limit": limit
+        }
+    
+    @staticmethod
+    async def _iter_batches(rows: List[Dict[str, Any]], batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield rows in fixed-size batches, handing control back to the loop between them"""
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+            await asyncio.sleep(0)
     
     async def get_user_by_username(self, username: str) -> Optional[Dict[str, Any]]:
         """Get user by username"""
-        for user in self.users:
-            if user["username"] == username:
-                return user
-        return None
+        return self.users_by_username.get(username)
     
     async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
         """Get user by email"""
-        for user in self.users:
-            if user["email"] == email:
-                return user
-        return None
+        return self.users_by_email.get(email)
     
     async def create_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create new user"""
+        """Create new user; the username and email must not be taken"""
+        if user_data["username"] in self.users_by_username or user_data["email"] in self.users_by_email:
+            raise ValueError("Username or email already exists")
+        
         new_user = {
             "id": str(uuid.uuid4()),
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow(),
             **user_data
         }
-        self.users.append(new_user)
+        self._add_user(new_user)
         return new_user
     
     async def get_all_users(self) -> List[Dict[str, Any]]:
         """Get all active users"""
         return [user for user in self.users if user.get("is_active", True)]
     
+    async def get_users_page(self, limit: int, cursor: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get a keyset page of active users"""
+        return self._keyset_page(await self.get_all_users(), limit, cursor, fields=fields)
+    
     async def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user by ID"""
-        for user in self.users:
-            if user["id"] == user_id:
-                return user
-        return None
+        return self.users_by_id.get(user_id)
+    
+    async def get_users_by_ids(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get users by ID in one pass, keyed by ID"""
+        return {user_id: self.users_by_id[user_id] for user_id in user_ids if user_id in self.users_by_id}
+    
+    async def get_users_updated_since(self, since: Optional[datetime]) -> List[Dict[str, Any]]:
+        """Get users changed at or after a timestamp (all users when None)"""
+        if since is None:
+            return list(self.users)
+        return [user for user in self.users if user["updated_at"] >= since]
     
     async def create_lead(self, lead_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create new lead"""
@@ -83,10 +135,27 @@ class MockDatabase:
         self.leads.append(new_lead)
         return new_lead
     
+    async def bulk_create_leads(self, leads_data: List[Dict[str, Any]]) -> int:
+        """Create many leads at once"""
+        now = datetime.utcnow()
+        self.leads.extend(
+            {"id": str(uuid.uuid4()), "created_at": now, "updated_at": now, **lead_data}
+            for lead_data in leads_data
+        )
+        return len(leads_data)
+    
     async def get_all_leads(self) -> List[Dict[str, Any]]:
         """Get all leads"""
         return self.leads
     
+    async def get_leads_page(self, limit: int, cursor: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get a keyset page of leads"""
+        return self._keyset_page(self.leads, limit, cursor, fields=fields)
+    
+    def iter_lead_batches(self, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream leads in batches for export"""
+        return self._iter_batches(self.leads, batch_size)
+    
     async def create_task(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create new task"""
         new_task = {
@@ -98,10 +167,28 @@ class MockDatabase:
         self.tasks.append(new_task)
         return new_task
     
+    async def bulk_create_tasks(self, tasks_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create many tasks at once"""
+        now = datetime.utcnow()
+        new_tasks = [
+            {"id": str(uuid.uuid4()), "created_at": now, "updated_at": now, **task_data}
+            for task_data in tasks_data
+        ]
+        self.tasks.extend(new_tasks)
+        return new_tasks
+    
     async def get_all_tasks(self) -> List[Dict[str, Any]]:
         """Get all tasks"""
         return self.tasks
     
+    async def get_tasks_page(self, limit: int, cursor: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get a keyset page of tasks"""
+        return self._keyset_page(self.tasks, limit, cursor, fields=fields)
+    
+    def iter_task_batches(self, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream tasks in batches for export"""
+        return self._iter_batches(self.tasks, batch_size)
+    
     async def get_lead_by_id(self, lead_id: str) -> Optional[Dict[str, Any]]:
         """Get lead by ID"""
         for lead in self.leads:
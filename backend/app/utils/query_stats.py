@@ -0,0 +1,77 @@
+"""
+Per-request SQL query accounting
+Engine cursor events add each statement's count and duration to a
+QueryStats object held in a contextvar, which the query stats middleware
+sets up per request. Endpoints can declare a query budget with
+@query_budget(n) so N+1 regressions are caught in tests and benchmarks.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional
+from sqlalchemy import event
+
+# "warn" logs over-budget requests, "strict" fails them with a 500, "off" skips the check
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "warn").lower()
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block runs more queries than its declared budget"""
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Stats for the request or block currently being tracked, if any"""
+    return _current_stats.get()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+
+def install_query_counter(engine):
+    """Attach the counting listeners to an engine (sync or async) once"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+@contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """Track the queries issued inside the block"""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+@contextmanager
+def assert_query_budget(max_queries: int) -> Iterator[QueryStats]:
+    """Fail the block if it issues more than max_queries statements"""
+    with count_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        raise QueryBudgetExceeded(f"Expected at most {max_queries} queries, ran {stats.count}")
+
+def query_budget(max_queries: int):
+    """Declare the maximum number of queries an endpoint may run per request"""
+    def decorator(func):
+        func.__query_budget__ = max_queries
+        return func
+    return decorator
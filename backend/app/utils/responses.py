@@ -0,0 +1,20 @@
+"""
+Fast JSON responses for hot read endpoints
+Plain row dicts are serialized straight to bytes with orjson, skipping
+Pydantic model construction and FastAPI's response_model re-validation.
+"""
+from typing import Any, Mapping, Optional
+import orjson
+from starlette.responses import Response
+
+# Match Pydantic's output for UTC timestamps ("...Z" rather than "+00:00")
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """Serialize rows to JSON bytes and wrap them in a raw Response"""
+    return Response(
+        content=orjson.dumps(content, default=str, option=ORJSON_OPTIONS),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json"
+    )
@@ -0,0 +1,261 @@
+"""
+Slow query log
+Every statement is timed through engine cursor events. Statements slower
+than the runtime-adjustable threshold are normalized (literals and bind
+placeholders stripped) and kept in a bounded table of the slowest N shapes
+with counts and latency percentiles. A sample of offending SELECTs is
+re-run with EXPLAIN (ANALYZE, BUFFERS) in the background so the plan is at
+hand when looking at the admin endpoint.
+"""
+import os
+import re
+import time
+import random
+import asyncio
+import contextvars
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "50"))
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0.1"))
+
+# Per-statement latency samples kept for percentiles
+SAMPLES_PER_STATEMENT = 200
+
+# Re-explain a statement at most this often
+EXPLAIN_INTERVAL_SECONDS = 300
+
+# Plans longer than this are not worth waiting for
+EXPLAIN_TIMEOUT_MS = 5000
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND_PARAM = re.compile(r"\$\d+|%\(\w+\)s|%s|:\w+|\?")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES\s*\([^()]*\)(?:\s*,\s*\([^()]*\))*", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_statement(statement: str) -> str:
+    """Reduce a SQL statement to its shape so executions group together"""
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _BIND_PARAM.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (...)", normalized)
+    normalized = _VALUES_LIST.sub("VALUES (...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(percentile / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def _is_explainable(statement: str) -> bool:
+    """EXPLAIN ANALYZE executes the statement, so only read-only queries qualify"""
+    head = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    if head not in ("SELECT", "WITH"):
+        return False
+    return not re.search(r"\b(INSERT|UPDATE|DELETE|FOR\s+UPDATE|FOR\s+SHARE)\b", statement, re.IGNORECASE)
+
+class SlowQueryEntry:
+    """Aggregated timings for one normalized statement"""
+
+    def __init__(self, statement: str):
+        self.statement = statement
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.samples: Deque[float] = deque(maxlen=SAMPLES_PER_STATEMENT)
+        self.last_seen: Optional[datetime] = None
+        self.example: Optional[str] = None
+        self.plan: Optional[str] = None
+        self.plan_captured_at: Optional[datetime] = None
+        self.explain_pending = False
+        self.last_explain_attempt = 0.0
+
+    def record(self, duration: float, example: str):
+        self.count += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        self.samples.append(duration)
+        self.last_seen = datetime.utcnow()
+        self.example = example
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        return {
+            'statement': self.statement,
+            'count': self.count,
+            'total_ms': round(self.total_time * 1000, 2),
+            'mean_ms': round(self.total_time / self.count * 1000, 2) if self.count else 0.0,
+            'max_ms': round(self.max_time * 1000, 2),
+            'p50_ms': round(_percentile(ordered, 50) * 1000, 2),
+            'p95_ms': round(_percentile(ordered, 95) * 1000, 2),
+            'p99_ms': round(_percentile(ordered, 99) * 1000, 2),
+            'last_seen': self.last_seen.isoformat() if self.last_seen else None,
+            'plan': self.plan,
+            'plan_captured_at': self.plan_captured_at.isoformat() if self.plan_captured_at else None,
+        }
+
+class SlowQueryLog:
+    """Keeps the slowest N statement shapes seen above the threshold"""
+
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+        max_entries: int = SLOW_QUERY_LOG_SIZE,
+        explain_sample_rate: float = SLOW_QUERY_EXPLAIN_SAMPLE_RATE
+    ):
+        self.threshold = threshold_ms / 1000
+        self.max_entries = max_entries
+        self.explain_sample_rate = explain_sample_rate
+        self.entries: Dict[str, SlowQueryEntry] = {}
+        self.total_slow = 0
+        self._explain_tasks: set = set()
+        self._async_engines: Dict[Any, Any] = {}
+
+    @property
+    def threshold_ms(self) -> float:
+        return self.threshold * 1000
+
+    def configure(
+        self,
+        threshold_ms: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        explain_sample_rate: Optional[float] = None
+    ):
+        """Adjust settings at runtime"""
+        if threshold_ms is not None:
+            self.threshold = threshold_ms / 1000
+        if explain_sample_rate is not None:
+            self.explain_sample_rate = explain_sample_rate
+        if max_entries is not None:
+            self.max_entries = max_entries
+            while len(self.entries) > self.max_entries:
+                self._evict()
+
+    def install(self, engine):
+        """Time every statement run through the engine (sync or async) once"""
+        sync_engine = getattr(engine, "sync_engine", engine)
+        if sync_engine is not engine:
+            self._async_engines[sync_engine] = engine
+        if not event.contains(sync_engine, "before_cursor_execute", self._before_cursor_execute):
+            event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get("slow_query_start_time")
+        if not start_times:
+            return
+        duration = time.perf_counter() - start_times.pop()
+        if duration < self.threshold or conn.info.get("slow_query_explain"):
+            return
+
+        entry = self.record(statement, duration)
+        if entry is not None and not executemany and self._should_explain(entry):
+            self._schedule_explain(conn.engine, entry, statement, parameters)
+
+    def record(self, statement: str, duration: float) -> Optional[SlowQueryEntry]:
+        """Add one slow execution; returns its entry unless it was too fast to keep"""
+        self.total_slow += 1
+        key = normalize_statement(statement)
+        entry = self.entries.get(key)
+        if entry is None:
+            if len(self.entries) >= self.max_entries:
+                # The table holds the slowest shapes; a newcomer only gets in
+                # by beating the current fastest one
+                fastest = min(self.entries.values(), key=lambda e: e.max_time)
+                if fastest.max_time >= duration:
+                    return None
+                self._evict()
+            entry = self.entries[key] = SlowQueryEntry(key)
+
+        entry.record(duration, statement)
+        logger.warning(f"Slow query ({duration * 1000:.1f}ms): {key[:200]}")
+        return entry
+
+    def _evict(self):
+        fastest = min(self.entries, key=lambda key: self.entries[key].max_time)
+        del self.entries[fastest]
+
+    def _should_explain(self, entry: SlowQueryEntry) -> bool:
+        if entry.explain_pending or not _is_explainable(entry.example or ""):
+            return False
+        if entry.plan is not None and time.monotonic() - entry.last_explain_attempt < EXPLAIN_INTERVAL_SECONDS:
+            return False
+        # Always explain a statement the first time, then sample
+        return entry.plan is None or random.random() < self.explain_sample_rate
+
+    def _schedule_explain(self, sync_engine, entry: SlowQueryEntry, statement: str, parameters):
+        async_engine = self._async_engines.get(sync_engine)
+        if async_engine is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        entry.explain_pending = True
+        entry.last_explain_attempt = time.monotonic()
+        # Run in an empty context so the EXPLAIN is not billed to the request
+        task = loop.create_task(
+            self._explain(async_engine, entry, statement, parameters),
+            context=contextvars.Context()
+        )
+        self._explain_tasks.add(task)
+        task.add_done_callback(self._explain_tasks.discard)
+
+    async def _explain(self, async_engine, entry: SlowQueryEntry, statement: str, parameters):
+        """Capture the plan on a separate connection and roll it back"""
+        try:
+            async with async_engine.connect() as conn:
+                conn.sync_connection.info["slow_query_explain"] = True
+                try:
+                    await conn.exec_driver_sql(f"SET LOCAL statement_timeout = {EXPLAIN_TIMEOUT_MS}")
+                    result = await conn.exec_driver_sql(
+                        f"EXPLAIN (ANALYZE, BUFFERS) {statement}",
+                        tuple(parameters) if isinstance(parameters, (list, tuple)) else parameters
+                    )
+                    entry.plan = "\n".join(row[0] for row in result)
+                    entry.plan_captured_at = datetime.utcnow()
+                finally:
+                    conn.sync_connection.info.pop("slow_query_explain", None)
+                    await conn.rollback()
+        except Exception as e:
+            logger.warning(f"Could not capture plan for slow query: {e}")
+        finally:
+            entry.explain_pending = False
+
+    def snapshot(self, sort: str = "max") -> Dict[str, Any]:
+        """Current entries, slowest first"""
+        sort_keys = {
+            'max': lambda e: e.max_time,
+            'total': lambda e: e.total_time,
+            'count': lambda e: e.count,
+            'mean': lambda e: e.total_time / e.count if e.count else 0.0,
+        }
+        key = sort_keys.get(sort, sort_keys['max'])
+        return {
+            'threshold_ms': self.threshold_ms,
+            'max_entries': self.max_entries,
+            'explain_sample_rate': self.explain_sample_rate,
+            'total_slow_queries': self.total_slow,
+            'queries': [entry.to_dict() for entry in sorted(self.entries.values(), key=key, reverse=True)],
+        }
+
+    def reset(self):
+        """Forget every recorded statement"""
+        self.entries.clear()
+        self.total_slow = 0
+
+# Global slow query log
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark enqueue-to-send latency against a local aiosmtpd sink
+Compares the old fixed-interval polling loop with the event-driven
+dispatcher. Emails arrive at random intervals, as they would from user and
+task creation. The polling interval is scaled down from 30 s to
+POLL_SECONDS so the run stays short; its latency is about half the interval
+either way.
+
+Requires aiosmtpd (pip install aiosmtpd).
+"""
+import sys
+import os
+import time
+import random
+import asyncio
+import logging
+import statistics
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+from app.services.email_service import EmailService
+
+EMAILS = 40
+MEAN_GAP = 0.05
+POLL_SECONDS = 2.0
+PORT = 8026
+
+class Sink:
+    def __init__(self):
+        self.received = {}
+
+    async def handle_DATA(self, server, session, envelope):
+        for recipient in envelope.rcpt_tos:
+            self.received[recipient] = time.perf_counter()
+        return "250 OK"
+
+def authenticator(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=True)
+
+def make_service() -> EmailService:
+    os.environ.update({"EMAIL_HOST": "127.0.0.1", "EMAIL_PORT": str(PORT), "EMAIL_USER": "crm@example.com", "EMAIL_PASS": "secret"})
+    return EmailService()
+
+async def polling(service: EmailService):
+    """The previous loop: one pass, then sleep a fixed interval"""
+    while True:
+        await service.process_email_queue()
+        await asyncio.sleep(POLL_SECONDS)
+
+async def event_driven(service: EmailService):
+    """BackgroundTaskManager._process_email_queue as it is now"""
+    while True:
+        await service.wait_for_work()
+        await service.process_email_queue()
+
+def run(sink: Sink, name: str, loop_factory) -> list:
+    sink.received.clear()
+
+    async def scenario():
+        service = make_service()
+        dispatcher = asyncio.create_task(loop_factory(service))
+        queued = {}
+        try:
+            await asyncio.sleep(0.1)
+            for i in range(EMAILS):
+                await asyncio.sleep(random.expovariate(1 / MEAN_GAP))
+                to_email = f"{name}{i}@example.com"
+                queued[to_email] = time.perf_counter()
+                service.send_task_reminder(to_email, "User", f"Task {i}", "Details", "2030-01-01", "pending")
+            while len(sink.received) < EMAILS:
+                await asyncio.sleep(0.01)
+        finally:
+            dispatcher.cancel()
+            await service.close()
+        return [sink.received[to_email] - queued_at for to_email, queued_at in queued.items()]
+
+    return asyncio.run(scenario())
+
+def report(name: str, latencies: list):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"  {name:<30} p50 {p50 * 1000:8.1f} ms   p99 {p99 * 1000:8.1f} ms")
+
+def main():
+    for name in ("mail.log", "app.services.email_service", "app.services.smtp_pool"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+    sink = Sink()
+    controller = Controller(sink, hostname="127.0.0.1", port=PORT, auth_require_tls=False, authenticator=authenticator)
+    controller.start()
+    try:
+        print(f"⏱️  Email dispatch latency ({EMAILS} emails, ~{MEAN_GAP * 1000:.0f} ms apart)")
+        report(f"polling every {POLL_SECONDS:.0f} s", run(sink, "poll", polling))
+        report("event-driven dispatcher", run(sink, "event", event_driven))
+    finally:
+        controller.stop()
+
+if __name__ == "__main__":
+    main()
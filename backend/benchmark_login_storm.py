@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark /health latency during a login storm
+A burst of concurrent logins runs against the app in-process while a probe
+requests /health every few milliseconds. With bcrypt inline every login
+freezes the event loop and the probe waits behind it; with the bcrypt pool
+the probe latency should stay flat while logins are being verified.
+"""
+import sys
+import os
+import time
+import asyncio
+import statistics
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from app.main import app
+from app.services.auth_service import password_hasher
+
+LOGINS = 24
+PROBE_INTERVAL = 0.005
+
+async def storm(workers: int):
+    password_hasher.shutdown()
+    password_hasher.workers = workers
+    password_hasher.queue_size = LOGINS
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+        await client.get("/health")
+        probes = []
+        done = asyncio.Event()
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/health")
+                probes.append(time.perf_counter() - start)
+                await asyncio.sleep(PROBE_INTERVAL)
+
+        async def login():
+            response = await client.post("/api/auth/login", json={"username": "superadmin", "password": "admin123"})
+            assert response.status_code == 200, response.text
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(LOGINS)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+
+    probes.sort()
+    return elapsed, probes
+
+def report(name: str, elapsed: float, probes):
+    p50 = statistics.median(probes) * 1000
+    p99 = probes[min(len(probes) - 1, int(len(probes) * 0.99))] * 1000
+    print(f"  {name:<8} logins {elapsed * 1000:8.0f} ms | /health n={len(probes):4d}  p50 {p50:7.1f} ms  p99 {p99:7.1f} ms  max {probes[-1] * 1000:7.1f} ms")
+
+def main():
+    print(f"⏱️  Login storm benchmark ({LOGINS} concurrent logins, /health probed every {PROBE_INTERVAL * 1000:.0f} ms)")
+    report("inline", *asyncio.run(storm(0)))
+    report("pool", *asyncio.run(storm(max(2, os.cpu_count() or 1))))
+    password_hasher.shutdown()
+
+if __name__ == "__main__":
+    main()
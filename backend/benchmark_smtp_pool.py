@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark email delivery throughput against a local aiosmtpd sink
+Compares the old path (a fresh smtplib connection and login per email)
+with the pooled aiosmtplib engine at one and several concurrent sends.
+The sink accepts AUTH without TLS and adds a small per-message delay to
+stand in for a real server's processing time.
+
+Requires aiosmtpd (pip install aiosmtpd).
+"""
+import sys
+import os
+import time
+import asyncio
+import logging
+import smtplib
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+from app.services.email_service import EmailService
+
+EMAILS = 200
+SERVER_DELAY = 0.002
+PORT = 8025
+
+class Sink:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(SERVER_DELAY)
+        self.received += 1
+        return "250 OK"
+
+def authenticator(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=True)
+
+def make_service() -> EmailService:
+    os.environ.update({"EMAIL_HOST": "127.0.0.1", "EMAIL_PORT": str(PORT), "EMAIL_USER": "crm@example.com", "EMAIL_PASS": "secret"})
+    service = EmailService()
+    for i in range(EMAILS):
+        service.send_task_reminder(f"user{i}@example.com", "User", f"Task {i}", "Details", "2030-01-01", "pending")
+    return service
+
+def per_message_connections() -> float:
+    """The previous delivery loop: connect, log in, send, quit for every email"""
+    service = make_service()
+    start = time.perf_counter()
+    for job in service.email_queue:
+        rendered = job.render()
+        server = smtplib.SMTP("127.0.0.1", PORT)
+        server.login("crm@example.com", "secret")
+        server.sendmail("crm@example.com", job.to_email, f"Subject: {rendered.subject}\r\n\r\n{rendered.text}")
+        server.quit()
+    return time.perf_counter() - start
+
+def pooled(concurrency: int) -> float:
+    import app.services.email_service as email_module
+    email_module.EMAIL_SEND_CONCURRENCY = concurrency
+    service = make_service()
+
+    async def run():
+        start = time.perf_counter()
+        stats = await service.process_email_queue()
+        elapsed = time.perf_counter() - start
+        assert stats["sent"] == EMAILS, stats
+        await service.close()
+        return elapsed
+
+    return asyncio.run(run())
+
+def report(name: str, elapsed: float):
+    print(f"  {name:<28} {elapsed * 1000:8.0f} ms  ({EMAILS / elapsed:7.0f} emails/s)")
+
+def main():
+    for name in ("mail.log", "app.services.email_service"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+    sink = Sink()
+    controller = Controller(sink, hostname="127.0.0.1", port=PORT, auth_require_tls=False, authenticator=authenticator)
+    controller.start()
+    try:
+        print(f"⏱️  SMTP delivery benchmark ({EMAILS} emails, {SERVER_DELAY * 1000:.0f} ms sink delay)")
+        report("new connection per email", per_message_connections())
+        for concurrency in (1, 4, 8):
+            report(f"pooled, {concurrency} concurrent", pooled(concurrency))
+        print(f"  sink received {sink.received} emails")
+    finally:
+        controller.stop()
+
+if __name__ == "__main__":
+    main()
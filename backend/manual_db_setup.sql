@@ -75,6 +75,25 @@ CREATE TABLE IF NOT EXISTS user_sessions (
 CREATE INDEX IF NOT EXISTS idx_user_sessions_user_id ON user_sessions(user_id);
 CREATE INDEX IF NOT EXISTS idx_user_sessions_expires_at ON user_sessions(expires_at);
 
+-- Create email outbox table; rows are written in the same transaction as the user or task
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id VARCHAR(100) PRIMARY KEY,
+    to_email VARCHAR(255) NOT NULL,
+    template_name VARCHAR(100) NOT NULL,
+    template_data JSONB NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    last_error TEXT,
+    next_attempt_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Create indexes for the outbox workers and status queries
+CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox(next_attempt_at) WHERE status IN ('pending', 'retry', 'sending');
+CREATE INDEX IF NOT EXISTS idx_email_outbox_status_created ON email_outbox(status, created_at);
+
 -- Insert default super admin user
 -- Username: superadmin, Password: admin123, Email: admin@crm.com
 INSERT INTO users (username, email, password_hash, full_name, role, is_active)
@@ -83,5 +102,5 @@ ON CONFLICT (email) DO NOTHING;
 
 -- Verify the setup
 SELECT 'Database setup completed!' as message;
-SELECT table_name FROM information_schema.tables WHERE table_schema = 'public' AND table_name IN ('users', 'leads', 'tasks', 'user_sessions') ORDER BY table_name;
+SELECT table_name FROM information_schema.tables WHERE table_schema = 'public' AND table_name IN ('users', 'leads', 'tasks', 'user_sessions', 'email_outbox') ORDER BY table_name;
 SELECT username, email, role, created_at FROM users WHERE role = 'super_admin';
\ No newline at end of file
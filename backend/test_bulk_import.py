@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Bulk lead import tests (mock database)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.mock_database import mock_db
+
+client = TestClient(app, base_url="http://localhost")
+
+def test_json_bulk_import():
+    """Test importing a JSON array with an invalid row in the middle"""
+    print("Testing JSON bulk import...")
+
+    before = len(mock_db.leads)
+    rows = [
+        {"first_name": "Ada", "last_name": "Lovelace", "created_by": "u1"},
+        {"first_name": "NoLastName", "created_by": "u1"},
+        {"first_name": "Grace", "last_name": "Hopper", "email": "not-an-email", "created_by": "u1"},
+        {"first_name": "Alan", "last_name": "Turing", "email": "alan@example.com", "created_by": "u1"},
+    ]
+
+    response = client.post("/api/leads/bulk", json=rows)
+    assert response.status_code == 200, "Bulk import failed"
+    result = response.json()
+
+    assert result["received"] == 4, "All rows should be counted"
+    assert result["created"] == 2, "Valid rows should be created"
+    assert [error["row"] for error in result["errors"]] == [2, 3], "Invalid rows should be reported by position"
+    assert len(mock_db.leads) == before + 2, "Only valid rows should be stored"
+
+    response = client.post("/api/leads/bulk", json={"first_name": "Not", "last_name": "A list"})
+    assert response.status_code == 400, "Non-array bodies should be rejected"
+
+    print("✅ JSON bulk import tests passed")
+
+def test_csv_bulk_import():
+    """Test importing leads from a CSV upload"""
+    print("Testing CSV bulk import...")
+
+    csv_text = (
+        "first_name,last_name,email,company,created_by\n"
+        "Linus,Torvalds,linus@example.com,,u1\n"
+        "Margaret,Hamilton,,NASA,u1\n"
+        ",Missing,,,u1\n"
+    )
+
+    response = client.post("/api/leads/bulk", files={"file": ("leads.csv", csv_text, "text/csv")})
+    assert response.status_code == 200, "CSV upload failed"
+    result = response.json()
+    assert result["created"] == 2, "Valid CSV rows should be created"
+    assert result["failed"] == 1, "Invalid CSV rows should be counted"
+
+    margaret = next(lead for lead in mock_db.leads if lead["first_name"] == "Margaret")
+    assert margaret["email"] is None, "Empty CSV cells should become null"
+
+    response = client.post("/api/leads/bulk", content=csv_text, headers={"Content-Type": "text/csv"})
+    assert response.json()["created"] == 2, "Raw text/csv bodies should be accepted too"
+
+    print("✅ CSV bulk import tests passed")
+
+if __name__ == "__main__":
+    test_json_bulk_import()
+    test_csv_bulk_import()
+    print("\n🎉 All bulk import tests passed!")
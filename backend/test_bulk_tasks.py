@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Bulk task creation tests (mock database)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.mock_database import mock_db
+from app.services.email_service import email_service
+
+client = TestClient(app, base_url="http://localhost")
+
+def test_bulk_task_creation():
+    """Test creating tasks for a team with one email per assignee"""
+    print("Testing bulk task creation...")
+
+    admin = mock_db.users[0]
+    worker = client.post("/api/users/", json={"email": "bulk.worker@example.com", "full_name": "Bulk Worker", "role": "sales_executive"})
+    worker_id = next(user["id"] for user in mock_db.users if user["email"] == "bulk.worker@example.com")
+    assert worker.status_code == 200, "Worker creation failed"
+
+    queued_before = len(email_service.email_queue)
+    tasks = [
+        {"title": "Weekly report", "assigned_to": worker_id, "assigned_by": admin["id"], "due_date": "2030-01-07T09:00:00"},
+        {"title": "Call back leads", "assigned_to": worker_id, "assigned_by": admin["id"], "priority": "high"},
+        {"title": "Review pipeline", "assigned_to": admin["id"], "assigned_by": admin["id"]},
+    ]
+
+    response = client.post("/api/tasks/bulk", json=tasks)
+    assert response.status_code == 200, "Bulk task creation failed"
+    created = response.json()
+    assert [task["title"] for task in created] == [task["title"] for task in tasks], "Tasks should be returned in order"
+
+    new_jobs = email_service.email_queue[queued_before:]
+    assert len(new_jobs) == 2, "Expected one email per assignee"
+    digest = next(job for job in new_jobs if job.to_email == "bulk.worker@example.com")
+    assert digest.template_name == "task_assignment_batch", "Several tasks should collapse into one digest"
+    assert "Weekly report" in digest.body and "Call back leads" in digest.body, "Digest should list every task"
+
+    response = client.post("/api/tasks/bulk", json=[{"title": "Orphan", "assigned_to": "nobody", "assigned_by": admin["id"]}])
+    assert response.status_code == 400, "Unknown assignees should be rejected"
+
+    response = client.post("/api/tasks/bulk", json=[
+        {"title": "Fine", "assigned_to": worker_id, "assigned_by": admin["id"]},
+        {"title": "Bad creator", "assigned_to": worker_id, "assigned_by": "admin"},
+    ])
+    assert response.status_code == 400, "Malformed user ids should be rejected up front"
+    assert response.json()["detail"] == [{"row": 2, "errors": ["assigned_by must be a user UUID"]}], response.json()
+
+    ghost = "00000000-0000-4000-8000-000000000000"
+    response = client.post("/api/tasks/bulk", json=[{"title": "Ghost", "assigned_to": ghost, "assigned_by": admin["id"]}])
+    assert response.status_code == 400, "Unknown assignees should be rejected"
+    assert response.json()["detail"] == [{"row": 1, "errors": ["assigned_to is not a known user"]}], response.json()
+
+    response = client.post("/api/tasks/bulk", json=[
+        {"title": "Fine", "assigned_to": worker_id, "assigned_by": admin["id"]},
+        {"title": "Ghost creator", "assigned_to": worker_id, "assigned_by": ghost},
+    ])
+    assert response.status_code == 400, "Unknown creators should be rejected before the INSERT"
+    assert response.json()["detail"] == [{"row": 2, "errors": ["assigned_by is not a known user"]}], response.json()
+
+    print("✅ Bulk task creation tests passed")
+
+if __name__ == "__main__":
+    test_bulk_task_creation()
+    print("\n🎉 All bulk task tests passed!")
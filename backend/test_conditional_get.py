@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+ETag / If-None-Match conditional GET tests (mock database)
+"""
+
+import sys
+import os
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.mock_database import mock_db
+
+client = TestClient(app, base_url="http://localhost")
+
+def test_list_not_modified():
+    """Test that unchanged lists revalidate with 304 and changes bust the ETag"""
+    print("Testing conditional list GETs...")
+
+    for path in ("/api/leads/", "/api/tasks/", "/api/users/", "/api/leads/?limit=5&fields=first_name"):
+        response = client.get(path)
+        assert response.status_code == 200, f"{path} failed"
+        etag = response.headers["etag"]
+        assert etag.startswith('"') and not etag.startswith("W/"), "ETags should be strong"
+        assert response.headers["cache-control"] == "private, no-cache", "Lists should be revalidated, not no-store"
+
+        response = client.get(path, headers={"If-None-Match": etag})
+        assert response.status_code == 304, f"{path} should be not modified"
+        assert response.content == b"", "304 responses carry no body"
+        assert response.headers["etag"] == etag
+
+        response = client.get(path, headers={"If-None-Match": f'"stale", W/{etag}'})
+        assert response.status_code == 304, "Lists of validators and weak forms should match"
+
+    etag = client.get("/api/leads/").headers["etag"]
+    assert client.get("/api/leads/?limit=5").headers["etag"] != etag, "Different queries need different ETags"
+
+    client.post("/api/leads/", json={"first_name": "Etag", "last_name": "Buster", "created_by": mock_db.users[0]["id"]})
+    response = client.get("/api/leads/", headers={"If-None-Match": etag})
+    assert response.status_code == 200, "A write should change the list ETag"
+
+    page_etag = client.get("/api/leads/?limit=5").headers["etag"]
+    tasks_etag = client.get("/api/tasks/").headers["etag"]
+    lead = max(mock_db.leads, key=lambda row: (row["created_at"], str(row["id"])))
+    lead["updated_at"] = datetime.utcnow()
+    assert client.get("/api/leads/?limit=5", headers={"If-None-Match": page_etag}).status_code == 200, "An edited row changes its page's ETag"
+    assert client.get("/api/tasks/", headers={"If-None-Match": tasks_etag}).status_code == 304, "Other tables keep their ETags"
+
+    # A write this worker never saw (another worker, or a replica catching up) still changes the ETag
+    etag = client.get("/api/leads/").headers["etag"]
+    mock_db.leads.remove(lead)
+    try:
+        assert client.get("/api/leads/", headers={"If-None-Match": etag}).status_code == 200, "The validator follows the rows served"
+    finally:
+        mock_db.leads.append(lead)
+
+    print("✅ Conditional list GET tests passed")
+
+def test_detail_not_modified():
+    """Test conditional GETs on single rows"""
+    print("Testing conditional detail GETs...")
+
+    user_id = mock_db.users[0]["id"]
+    response = client.get(f"/api/users/{user_id}")
+    etag = response.headers["etag"]
+    assert client.get(f"/api/users/{user_id}", headers={"If-None-Match": etag}).status_code == 304
+
+    print("✅ Conditional detail GET tests passed")
+
+def test_sensitive_routes_no_store():
+    """Test that no-store is kept only for sensitive routes"""
+    print("Testing cache policies...")
+
+    response = client.post("/api/auth/login", json={"username": "superadmin", "password": "admin123"})
+    assert response.status_code == 200, "Login failed"
+    assert response.headers["cache-control"].startswith("no-store"), "Auth responses must not be stored"
+    assert response.headers["pragma"] == "no-cache"
+
+    response = client.post("/api/users/", json={"email": "etag-user@example.com", "full_name": "Etag User", "role": "customer"})
+    assert response.headers["cache-control"].startswith("no-store"), "Generated credentials must not be stored"
+
+    assert "pragma" not in client.get("/api/leads/").headers
+
+    print("✅ Cache policy tests passed")
+
+if __name__ == "__main__":
+    test_list_not_modified()
+    test_detail_not_modified()
+    test_sensitive_routes_no_store()
+    print("\n🎉 All conditional GET tests passed!")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Dashboard stats summary tests (mock database)
+"""
+
+import sys
+import os
+import json
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.auth_service import create_access_token
+from app.services.dashboard_stats import dashboard_stats, SUMMARY_KEY, STATS_DRIFT
+from app.utils.kv_store import kv_store
+from app.utils.mock_database import mock_db
+
+client = TestClient(app, base_url="http://localhost")
+
+def auth_headers():
+    admin = mock_db.users[0]
+    return {"Authorization": f"Bearer {create_access_token({'sub': admin['id'], 'role': admin['role']})}"}
+
+def test_counters_follow_writes():
+    """Test creates and updates adjust the summary without a recount"""
+    print("Testing dashboard counters...")
+
+    admin = mock_db.users[0]
+    headers = auth_headers()
+    assert client.get("/api/stats/summary").status_code in (401, 403), "Summary should require a token"
+
+    before = client.get("/api/stats/summary", headers=headers).json()
+    reconciled_at = before["reconciled_at"]
+
+    lead = {"first_name": "Stat", "last_name": "Lead", "status": "qualified", "assigned_to": admin["id"], "created_by": admin["id"]}
+    assert client.post("/api/leads/", json=lead).status_code == 200
+    task = client.post("/api/tasks/", json={"title": "Count me", "assigned_to": admin["id"], "assigned_by": admin["id"], "priority": "high"}).json()
+    assert client.put(f"/api/tasks/{task['id']}", json={"status": "completed"}).status_code == 200
+
+    after = client.get("/api/stats/summary", headers=headers).json()
+    assert after["reconciled_at"] == reconciled_at, "Writes should not trigger a recount"
+    assert after["leads"]["total"] == before["leads"]["total"] + 1
+    assert after["leads"]["by_status"]["qualified"] == before["leads"]["by_status"].get("qualified", 0) + 1
+    assert after["leads"]["by_assignee"][admin["id"]] == before["leads"]["by_assignee"].get(admin["id"], 0) + 1
+    assert after["tasks"]["total"] == before["tasks"]["total"] + 1
+    assert after["tasks"]["by_status"]["completed"] == before["tasks"]["by_status"].get("completed", 0) + 1
+    assert after["tasks"]["by_status"].get("pending", 0) == before["tasks"]["by_status"].get("pending", 0), "Update should move the task out of pending"
+    assert after["tasks"]["by_priority"]["high"] == before["tasks"]["by_priority"].get("high", 0) + 1
+
+    print("✅ Dashboard counters working")
+
+def test_reconciliation_corrects_drift():
+    """Test reconciliation recomputes counts and rebuilds a missing document"""
+    print("Testing dashboard reconciliation...")
+
+    async def scenario():
+        summary = await dashboard_stats.summary()
+        expected = await dashboard_stats.reconcile()
+
+        summary["tasks"]["total"] += 42
+        await kv_store.set(SUMMARY_KEY, json.dumps(summary))
+        drift = STATS_DRIFT.get(entity="tasks")
+        corrected = await dashboard_stats.reconcile()
+        assert corrected["tasks"] == expected["tasks"], "Reconciliation should restore GROUP BY counts"
+        assert STATS_DRIFT.get(entity="tasks") == drift + 1
+
+        await kv_store.delete(SUMMARY_KEY)
+        await dashboard_stats.record_created("tasks", [{"status": "pending", "priority": "low"}])
+        rebuilt = await dashboard_stats.summary()
+        assert rebuilt["tasks"]["total"] == len(mock_db.tasks), "Missing document should be rebuilt from the tables"
+
+    asyncio.run(scenario())
+
+    print("✅ Dashboard reconciliation working")
+
+if __name__ == "__main__":
+    test_counters_follow_writes()
+    test_reconciliation_corrects_drift()
+    print("🎉 Dashboard stats tests passed")
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Event-driven email dispatch tests
+"""
+
+import sys
+import os
+import time
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy.orm import Session
+from app.services import background_tasks as background_tasks_module
+from app.services.background_tasks import BackgroundTaskManager
+from app.services.email_service import EmailService, EmailStatus
+
+def make_service():
+    """Service whose sends are recorded instead of going to SMTP"""
+    service = EmailService()
+    service._load_config = lambda: None
+    passes = []
+
+    async def fake_send(job):
+        passes[-1].append(job.to_email)
+        service._set_status(job, EmailStatus.SENT)
+        return True
+
+    original_process = service.process_email_queue
+
+    async def counting_process():
+        passes.append([])
+        return await original_process()
+
+    service._send_email = fake_send
+    service.process_email_queue = counting_process
+    return service, passes
+
+async def dispatcher(service: EmailService):
+    """Same loop as BackgroundTaskManager._process_email_queue"""
+    while True:
+        await service.wait_for_work()
+        await service.process_email_queue()
+
+def queue_reminder(service: EmailService, to_email: str) -> str:
+    return service.send_task_reminder(to_email, "User", "Task", "Details", "2030-01-01", "pending")
+
+def test_queueing_wakes_dispatcher():
+    """Test a queued email is sent right away instead of on the next poll"""
+    print("Testing dispatcher wake-up...")
+
+    async def scenario():
+        service, passes = make_service()
+        task = asyncio.create_task(dispatcher(service))
+        try:
+            await asyncio.sleep(0.05)
+            assert passes == [], "An idle dispatcher should not poll"
+
+            start = time.perf_counter()
+            email_id = queue_reminder(service, "first@example.com")
+            while service.get_email_status(email_id).status != EmailStatus.SENT:
+                await asyncio.sleep(0.001)
+            latency = time.perf_counter() - start
+            assert latency < 0.5, f"Enqueue-to-send took {latency:.3f}s"
+        finally:
+            task.cancel()
+
+    asyncio.run(scenario())
+    print("✅ Dispatcher wake-up OK")
+
+def test_burst_is_sent_in_one_pass():
+    """Test emails queued within the batch window share a pass"""
+    print("Testing micro-batching...")
+
+    async def scenario():
+        service, passes = make_service()
+        task = asyncio.create_task(dispatcher(service))
+        try:
+            await asyncio.sleep(0.01)
+            for i in range(10):
+                queue_reminder(service, f"user{i}@example.com")
+            while service.get_queue_stats()["sent"] < 10:
+                await asyncio.sleep(0.001)
+            assert len(passes) == 1, passes
+            assert len(passes[0]) == 10
+        finally:
+            task.cancel()
+
+    asyncio.run(scenario())
+    print("✅ Micro-batching OK")
+
+def test_wait_ends_when_retry_is_due():
+    """Test the dispatcher sleeps only until the earliest retry, not the idle interval"""
+    print("Testing retry wake-up...")
+
+    async def scenario():
+        service, _ = make_service()
+        service.retries = [(time.time() + 0.05, "retry-id")]
+        start = time.perf_counter()
+        await service.wait_for_work(max_wait=5)
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(scenario())
+    assert 0.04 <= elapsed < 1, elapsed
+    print("✅ Retry wake-up OK")
+
+def test_outbox_commit_wakes_dispatcher():
+    """Test staged outbox emails signal the dispatcher only once the transaction commits"""
+    print("Testing outbox commit wake-up...")
+
+    async def scenario():
+        service, _ = make_service()
+        waiter = asyncio.create_task(service.wait_for_work(max_wait=5))
+        await asyncio.sleep(0.01)
+
+        session = Session()
+        service.send_user_credentials("new@example.com", "New User", "new.user", "secret123", "sales_executive", session=session)
+        await asyncio.sleep(0.05)
+        assert not waiter.done(), "Nothing is visible before the commit"
+
+        # Drop the row so the unbound session can commit; the listener still fires
+        session.expunge_all()
+        start = time.perf_counter()
+        session.commit()
+        await waiter
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(scenario())
+    assert elapsed < 0.5, elapsed
+    print("✅ Outbox commit wake-up OK")
+
+def test_cleanup_has_its_own_loop():
+    """Test old emails are cleared on a fixed interval, independent of sends"""
+    print("Testing email cleanup loop...")
+
+    service = background_tasks_module.email_service
+    cleared = []
+    original = (background_tasks_module.EMAIL_CLEANUP_SECONDS, service.clear_old_emails, service.clear_old_outbox)
+
+    async def clear_old_outbox(days=7):
+        cleared.append(("outbox", days))
+        return 0
+
+    async def scenario():
+        manager = BackgroundTaskManager()
+        manager.running = True
+        task = asyncio.create_task(manager._clear_old_emails())
+        await asyncio.sleep(0.055)
+        manager.running = False
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    background_tasks_module.EMAIL_CLEANUP_SECONDS = 0.02
+    service.clear_old_emails = lambda days=7: cleared.append(("memory", days)) or 0
+    service.clear_old_outbox = clear_old_outbox
+    try:
+        asyncio.run(scenario())
+    finally:
+        background_tasks_module.EMAIL_CLEANUP_SECONDS, service.clear_old_emails, service.clear_old_outbox = original
+
+    assert cleared[:4] == [("memory", 7), ("outbox", 7)] * 2, cleared
+    print("✅ Email cleanup loop OK")
+
+if __name__ == "__main__":
+    print("🧪 Email Dispatch Tests")
+    print("=" * 50)
+
+    test_queueing_wakes_dispatcher()
+    test_burst_is_sent_in_one_pass()
+    test_wait_ends_when_retry_is_due()
+    test_outbox_commit_wakes_dispatcher()
+    test_cleanup_has_its_own_loop()
+
+    print("\n🎉 All email dispatch tests passed!")
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Transactional email outbox tests
+"""
+
+import sys
+import os
+import asyncio
+from datetime import datetime, timezone
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import asyncpg
+from sqlalchemy.orm import Session
+from app.models.email_outbox import EmailOutbox
+from app.services import email_service as email_service_module
+from app.services.email_outbox import claim_statement, complete_statement
+from app.services.email_templates import REDACTED_VALUE, redact_secrets
+from app.services.email_service import EmailService, EmailStatus
+
+class StandInOutbox:
+    """Outbox rows kept in a dict, with the claim/complete contract of EmailOutboxStore"""
+
+    batch_size = 50
+
+    def __init__(self, rows):
+        self.rows = {row["id"]: row for row in rows}
+        self.completed = []
+
+    async def claim(self, limit=None):
+        claimed = [row for row in self.rows.values() if row["status"] in ("pending", "retry")]
+        for row in claimed:
+            row["status"] = "sending"
+        return [dict(row) for row in claimed]
+
+    async def complete(self, outcomes):
+        for outcome in outcomes:
+            self.completed.append(outcome)
+            row = self.rows[outcome["job_id"]]
+            if outcome["new_status"] in ("sent", "failed"):
+                row["template_data"] = redact_secrets(row["template_data"])
+            row.update(
+                status=outcome["new_status"], attempts=outcome["new_attempts"],
+                last_error=outcome["new_error"], next_attempt_at=outcome["new_next_attempt_at"]
+            )
+
+    async def get(self, email_id):
+        row = self.rows.get(email_id)
+        return dict(row) if row else None
+
+    async def stats(self):
+        stats = {"total": len(self.rows), "pending": 0, "sent": 0, "failed": 0, "retry": 0}
+        for row in self.rows.values():
+            stats["pending" if row["status"] == "sending" else row["status"]] += 1
+        return stats
+
+def outbox_row(email_id, to_email, attempts=0):
+    return {
+        "id": email_id,
+        "to_email": to_email,
+        "template_name": "task_reminder",
+        "template_data": {"assignee_name": "User", "task_title": "Task", "task_description": "", "due_date": "2030-01-01", "status": "pending"},
+        "status": "retry" if attempts else "pending",
+        "attempts": attempts,
+        "max_attempts": 3,
+        "last_error": None,
+        "created_at": datetime.now(timezone.utc),
+        "sent_at": None,
+        "next_attempt_at": None
+    }
+
+def test_claim_uses_skip_locked():
+    """Test workers lease rows with FOR UPDATE SKIP LOCKED and get them back in one round trip"""
+    print("Testing claim statement...")
+
+    sql = str(claim_statement(25, 60).compile(dialect=postgresql.dialect()))
+    assert "FOR UPDATE SKIP LOCKED" in sql, sql
+    assert "RETURNING" in sql, sql
+    assert "ORDER BY email_outbox.next_attempt_at" in sql, sql
+    print("✅ Claim statement OK")
+
+def test_complete_statement_sql():
+    """Test the batched completion UPDATE compiles for executemany with typed parameters"""
+    print("Testing complete statement...")
+
+    compiled = complete_statement().compile(dialect=asyncpg.dialect())
+    sql = str(compiled)
+    assert "POSTCOMPILE" not in sql, "Expanding IN lists cannot be used with executemany"
+    assert sql.count("$1::VARCHAR") == 2, "new_status is one typed parameter, used in SET and in the CASE"
+    assert "status=$1::VARCHAR" in sql, sql
+    assert "template_data=CASE WHEN ($1::VARCHAR IN ($2::VARCHAR, $3::VARCHAR)" in sql, sql
+    assert "template_data ?| ARRAY" in sql and "ELSE email_outbox.template_data END" in sql, sql
+    assert {"sent", "failed"} <= set(compiled.params.values()), compiled.params
+    print("✅ Complete statement OK")
+
+def test_session_stages_outbox_row():
+    """Test queueing with a session adds a row to that transaction instead of memory"""
+    print("Testing outbox staging...")
+
+    service = EmailService()
+    session = Session()
+    email_id = service.send_user_credentials(
+        "new@example.com", "New User", "new.user", "secret123", "sales_executive", session=session
+    )
+
+    staged = [obj for obj in session.new if isinstance(obj, EmailOutbox)]
+    assert len(staged) == 1
+    assert staged[0].id == email_id
+    assert staged[0].status == "pending"
+    assert staged[0].template_data["username"] == "new.user"
+    assert email_id not in service.jobs
+    assert service.get_queue_stats()["total"] == 0
+
+    # Rolling back the user insert discards the email with it
+    session.rollback()
+    assert not session.new
+    print("✅ Outbox staging OK")
+
+def test_process_claims_and_completes_outbox_rows():
+    """Test a pass sends claimed rows and writes each outcome back"""
+    print("Testing outbox processing...")
+
+    outbox = StandInOutbox([
+        outbox_row("ok", "ok@example.com"),
+        outbox_row("flaky", "flaky@example.com", attempts=1),
+        outbox_row("last", "last@example.com", attempts=2)
+    ])
+    original = email_service_module.email_outbox
+    email_service_module.email_outbox = outbox
+    try:
+        service = EmailService()
+        service.use_outbox = True
+
+        async def fake_send(job):
+            if job.to_email.startswith("ok"):
+                job.sent_at = datetime.now(timezone.utc)
+                service._set_status(job, EmailStatus.SENT)
+                return True
+            job.retry_count += 1
+            job.error_message = "Mailbox busy"
+            service._set_status(job, EmailStatus.FAILED if job.retry_count >= job.max_retries else EmailStatus.RETRY)
+            return False
+
+        service._send_email = fake_send
+        stats = asyncio.run(service.process_email_queue())
+        assert stats == {"sent": 1, "failed": 1, "retried": 1}, stats
+
+        assert {outcome["job_id"]: outcome["new_status"] for outcome in outbox.completed} == {
+            "ok": "sent", "flaky": "retry", "last": "failed"
+        }
+        assert outbox.rows["flaky"]["attempts"] == 2
+
+        # Outbox jobs never enter the in-memory counters
+        assert service.get_queue_stats()["total"] == 0
+        assert asyncio.run(service.queue_stats()) == {"total": 3, "pending": 0, "sent": 1, "failed": 1, "retry": 1}
+
+        # The metrics collector reads the counts cached by the dispatcher, without a query
+        assert service.cached_queue_stats() == {"total": 3, "pending": 0, "sent": 1, "failed": 1, "retry": 1}
+        outbox.rows["ok2"] = outbox_row("ok2", "ok2@example.com")
+        asyncio.run(service.refresh_outbox_stats())
+        assert service.cached_queue_stats()["pending"] == 0, "Counts are re-read at most every EMAIL_OUTBOX_STATS_SECONDS"
+        asyncio.run(service.refresh_outbox_stats(max_age=0))
+        assert service.cached_queue_stats()["pending"] == 1
+        del outbox.rows["ok2"]
+
+        job = asyncio.run(service.find_email("flaky"))
+        assert job.status == EmailStatus.RETRY and job.retry_count == 2
+        assert asyncio.run(service.find_email("missing")) is None
+    finally:
+        email_service_module.email_outbox = original
+    print("✅ Outbox processing OK")
+
+def test_finished_emails_drop_passwords():
+    """Test sent and failed emails keep no plaintext password, in the table or in memory"""
+    print("Testing password redaction...")
+
+    row = outbox_row("welcome", "new@example.com")
+    row.update(template_name="user_credentials", template_data={
+        "full_name": "New User", "username": "new.user", "password": "secret123", "role_display": "Admin"
+    })
+    outbox = StandInOutbox([row])
+    original = email_service_module.email_outbox
+    email_service_module.email_outbox = outbox
+    try:
+        service = EmailService()
+        service.use_outbox = True
+
+        async def fake_send(job):
+            assert job.template_data["password"] == "secret123", "The email itself carries the password"
+            job.sent_at = datetime.now(timezone.utc)
+            service._set_status(job, EmailStatus.SENT)
+            return True
+
+        service._send_email = fake_send
+        asyncio.run(service.process_email_queue())
+        assert outbox.rows["welcome"]["template_data"]["password"] == REDACTED_VALUE
+        assert asyncio.run(service.find_email("welcome")).subject.startswith("Welcome")
+    finally:
+        email_service_module.email_outbox = original
+
+    service = EmailService()
+    email_id = service.send_user_credentials("new@example.com", "New User", "new.user", "secret123", "sales_executive")
+    job = service.get_email_status(email_id)
+    service._set_status(job, EmailStatus.FAILED)
+    assert job.template_data["password"] == REDACTED_VALUE
+    assert "secret123" not in job.body
+    print("✅ Password redaction OK")
+
+def test_memory_queue_without_outbox():
+    """Test mock mode still queues in memory and never touches the table"""
+    print("Testing in-memory fallback...")
+
+    service = EmailService()
+    email_id = service.send_task_reminder("user@example.com", "User", "Task", "Details", "2030-01-01", "pending")
+    assert email_id in service.jobs
+    assert asyncio.run(service.find_email(email_id)) is service.jobs[email_id]
+    assert asyncio.run(service.queue_stats()) == service.get_queue_stats()
+    assert asyncio.run(service.clear_old_outbox()) == 0
+    print("✅ In-memory fallback OK")
+
+if __name__ == "__main__":
+    print("🧪 Email Outbox Tests")
+    print("=" * 50)
+
+    test_claim_uses_skip_locked()
+    test_complete_statement_sql()
+    test_session_stages_outbox_row()
+    test_process_claims_and_completes_outbox_rows()
+    test_finished_emails_drop_passwords()
+    test_memory_queue_without_outbox()
+
+    print("\n🎉 All email outbox tests passed!")
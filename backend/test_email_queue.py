@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Indexed email queue tests
+"""
+
+import sys
+import os
+import asyncio
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.email_service import EmailService, EmailStatus
+
+def queue_reminders(service: EmailService, count: int):
+    return [
+        service.send_task_reminder(f"user{i}@example.com", "User", f"Task {i}", "Details", "2030-01-01", "pending")
+        for i in range(count)
+    ]
+
+def test_processing_touches_only_ready_jobs():
+    """Test a pass sends only ready jobs and stats stay in step"""
+    print("Testing ready queues...")
+
+    service = EmailService()
+    attempted = []
+
+    async def fake_send(job):
+        attempted.append(job.id)
+        if job.to_email.startswith("user0"):
+            service._set_status(job, EmailStatus.RETRY)
+            return False
+        service._set_status(job, EmailStatus.SENT)
+        return True
+
+    service._send_email = fake_send
+    ids = queue_reminders(service, 5)
+    assert service.get_queue_stats() == {"total": 5, "pending": 5, "sent": 0, "failed": 0, "retry": 0}
+
+    stats = asyncio.run(service.process_email_queue())
+    assert stats == {"sent": 4, "failed": 0, "retried": 1}, stats
+    assert service.get_queue_stats() == {"total": 5, "pending": 0, "sent": 4, "failed": 0, "retry": 1}
+
+    attempted.clear()
+    asyncio.run(service.process_email_queue())
+    assert attempted == [ids[0]], "Second pass should only retry the failed job"
+    assert service.get_email_status(ids[3]).status == EmailStatus.SENT
+
+    print("✅ Ready queues working")
+
+def test_clear_keeps_ids_unique():
+    """Test clearing old jobs updates counts and never reuses ids"""
+    print("Testing old job cleanup...")
+
+    service = EmailService()
+    ids = queue_reminders(service, 3)
+    for email_id in ids[:2]:
+        job = service.get_email_status(email_id)
+        job.created_at = datetime.now() - timedelta(days=30)
+    service._set_status(service.get_email_status(ids[0]), EmailStatus.SENT)
+
+    assert service.clear_old_emails(days=7) == 1, "Only the old finished job should go"
+    assert service.get_email_status(ids[0]) is None
+    assert service.get_email_status(ids[1]) is not None, "Old pending jobs are kept"
+    assert service.get_queue_stats() == {"total": 2, "pending": 2, "sent": 0, "failed": 0, "retry": 0}
+
+    new_id = queue_reminders(service, 1)[0]
+    assert new_id not in ids, "Ids should stay unique after a cleanup"
+    assert [job.id for job in service.email_queue] == ids[1:] + [new_id]
+
+    print("✅ Old job cleanup working")
+
+if __name__ == "__main__":
+    test_processing_touches_only_ready_jobs()
+    test_clear_keeps_ids_unique()
+    print("🎉 Email queue tests passed")
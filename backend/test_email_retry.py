@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Email retry backoff tests
+"""
+
+import sys
+import os
+import asyncio
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import aiosmtplib
+from app.services.email_service import EmailService, EmailStatus, is_permanent_failure, retry_delay
+
+class FailingPool:
+    """Stands in for the SMTP pool, raising the next queued error for each message"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.sent = []
+
+    async def send_message(self, message):
+        error = self.errors.pop(0) if self.errors else None
+        if error is not None:
+            raise error
+        self.sent.append(message["To"])
+
+def make_service(errors) -> EmailService:
+    service = EmailService()
+    service.password = "secret"
+    service._load_config = lambda: None
+    pool = FailingPool(errors)
+    service._get_pool = lambda: pool
+    return service
+
+def queue_reminder(service: EmailService, to_email: str = "user@example.com") -> str:
+    return service.send_task_reminder(to_email, "User", "Task", "Details", "2030-01-01", "pending")
+
+def test_retry_delay_grows_and_is_capped():
+    """Test delays double per attempt, stay within the jitter band and respect the cap"""
+    print("Testing backoff delays...")
+
+    for attempt, full in ((1, 30), (2, 60), (3, 120), (10, 3600)):
+        delays = [retry_delay(attempt, base=30, cap=3600) for _ in range(200)]
+        assert all(full / 2 <= delay <= full for delay in delays), (attempt, min(delays), max(delays))
+        assert len(set(delays)) > 1, "Delays should be jittered"
+
+    print("✅ Backoff delays OK")
+
+def test_failures_are_classified():
+    """Test 5xx replies about the message are permanent and everything else is retried"""
+    print("Testing failure classification...")
+
+    assert is_permanent_failure(aiosmtplib.SMTPResponseException(550, "No such user"))
+    assert is_permanent_failure(aiosmtplib.SMTPRecipientsRefused([aiosmtplib.SMTPRecipientRefused(550, "No such user", "a@example.com")]))
+    assert not is_permanent_failure(aiosmtplib.SMTPResponseException(451, "Try again later"))
+    assert not is_permanent_failure(aiosmtplib.SMTPAuthenticationError(535, "Bad credentials"))
+    assert not is_permanent_failure(aiosmtplib.SMTPServerDisconnected("Connection lost"))
+    assert not is_permanent_failure(ConnectionRefusedError())
+
+    print("✅ Failure classification OK")
+
+def test_permanent_failure_fails_at_once():
+    """Test a rejected recipient is not retried"""
+    print("Testing permanent failures...")
+
+    service = make_service([aiosmtplib.SMTPResponseException(550, "No such user")])
+    email_id = queue_reminder(service)
+    stats = asyncio.run(service.process_email_queue())
+
+    job = service.get_email_status(email_id)
+    assert stats == {"sent": 0, "failed": 1, "retried": 0}, stats
+    assert job.status == EmailStatus.FAILED and job.retry_count == 1
+    assert job.next_attempt_at is None
+    assert not service.retries
+
+    print("✅ Permanent failures OK")
+
+def test_transient_failure_waits_for_backoff():
+    """Test a transient failure is skipped until its next_attempt_at and then sent"""
+    print("Testing transient backoff...")
+
+    service = make_service([aiosmtplib.SMTPResponseException(451, "Try again later")])
+    email_id = queue_reminder(service)
+    before = datetime.now()
+    stats = asyncio.run(service.process_email_queue())
+    assert stats == {"sent": 0, "failed": 0, "retried": 1}, stats
+
+    job = service.get_email_status(email_id)
+    assert job.status == EmailStatus.RETRY
+    assert job.next_attempt_at >= before + timedelta(seconds=14), "First retry waits about 30s"
+
+    schedule = service.get_retry_schedule()
+    assert schedule["waiting"] == 1 and schedule["due"] == 0
+    assert schedule["next_attempt_at"] is not None
+
+    # Not due yet: the pass leaves the heap alone
+    stats = asyncio.run(service.process_email_queue())
+    assert stats == {"sent": 0, "failed": 0, "retried": 0}, stats
+    assert len(service.retries) == 1
+
+    # Once the backoff has passed it is sent
+    due = datetime.now() - timedelta(seconds=1)
+    job.next_attempt_at = due
+    service.retries = [(due.timestamp(), email_id)]
+    assert service.get_retry_schedule()["due"] == 1
+    stats = asyncio.run(service.process_email_queue())
+    assert stats == {"sent": 1, "failed": 0, "retried": 0}, stats
+    assert job.status == EmailStatus.SENT
+    assert service.get_queue_stats()["retry"] == 0
+
+    print("✅ Transient backoff OK")
+
+def test_pass_pops_only_due_retries():
+    """Test the heap hands out due retries in order and leaves later ones"""
+    print("Testing retry heap...")
+
+    service = make_service([])
+    now = datetime.now()
+    offsets = {"late": 600, "due-first": -20, "due-second": -5}
+    for name, offset in offsets.items():
+        job = service.get_email_status(queue_reminder(service, f"{name}@example.com"))
+        service.pending.clear()
+        job.next_attempt_at = now + timedelta(seconds=offset)
+        service._set_status(job, EmailStatus.RETRY)
+
+    stats = asyncio.run(service.process_email_queue())
+    assert stats["sent"] == 2, stats
+    assert service._get_pool().sent == ["due-first@example.com", "due-second@example.com"]
+    assert [email_id for _, email_id in service.retries] == [job.id for job in service.email_queue if job.to_email.startswith("late")]
+
+    print("✅ Retry heap OK")
+
+if __name__ == "__main__":
+    print("🧪 Email Retry Tests")
+    print("=" * 50)
+
+    test_retry_delay_grows_and_is_capped()
+    test_failures_are_classified()
+    test_permanent_failure_fails_at_once()
+    test_transient_failure_waits_for_backoff()
+    test_pass_pops_only_due_retries()
+
+    print("\n🎉 All email retry tests passed!")
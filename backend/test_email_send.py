@@ -60,7 +60,7 @@ def test_send_sample_email():
         
         # Process the email queue
         print("🔄 Processing email queue...")
-        stats = email_service.process_email_queue()
+        stats = asyncio.run(email_service.process_email_queue())
         
         print(f"📊 Email Stats: {stats}")
         
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Email template registry tests
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.email_templates import TemplateRegistry, template_registry
+from app.services.email_service import email_service, EmailStatus
+
+def test_validation_errors():
+    """Test unknown templates and missing parameters are rejected at queue time"""
+    print("Testing template validation...")
+
+    for name, data in [("no_such_template", {}), ("task_reminder", {"assignee_name": "Ann"})]:
+        try:
+            email_service.queue_email(name, "someone@example.com", data)
+            assert False, f"queue_email should reject {name} with {data}"
+        except ValueError:
+            pass
+
+    print("✅ Template validation working")
+
+def test_deferred_render_and_cache():
+    """Test jobs keep only parameters and identical payloads render once"""
+    print("Testing deferred rendering...")
+
+    data = {
+        "assignee_name": "Ann",
+        "task_title": "Quarterly review",
+        "task_description": "Prepare slides",
+        "due_date": "2030-01-01",
+        "status": "pending",
+        "unused": "dropped"
+    }
+    email_id = email_service.queue_email("task_reminder", "ann@example.com", data)
+    job = email_service.get_email_status(email_id)
+    assert job.status == EmailStatus.PENDING
+    assert not hasattr(job, "__dict__"), "EmailJob should use slots"
+    assert "unused" not in job.template_data, "Unused parameters should not be stored"
+
+    hits_before = template_registry.cache_hits
+    assert job.subject == "Task Reminder: Quarterly review"
+    assert "Prepare slides" in job.body and "/login" in job.body
+    assert template_registry.cache_hits > hits_before, "Second render should come from the cache"
+
+    cached = len(template_registry.render_cache)
+    rendered = template_registry.render("user_credentials", {
+        "full_name": "Ann", "username": "ann", "password": "s3cret-pass", "role_display": "Admin"
+    })
+    assert "s3cret-pass" in rendered.text
+    assert len(template_registry.render_cache) == cached, "Emails with passwords should not be cached"
+    assert all("s3cret-pass" not in str(key) for key in template_registry.render_cache)
+
+    print("✅ Deferred rendering working")
+
+def test_file_templates_reload():
+    """Test templates are loaded from disk and recompiled when they change"""
+    print("Testing file-based templates...")
+
+    with tempfile.TemporaryDirectory() as directory:
+        def write(name, content, mtime):
+            path = os.path.join(directory, name)
+            with open(path, "w") as handle:
+                handle.write(content)
+            os.utime(path, (mtime, mtime))
+
+        write("greeting.subject", "Hello {name}", 1000)
+        write("greeting.txt", "Hi {name}", 1000)
+        write("greeting.html", "<p>Hi {name}</p>", 1000)
+        registry = TemplateRegistry(builtin={}, directory=directory)
+
+        rendered = registry.render("greeting", {"name": "<Bob>"})
+        assert rendered.subject == "Hello <Bob>" and rendered.text.strip() == "Hi <Bob>"
+        assert rendered.html == "<p>Hi &lt;Bob&gt;</p>", "HTML values should be escaped"
+
+        write("greeting.txt", "Welcome {name}", 2000)
+        registry._reload_files(force=True)
+        assert registry.render("greeting", {"name": "Bob"}).text.strip() == "Welcome Bob", "Changed file should be recompiled"
+
+    print("✅ File-based templates working")
+
+if __name__ == "__main__":
+    test_validation_errors()
+    test_deferred_render_and_cache()
+    test_file_templates_reload()
+    print("🎉 Email template tests passed")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Streaming export tests for leads and tasks (mock database)
+"""
+
+import sys
+import os
+import csv
+import io
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.mock_database import mock_db
+
+client = TestClient(app, base_url="http://localhost")
+
+def test_leads_ndjson_export():
+    """Test NDJSON export of leads"""
+    print("Testing leads NDJSON export...")
+
+    for i in range(3):
+        client.post("/api/leads/", json={"first_name": f"Export{i}", "last_name": "Lead", "company": "Acme, Inc", "created_by": "u1"})
+
+    response = client.get("/api/leads/export")
+    assert response.status_code == 200, "Export request failed"
+    assert response.headers["content-type"].startswith("application/x-ndjson"), "Wrong media type"
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == len(mock_db.leads), "Export should contain every lead"
+    assert rows[0]["id"] == mock_db.leads[0]["id"], "Export should keep insertion order"
+
+    print("✅ Leads NDJSON export tests passed")
+
+def test_tasks_csv_export():
+    """Test CSV export of tasks"""
+    print("Testing tasks CSV export...")
+
+    client.post("/api/tasks/", json={"title": "Export task", "description": "line one\nline two", "assigned_to": "u1", "assigned_by": "u1"})
+
+    response = client.get("/api/tasks/export", params={"format": "csv"})
+    assert response.status_code == 200, "Export request failed"
+    assert response.headers["content-type"].startswith("text/csv"), "Wrong media type"
+    assert "tasks.csv" in response.headers["content-disposition"], "Missing attachment filename"
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == len(mock_db.tasks), "Export should contain every task"
+    assert rows[-1]["description"] == "line one\nline two", "Multiline values should survive CSV quoting"
+
+    response = client.get("/api/tasks/export", params={"format": "xml"})
+    assert response.status_code == 422, "Unknown formats should be rejected"
+
+    print("✅ Tasks CSV export tests passed")
+
+if __name__ == "__main__":
+    test_leads_ndjson_export()
+    test_tasks_csv_export()
+    print("\n🎉 All export tests passed!")
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Shared key-value store tests: in-process backend and the Redis-protocol
+backend against a local stand-in server
+"""
+
+import sys
+import os
+import time
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.middleware.rate_limit import KVRateLimiter
+from app.utils.kv_store import (
+    INCR_SCRIPT, KVStoreError, LockNotAcquired, MemoryKVStore, RedisKVStore, UNLOCK_SCRIPT, create_kv_store
+)
+
+class StandInRedis:
+    """Just enough of the Redis protocol for the store: GET, SET, INCRBY,
+    PEXPIRE, DEL, PING and EVAL of the unlock and incr scripts"""
+
+    def __init__(self):
+        self.data = {}
+        self.connections = 0
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry and entry[1] is not None and entry[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return entry
+
+    def handle(self, command):
+        name, args = command[0].upper(), command[1:]
+        if name == "PING":
+            return "+PONG"
+        if name == "GET":
+            entry = self._live(args[0])
+            return entry[0] if entry else None
+        if name == "SET":
+            key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+            if "NX" in options and self._live(key):
+                return None
+            expires_at = None
+            if "PX" in options:
+                expires_at = time.monotonic() + int(args[2 + options.index("PX") + 1]) / 1000
+            self.data[key] = (value, expires_at)
+            return "+OK"
+        if name == "INCRBY":
+            entry = self._live(args[0])
+            if entry and not entry[0].lstrip("-").isdigit():
+                return "-ERR value is not an integer or out of range"
+            value = int(entry[0] if entry else 0) + int(args[1])
+            self.data[args[0]] = (str(value), entry[1] if entry else None)
+            return value
+        if name == "PEXPIRE":
+            # No NX option, as on Redis < 7
+            if len(args) > 2:
+                return "-ERR wrong number of arguments for 'pexpire' command"
+            entry = self._live(args[0])
+            if not entry:
+                return 0
+            self.data[args[0]] = (entry[0], time.monotonic() + int(args[1]) / 1000)
+            return 1
+        if name == "EVAL" and args[0] == INCR_SCRIPT:
+            value = self.handle(["INCRBY", args[2], args[3]])
+            if isinstance(value, int) and self.data[args[2]][1] is None:
+                self.handle(["PEXPIRE", args[2], args[4]])
+            return value
+        if name == "DEL":
+            return 1 if self.data.pop(args[0], None) else 0
+        if name == "EVAL" and args[0] == UNLOCK_SCRIPT:
+            entry = self._live(args[2])
+            if entry and entry[0] == args[3]:
+                del self.data[args[2]]
+                return 1
+            return 0
+        return f"-ERR unknown command '{name}'"
+
+    @staticmethod
+    def encode(reply):
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, int):
+            return f":{reply}\r\n".encode()
+        if reply[:1] in ("+", "-"):
+            return f"{reply}\r\n".encode()
+        return f"${len(reply.encode())}\r\n{reply}\r\n".encode()
+
+    async def serve(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                command = []
+                for _ in range(int(header[1:])):
+                    length = int((await reader.readline())[1:])
+                    command.append((await reader.readexactly(length + 2))[:-2].decode())
+                writer.write(self.encode(self.handle(command)))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.serve, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+async def exercise_store(store):
+    assert await store.get("missing") is None
+    assert await store.set("greeting", "hello")
+    assert await store.get("greeting") == "hello"
+    assert not await store.set("greeting", "again", nx=True), "nx should not overwrite"
+
+    assert await store.incr("hits", ttl=60) == 1
+    assert await store.incr("hits", 4, ttl=60) == 5
+
+    await store.set("short", "x", ttl=0.05)
+    await asyncio.sleep(0.08)
+    assert await store.get("short") is None, "Keys should expire"
+
+    assert await store.expire("greeting", 0.05)
+    assert not await store.expire("missing", 1)
+    await asyncio.sleep(0.08)
+    assert await store.get("greeting") is None, "expire() should set a TTL"
+
+    assert await store.delete("hits") and not await store.delete("hits")
+
+    try:
+        await store.set("text", "abc")
+        await store.incr("text")
+        assert False, "Incrementing text should fail"
+    except KVStoreError:
+        pass
+
+    order = []
+
+    async def worker(name):
+        async with store.lock("report", ttl=5):
+            order.append(f"{name}-in")
+            await asyncio.sleep(0.02)
+            order.append(f"{name}-out")
+
+    await asyncio.gather(worker("a"), worker("b"))
+    assert order in (["a-in", "a-out", "b-in", "b-out"], ["b-in", "b-out", "a-in", "a-out"]), "Lock must serialize holders"
+
+    async with store.lock("busy", ttl=5):
+        try:
+            async with store.lock("busy", timeout=0):
+                assert False, "Lock should be held"
+        except LockNotAcquired:
+            pass
+    async with store.lock("busy", timeout=0):
+        pass
+
+def test_memory_store():
+    """Test the in-process backend, including LRU eviction"""
+    print("Testing in-process store...")
+
+    asyncio.run(exercise_store(MemoryKVStore()))
+
+    async def lru():
+        store = MemoryKVStore(max_entries=2)
+        await store.set("a", 1)
+        await store.set("b", 2)
+        await store.get("a")
+        await store.set("c", 3)
+        assert await store.get("b") is None and await store.get("a") == "1", "Least recently used key should go"
+
+    asyncio.run(lru())
+    assert isinstance(create_kv_store("memory://"), MemoryKVStore)
+    print("✅ In-process store tests passed")
+
+def test_redis_store():
+    """Test the Redis-protocol backend against the stand-in server"""
+    print("Testing Redis-protocol store...")
+
+    async def scenario():
+        server = StandInRedis()
+        port = await server.start()
+        store = create_kv_store(f"redis://127.0.0.1:{port}/0")
+        assert isinstance(store, RedisKVStore)
+        try:
+            await exercise_store(store)
+            await asyncio.gather(*(store.incr("burst") for _ in range(50)))
+            assert await store.get("burst") == "50"
+
+            # The TTL is set when the counter is created and not pushed back by later hits
+            assert await store.incr("window", ttl=60) == 1
+            first_expiry = server.data["window"][1]
+            assert first_expiry is not None, "Counters with a ttl should expire"
+            await store.incr("window", ttl=60)
+            assert server.data["window"][1] == first_expiry, "Later increments keep the original TTL"
+            assert server.connections <= store.pool_size, "Connections should be pooled"
+        finally:
+            await store.close()
+            server.server.close()
+
+        try:
+            await RedisKVStore(f"redis://127.0.0.1:{port}").get("x")
+            assert False, "A closed server should raise"
+        except KVStoreError:
+            pass
+
+    asyncio.run(scenario())
+    print("✅ Redis-protocol store tests passed")
+
+def test_rate_limiter_on_store():
+    """Test that the rate limiter runs unchanged on either backend"""
+    print("Testing rate limiter on the shared store...")
+
+    async def scenario():
+        server = StandInRedis()
+        port = await server.start()
+        for store in (MemoryKVStore(), RedisKVStore(f"redis://127.0.0.1:{port}")):
+            limiter = KVRateLimiter(store)
+            results = [await limiter.is_allowed("10.0.0.1:/api/auth/login", 5, 60) for _ in range(7)]
+            assert results.count(True) == 5, f"Only the limit should pass, got {results}"
+            assert await limiter.is_allowed("10.0.0.2:/api/auth/login", 5, 60), "Clients are limited separately"
+            await store.close()
+        server.server.close()
+
+    asyncio.run(scenario())
+    print("✅ Rate limiter tests passed")
+
+if __name__ == "__main__":
+    test_memory_store()
+    test_redis_store()
+    test_rate_limiter_on_store()
+    print("\n🎉 All key-value store tests passed!")
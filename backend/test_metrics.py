@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Metrics registry and /metrics endpoint tests
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.metrics import MetricsRegistry
+
+client = TestClient(app, base_url="http://localhost")
+
+def test_registry_rendering():
+    """Test text exposition of counters, gauges and histograms"""
+    print("Testing metrics rendering...")
+
+    registry = MetricsRegistry()
+    counter = registry.counter("jobs_total", "Jobs", ("kind",))
+    gauge = registry.gauge("queue_depth", "Depth")
+    histogram = registry.histogram("work_seconds", "Work", buckets=(0.1, 1.0))
+
+    counter.inc(kind='say "hi"')
+    counter.inc(2, kind='say "hi"')
+    registry.register_collector(lambda: gauge.set(7))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    text = registry.render()
+    assert '# TYPE jobs_total counter' in text, "Missing TYPE line"
+    assert 'jobs_total{kind="say \\"hi\\""} 3' in text, "Label values should be escaped"
+    assert "queue_depth 7" in text, "Collectors should run before rendering"
+    assert 'work_seconds_bucket{le="0.1"} 1' in text, "Buckets should be cumulative"
+    assert 'work_seconds_bucket{le="1"} 2' in text, "Buckets should be cumulative"
+    assert 'work_seconds_bucket{le="+Inf"} 3' in text, "+Inf bucket should count everything"
+    assert "work_seconds_count 3" in text, "Histogram count missing"
+
+    print("✅ Metrics rendering tests passed")
+
+def test_metrics_endpoint():
+    """Test that /metrics reports routes by template plus pool and queue gauges"""
+    print("Testing /metrics endpoint...")
+
+    client.get("/api/leads/")
+    client.get("/api/leads/does-not-exist")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200, "Metrics endpoint failed"
+    assert response.headers["content-type"].startswith("text/plain"), "Wrong content type"
+
+    text = response.text
+    assert 'route="/api/leads/{lead_id}",status="404"' in text, "Routes should be labelled by template"
+    assert 'crm_db_pool_size{pool="primary"}' in text, "Pool gauges missing"
+    assert 'crm_email_queue_jobs{status="pending"}' in text, "Email queue gauges missing"
+    assert "crm_http_requests_in_flight 0" in text, "In-flight gauge should return to zero"
+
+    print("✅ /metrics endpoint tests passed")
+
+if __name__ == "__main__":
+    test_registry_rendering()
+    test_metrics_endpoint()
+    print("\n🎉 All metrics tests passed!")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Keyset pagination tests for leads, tasks and users (mock database)
+"""
+
+import asyncio
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.mock_database import MockDatabase, mock_db
+from app.utils.query_optimizer import encode_cursor, decode_cursor
+
+client = TestClient(app, base_url="http://localhost")
+
+def test_cursor_round_trip():
+    """Test cursor encoding and decoding"""
+    print("Testing cursor round trip...")
+
+    created_at = datetime(2024, 1, 2, 3, 4, 5, 678901)
+    row_id = "0b6f6f0e-3c7a-4d5e-9a51-2f1f4f7c9b10"
+    cursor = encode_cursor(created_at, row_id)
+
+    assert decode_cursor(cursor) == (created_at, row_id), "Cursor did not round trip"
+
+    for bad_cursor in ("not-a-cursor", encode_cursor(created_at, "abc-123")):
+        try:
+            decode_cursor(bad_cursor)
+            assert False, "Invalid cursor should raise ValueError"
+        except ValueError:
+            pass
+
+    print("✅ Cursor round trip tests passed")
+
+async def _walk_mock_pages():
+    db = MockDatabase()
+    start = datetime(2024, 1, 1)
+
+    # Two leads share a timestamp so the id tie-break is exercised
+    for i in range(7):
+        lead = await db.create_lead({"first_name": f"Lead{i}", "last_name": "Test", "created_by": "u1"})
+        lead["created_at"] = start + timedelta(minutes=min(i, 5))
+
+    seen = []
+    cursor = None
+    while True:
+        page = await db.get_leads_page(3, cursor)
+        seen.extend(lead["id"] for lead in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    expected = [lead["id"] for lead in sorted(db.leads, key=lambda l: (l["created_at"], l["id"]), reverse=True)]
+    assert seen == expected, "Pages should cover every lead once, newest first"
+
+def test_mock_keyset_pages():
+    """Test walking mock leads page by page"""
+    print("Testing mock keyset pagination...")
+    asyncio.run(_walk_mock_pages())
+    print("✅ Mock keyset pagination tests passed")
+
+def test_leads_endpoint_pagination():
+    """Test cursor mode on GET /api/leads"""
+    print("Testing /api/leads pagination...")
+
+    for i in range(5):
+        client.post("/api/leads/", json={"first_name": f"Page{i}", "last_name": "Lead", "created_by": "u1"})
+
+    response = client.get("/api/leads/", params={"limit": 2})
+    assert response.status_code == 200, "Paged request failed"
+    body = response.json()
+    assert len(body["items"]) == 2, "Page size not respected"
+    assert body["next_cursor"], "Expected a next cursor"
+
+    response = client.get("/api/leads/", params={"limit": 2, "cursor": body["next_cursor"]})
+    second = response.json()
+    assert not {lead["id"] for lead in body["items"]} & {lead["id"] for lead in second["items"]}, "Pages overlap"
+
+    # Legacy list mode is unchanged
+    response = client.get("/api/leads/")
+    assert isinstance(response.json(), list), "Unpaged request should return a list"
+    assert len(response.json()) == len(mock_db.leads), "Unpaged request should return every lead"
+
+    response = client.get("/api/leads/", params={"cursor": "garbage"})
+    assert response.status_code == 400, "Invalid cursor should be rejected"
+
+    print("✅ /api/leads pagination tests passed")
+
+def test_users_endpoint_pagination():
+    """Test cursor mode on GET /api/users"""
+    print("Testing /api/users pagination...")
+
+    response = client.get("/api/users/", params={"limit": 50})
+    assert response.status_code == 200, "Paged request failed"
+    body = response.json()
+    assert body["next_cursor"] is None, "Single page should have no next cursor"
+    assert len(body["items"]) == len([u for u in mock_db.users if u.get("is_active", True)]), "Active users missing"
+
+    print("✅ /api/users pagination tests passed")
+
+if __name__ == "__main__":
+    test_cursor_round_trip()
+    test_mock_keyset_pages()
+    test_leads_endpoint_pagination()
+    test_users_endpoint_pagination()
+    print("\n🎉 All pagination tests passed!")
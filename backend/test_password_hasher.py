@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+bcrypt worker pool tests (mock database)
+"""
+
+import sys
+import os
+import time
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.auth_service import (
+    PasswordHasher, PasswordHasherBusy, PASSWORD_HASH_REJECTED, PASSWORD_REHASHES,
+    calibrate_bcrypt_rounds, configure_bcrypt_rounds, get_password_hash, password_hasher
+)
+from app.utils.mock_database import mock_db
+
+client = TestClient(app, base_url="http://localhost")
+
+def test_hashing_leaves_event_loop_free():
+    """Test the loop keeps ticking while bcrypt runs on the pool"""
+    print("Testing off-loop hashing...")
+
+    hashed = get_password_hash("secret-pass")
+    hasher = PasswordHasher(workers=2, queue_size=4)
+
+    async def scenario():
+        gaps = []
+        stop = False
+
+        async def ticker():
+            last = time.perf_counter()
+            while not stop:
+                await asyncio.sleep(0.005)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        tick_task = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        results = await asyncio.gather(*(hasher.verify("secret-pass", hashed) for _ in range(4)))
+        elapsed = time.perf_counter() - start
+        stop = True
+        await tick_task
+        return results, elapsed, max(gaps)
+
+    try:
+        results, elapsed, worst_gap = asyncio.run(scenario())
+    finally:
+        hasher.shutdown()
+
+    assert all(results), "Every verification should succeed"
+    assert worst_gap < elapsed / 4, f"Event loop stalled for {worst_gap * 1000:.0f} ms"
+
+    print("✅ Off-loop hashing working")
+
+def test_saturation_is_rejected():
+    """Test calls beyond workers + queue size are refused, and login maps that to 503"""
+    print("Testing bounded hashing queue...")
+
+    hasher = PasswordHasher(workers=1, queue_size=1)
+
+    async def scenario():
+        slow = [asyncio.create_task(hasher._run("verify", time.sleep, 0.2)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        try:
+            await hasher.verify("x", get_password_hash("x"))
+            assert False, "Third concurrent call should be rejected"
+        except PasswordHasherBusy:
+            pass
+        await asyncio.gather(*slow)
+
+    rejected = PASSWORD_HASH_REJECTED.get(operation="verify")
+    try:
+        asyncio.run(scenario())
+    finally:
+        hasher.shutdown()
+    assert PASSWORD_HASH_REJECTED.get(operation="verify") == rejected + 1
+
+    response = client.post("/api/auth/login", json={"username": "superadmin", "password": "admin123"})
+    assert response.status_code == 200, "Login should work through the pool"
+
+    password_hasher.pending = password_hasher.workers + password_hasher.queue_size
+    try:
+        response = client.post("/api/auth/login", json={"username": "superadmin", "password": "admin123"})
+    finally:
+        password_hasher.pending = 0
+    assert response.status_code == 503 and response.headers["retry-after"] == "1", "Saturated pool should return 503"
+    assert "crm_password_hash_seconds_bucket" in client.get("/metrics").text
+
+    print("✅ Bounded hashing queue working")
+
+def test_calibration_and_rehash_on_login():
+    """Test calibration stays in bounds and logins move hashes to the configured cost"""
+    print("Testing bcrypt calibration and rehash...")
+
+    result = calibrate_bcrypt_rounds(target_ms=20, min_rounds=4, max_rounds=8)
+    assert 4 <= result.rounds <= 8 and result.measured_ms > 0, f"Unexpected calibration: {result}"
+
+    admin = mock_db.users[0]
+    original_rounds = int(admin["password_hash"].split("$")[2])
+    rehashes = PASSWORD_REHASHES.get()
+    try:
+        configure_bcrypt_rounds(4)
+        for _ in range(2):
+            response = client.post("/api/auth/login", json={"username": "superadmin", "password": "admin123"})
+            assert response.status_code == 200, "Login should succeed"
+        assert admin["password_hash"].startswith("$2b$04$"), "Hash should be rewritten at the new cost"
+        assert PASSWORD_REHASHES.get() == rehashes + 1, "Only the first login should rehash"
+    finally:
+        configure_bcrypt_rounds(original_rounds)
+    assert client.post("/api/auth/login", json={"username": "superadmin", "password": "admin123"}).status_code == 200
+    assert admin["password_hash"].startswith(f"$2b${original_rounds:02d}$"), "Hash should move back to the restored cost"
+    assert "crm_bcrypt_rounds" in client.get("/metrics").text
+
+    print("✅ bcrypt calibration and rehash working")
+
+if __name__ == "__main__":
+    test_hashing_leaves_event_loop_free()
+    test_saturation_is_rejected()
+    test_calibration_and_rehash_on_login()
+    print("🎉 Password hasher tests passed")
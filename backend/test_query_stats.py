@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Per-request query counting and query budget tests
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from app.main import app
+from app.middleware.query_stats import QueryStatsMiddleware
+from app.utils.query_stats import (
+    QueryBudgetExceeded, assert_query_budget, count_queries, install_query_counter, query_budget
+)
+
+client = TestClient(app, base_url="http://localhost")
+
+engine = create_engine("sqlite://")
+install_query_counter(engine)
+install_query_counter(engine)
+
+def run_queries(n: int):
+    with engine.connect() as conn:
+        for _ in range(n):
+            conn.execute(text("SELECT 1"))
+
+def test_count_queries():
+    """Test that engine events count statements inside the tracked block only"""
+    print("Testing query counting...")
+
+    run_queries(2)
+    with count_queries() as stats:
+        run_queries(3)
+    assert stats.count == 3, "Installing twice must not double count"
+    assert stats.duration > 0, "Query time should be accumulated"
+
+    with assert_query_budget(2):
+        run_queries(2)
+    try:
+        with assert_query_budget(1):
+            run_queries(2)
+        assert False, "Budget overrun should raise"
+    except QueryBudgetExceeded:
+        pass
+
+    print("✅ Query counting tests passed")
+
+def test_server_timing_header():
+    """Test that API responses report their query count"""
+    print("Testing Server-Timing header...")
+
+    response = client.get("/api/leads/")
+    assert response.status_code == 200, "Lead list failed"
+    assert 'desc="0 queries"' in response.headers["server-timing"], "Mock mode runs no SQL"
+
+    print("✅ Server-Timing header tests passed")
+
+def test_budget_enforcement():
+    """Test warn and strict handling of endpoints over their query budget"""
+    print("Testing query budget enforcement...")
+
+    def build(mode: str) -> TestClient:
+        budget_app = FastAPI()
+
+        @budget_app.get("/cheap")
+        @query_budget(2)
+        def cheap():
+            run_queries(2)
+            return {"ok": True}
+
+        @budget_app.get("/n-plus-one")
+        @query_budget(1)
+        def n_plus_one():
+            run_queries(5)
+            return {"ok": True}
+
+        budget_app.add_middleware(QueryStatsMiddleware, mode=mode)
+        return TestClient(budget_app)
+
+    strict = build("strict")
+    response = strict.get("/cheap")
+    assert response.status_code == 200, "Endpoints within budget should pass"
+    assert 'desc="2 queries"' in response.headers["server-timing"]
+
+    response = strict.get("/n-plus-one")
+    assert response.status_code == 500, "Strict mode should fail over-budget endpoints"
+    assert response.json() == {"detail": "Query budget exceeded", "queries": 5, "budget": 1}
+
+    response = build("warn").get("/n-plus-one")
+    assert response.status_code == 200, "Warn mode should only log"
+
+    print("✅ Query budget enforcement tests passed")
+
+if __name__ == "__main__":
+    test_count_queries()
+    test_server_timing_header()
+    test_budget_enforcement()
+    print("\n🎉 All query stats tests passed!")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Read replica routing tests (no database connection required)
+"""
+
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from starlette.requests import Request
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.utils import database
+from app.utils.kv_store import MemoryKVStore
+
+def make_request(token: str = None) -> Request:
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    return Request({"type": "http", "headers": headers, "client": ("10.0.0.1", 1234)})
+
+def test_read_your_writes_tracker():
+    """Test the sticky-to-primary window"""
+    print("Testing read-your-writes tracker...")
+
+    async def scenario():
+        tracker = database.ReadYourWritesTracker(MemoryKVStore(), window=60)
+        alice, bob, anonymous = make_request("alice-token"), make_request("bob-token"), make_request()
+
+        assert not await tracker.should_use_primary(alice), "No writes yet, reads may use the replica"
+        await tracker.mark_write(alice)
+        assert await tracker.should_use_primary(alice), "Writer should read from the primary"
+        assert not await tracker.should_use_primary(bob), "Other clients should stay on the replica"
+
+        # Callers without a token share an address (NAT, proxies) and are never pinned
+        await tracker.mark_write(anonymous)
+        assert not await tracker.should_use_primary(make_request()), "Anonymous callers should stay on the replica"
+
+        expired = database.ReadYourWritesTracker(MemoryKVStore(), window=0.01)
+        await expired.mark_write(alice)
+        await asyncio.sleep(0.02)
+        assert not await expired.should_use_primary(alice), "Window should expire"
+
+        # Workers sharing a store see each other's writes
+        store = MemoryKVStore()
+        await database.ReadYourWritesTracker(store, window=60).mark_write(alice)
+        assert await database.ReadYourWritesTracker(store, window=60).should_use_primary(alice)
+
+    asyncio.run(scenario())
+
+    print("✅ Read-your-writes tracker tests passed")
+
+async def _bound_engine(dependency, request, commit=False):
+    generator = dependency(request)
+    session = await generator.__anext__()
+    bind = session.bind
+    if commit:
+        # No statements ran, so this commits without connecting
+        await session.commit()
+    await generator.aclose()
+    return bind
+
+async def _pinned_before_teardown(request):
+    """Whether a commit pins reads while the write session is still open"""
+    generator = database.get_db(request)
+    session = await generator.__anext__()
+    await session.commit()
+    try:
+        return await database.read_your_writes.should_use_primary(request)
+    finally:
+        await generator.aclose()
+
+def test_get_read_db_routing():
+    """Test that reads use the replica until the same client writes"""
+    print("Testing get_read_db routing...")
+
+    original = (database.read_engine, database.AsyncReadSessionLocal, database.read_your_writes)
+    replica = create_async_engine("postgresql+asyncpg://replica/crm")
+    database.read_engine = replica
+    database.AsyncReadSessionLocal = sessionmaker(replica, class_=AsyncSession, expire_on_commit=False)
+    database.read_your_writes = database.ReadYourWritesTracker(MemoryKVStore(), window=60)
+
+    try:
+        request = make_request("carol-token")
+        assert asyncio.run(_bound_engine(database.get_read_db, request)) is replica, "Reads should go to the replica"
+
+        asyncio.run(_bound_engine(database.get_db, request))
+        assert asyncio.run(_bound_engine(database.get_read_db, request)) is replica, "A primary session without a commit should not pin reads"
+
+        asyncio.run(_bound_engine(database.get_db, request, commit=True))
+        assert asyncio.run(_bound_engine(database.get_read_db, request)) is database.engine, "Reads after a commit should go to the primary"
+
+        # The pin must exist before the route returns, not only after dependency teardown
+        other = make_request("dave-token")
+        assert asyncio.run(_pinned_before_teardown(other)), "commit() itself should pin the caller"
+    finally:
+        database.read_engine, database.AsyncReadSessionLocal, database.read_your_writes = original
+
+    print("✅ get_read_db routing tests passed")
+
+if __name__ == "__main__":
+    test_read_your_writes_tracker()
+    test_get_read_db_routing()
+    print("\n🎉 All read replica tests passed!")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Slow query log tests
+"""
+
+import sys
+import os
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from app.main import app
+from app.services.auth_service import create_access_token
+from app.utils.mock_database import mock_db
+from app.utils.slow_query_log import SlowQueryLog, normalize_statement, slow_query_log
+
+client = TestClient(app, base_url="http://localhost")
+
+def auth_headers(role: str) -> dict:
+    """Bearer token for a mock user with this role, created on first use"""
+    user = next((user for user in mock_db.users if user["role"] == role), None)
+    if user is None:
+        user = asyncio.run(mock_db.create_user({
+            "username": f"slowlog.{role}",
+            "email": f"slowlog.{role}@example.com",
+            "password_hash": "",
+            "full_name": f"Slow Log {role}",
+            "role": role,
+            "is_active": True
+        }))
+    token = create_access_token({"sub": user["id"], "role": role})
+    return {"Authorization": f"Bearer {token}"}
+
+def test_normalize_statement():
+    """Test that literals and bind parameters collapse to one shape"""
+    print("Testing statement normalization...")
+
+    assert normalize_statement("SELECT * FROM leads WHERE id = $1 AND status = 'new'") == \
+        "SELECT * FROM leads WHERE id = ? AND status = ?"
+    assert normalize_statement("SELECT * FROM users WHERE id IN ($1, $2, $3)") == \
+        normalize_statement("SELECT * FROM users WHERE id IN ($1)")
+    assert normalize_statement("INSERT INTO tasks (title) VALUES ($1), ($2) RETURNING tasks.id") == \
+        "INSERT INTO tasks (title) VALUES (...) RETURNING tasks.id"
+    assert normalize_statement("SELECT  1\n LIMIT 20") == "SELECT ? LIMIT ?"
+
+    print("✅ Statement normalization tests passed")
+
+def test_ring_buffer_and_percentiles():
+    """Test that only the slowest shapes are kept, with percentiles"""
+    print("Testing slow query table...")
+
+    log = SlowQueryLog(threshold_ms=10, max_entries=2)
+    for ms in range(1, 101):
+        log.record("SELECT * FROM leads WHERE id = $1", ms / 1000)
+    log.record("SELECT * FROM tasks WHERE id = $1", 0.5)
+    log.record("SELECT * FROM users WHERE id = $1", 0.05)
+    assert log.record("SELECT * FROM users WHERE email = $1", 0.02) is None, "Faster shapes should not evict slower ones"
+
+    snapshot = log.snapshot()
+    statements = [query["statement"] for query in snapshot["queries"]]
+    assert statements == ["SELECT * FROM tasks WHERE id = ?", "SELECT * FROM leads WHERE id = ?"], statements
+
+    leads = snapshot["queries"][1]
+    assert leads["count"] == 100
+    assert leads["p50_ms"] == 51.0 and leads["p95_ms"] == 95.0 and leads["max_ms"] == 100.0
+
+    log.configure(max_entries=1)
+    assert len(log.entries) == 1, "Shrinking the table should evict the fastest shapes"
+
+    print("✅ Slow query table tests passed")
+
+def test_engine_hook_threshold():
+    """Test that engine events feed the log and respect the runtime threshold"""
+    print("Testing engine hook...")
+
+    log = SlowQueryLog(threshold_ms=0)
+    engine = create_engine("sqlite://")
+    log.install(engine)
+    log.install(engine)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert log.snapshot()["queries"][0]["count"] == 1, "Installing twice must not double count"
+
+    log.configure(threshold_ms=10000)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert log.snapshot()["queries"][0]["count"] == 1, "Fast queries should be ignored above the threshold"
+
+    print("✅ Engine hook tests passed")
+
+def test_admin_endpoint():
+    """Test viewing and tuning the slow query log over the API"""
+    print("Testing admin endpoint...")
+
+    assert client.get("/api/admin/slow-queries", headers=auth_headers("sales")).status_code == 403
+
+    response = client.put(
+        "/api/admin/slow-queries/settings",
+        json={"threshold_ms": 50},
+        headers=auth_headers("super_admin")
+    )
+    assert response.status_code == 200, "Settings update failed"
+    assert slow_query_log.threshold_ms == 50, "Threshold should change at runtime"
+
+    slow_query_log.record("SELECT * FROM leads WHERE status = $1", 0.2)
+    response = client.get("/api/admin/slow-queries", headers=auth_headers("admin"))
+    assert response.status_code == 200
+    assert response.json()["threshold_ms"] == 50
+    assert any(query["statement"] == "SELECT * FROM leads WHERE status = ?" for query in response.json()["queries"])
+
+    assert client.delete("/api/admin/slow-queries", headers=auth_headers("super_admin")).status_code == 200
+    assert slow_query_log.snapshot()["queries"] == []
+
+    print("✅ Admin endpoint tests passed")
+
+if __name__ == "__main__":
+    test_normalize_statement()
+    test_ring_buffer_and_percentiles()
+    test_engine_hook_threshold()
+    test_admin_endpoint()
+    print("\n🎉 All slow query log tests passed!")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Pooled SMTP delivery tests against a stand-in SMTP server
+"""
+
+import sys
+import os
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.email_service import EmailService, EmailStatus
+
+class StandInSMTP:
+    """Just enough SMTP for the pool: EHLO, AUTH PLAIN, MAIL, RCPT, DATA, RSET, NOOP, QUIT.
+    With drop_after set, each connection is closed after that many messages."""
+
+    def __init__(self, drop_after=None):
+        self.drop_after = drop_after
+        self.connections = 0
+        self.logins = 0
+        self.messages = []
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def _serve(self, reader, writer):
+        self.connections += 1
+        sent_here = 0
+
+        def reply(line):
+            writer.write(line.encode() + b"\r\n")
+
+        reply("220 stand-in ready")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            verb = line.decode().strip().split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                reply("250-stand-in")
+                reply("250 AUTH PLAIN")
+            elif verb == "AUTH":
+                self.logins += 1
+                reply("235 2.7.0 Authentication successful")
+            elif verb == "DATA":
+                reply("354 End data with <CR><LF>.<CR><LF>")
+                await writer.drain()
+                body = []
+                while (chunk := await reader.readline()) != b".\r\n":
+                    body.append(chunk)
+                self.messages.append(b"".join(body))
+                sent_here += 1
+                reply("250 OK queued")
+            elif verb == "QUIT":
+                reply("221 Bye")
+                await writer.drain()
+                break
+            else:
+                reply("250 OK")
+            await writer.drain()
+            if self.drop_after and sent_here >= self.drop_after:
+                break
+        writer.close()
+
+def make_service(port: int) -> EmailService:
+    os.environ.update({"EMAIL_HOST": "127.0.0.1", "EMAIL_PORT": str(port), "EMAIL_USER": "crm@example.com", "EMAIL_PASS": "secret"})
+    return EmailService()
+
+def queue_reminders(service: EmailService, count: int):
+    for i in range(count):
+        service.send_task_reminder(f"user{i}@example.com", "User", f"Task {i}", "Details", "2030-01-01", "pending")
+
+def test_connections_are_reused():
+    """Test many emails go out over a few logged-in connections"""
+    print("Testing pooled SMTP delivery...")
+
+    async def scenario():
+        server = StandInSMTP()
+        service = make_service(await server.start())
+        try:
+            queue_reminders(service, 20)
+            stats = await service.process_email_queue()
+            assert stats == {"sent": 20, "failed": 0, "retried": 0}, stats
+            assert len(server.messages) == 20
+            assert server.connections <= service.pool.size, "Connections should be reused"
+            assert server.logins == server.connections, "Each connection should log in once"
+        finally:
+            await service.close()
+            server.server.close()
+
+    asyncio.run(scenario())
+
+    print("✅ Pooled SMTP delivery working")
+
+def test_reconnects_after_drop():
+    """Test a connection closed by the server is replaced transparently"""
+    print("Testing SMTP reconnect...")
+
+    async def scenario():
+        server = StandInSMTP(drop_after=1)
+        service = make_service(await server.start())
+        try:
+            for i in range(3):
+                queue_reminders(service, 1)
+                await service.process_email_queue()
+            assert all(job.status == EmailStatus.SENT for job in service.email_queue), [job.error_message for job in service.email_queue]
+            assert server.connections >= 3, "Dropped connections should be reopened"
+        finally:
+            await service.close()
+            server.server.close()
+
+    asyncio.run(scenario())
+
+    print("✅ SMTP reconnect working")
+
+def teardown_module(module):
+    for key in ("EMAIL_HOST", "EMAIL_PORT", "EMAIL_USER", "EMAIL_PASS"):
+        os.environ.pop(key, None)
+
+if __name__ == "__main__":
+    try:
+        test_connections_are_reused()
+        test_reconnects_after_drop()
+    finally:
+        teardown_module(None)
+    print("🎉 SMTP pool tests passed")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Sparse fieldset (?fields=) tests for list endpoints (mock database)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from app.main import app
+from app.models.task import Task
+from app.utils.query_optimizer import parse_fields
+
+client = TestClient(app, base_url="http://localhost")
+
+def test_parse_fields():
+    """Test ?fields= parsing"""
+    print("Testing field parsing...")
+
+    allowed = ["id", "title", "status", "due_date"]
+    assert parse_fields(None, allowed) is None, "Missing fields should mean all fields"
+    assert parse_fields("title, status", allowed) == ["id", "title", "status"], "id should always be included"
+    assert parse_fields("status,id,status", allowed) == ["id", "status"], "Duplicates should be dropped"
+
+    try:
+        parse_fields("title,password_hash", allowed)
+        assert False, "Unknown fields should raise ValueError"
+    except ValueError as e:
+        assert "password_hash" in str(e), "Error should name the unknown field"
+
+    print("✅ Field parsing tests passed")
+
+def test_projected_select():
+    """Test that projection only selects the requested columns"""
+    print("Testing projected SELECT...")
+
+    query = select(Task).with_only_columns(*[Task.__table__.c[f] for f in ["id", "title"]])
+    sql = str(query.compile(dialect=postgresql.dialect()))
+    assert "description" not in sql, "Unrequested TEXT column should not be selected"
+
+    print("✅ Projected SELECT tests passed")
+
+def test_tasks_fields_endpoint():
+    """Test trimmed responses from GET /api/tasks"""
+    print("Testing /api/tasks?fields=...")
+
+    client.post("/api/tasks/", json={"title": "Sparse", "description": "long text", "assigned_to": "u1", "assigned_by": "u1"})
+
+    response = client.get("/api/tasks/", params={"fields": "title,status,due_date"})
+    assert response.status_code == 200, "Sparse request failed"
+    for task in response.json():
+        assert set(task) == {"id", "title", "status", "due_date"}, "Response should only carry requested fields"
+
+    response = client.get("/api/tasks/", params={"fields": "title", "limit": 1})
+    body = response.json()
+    assert set(body["items"][0]) == {"id", "title"}, "Paged response should be trimmed too"
+
+    response = client.get("/api/users/", params={"fields": "password_hash"})
+    assert response.status_code == 400, "Fields outside the response schema should be rejected"
+
+    print("✅ /api/tasks?fields= tests passed")
+
+if __name__ == "__main__":
+    test_parse_fields()
+    test_projected_select()
+    test_tasks_fields_endpoint()
+    print("\n🎉 All sparse fieldset tests passed!")
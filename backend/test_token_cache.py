@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Verified-JWT cache tests
+"""
+
+import sys
+import os
+import time
+from datetime import timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.auth_service import (
+    TOKEN_CACHE_REQUESTS, TokenCache, create_access_token, revoke_token, token_cache, verify_token
+)
+
+client = TestClient(app, base_url="http://localhost")
+
+def test_cached_verification():
+    """Test that a token is decoded once and then served from the cache"""
+    print("Testing verified token cache...")
+
+    token = create_access_token({"sub": "user-1", "role": "admin"})
+    hits = TOKEN_CACHE_REQUESTS.get(result="hit")
+
+    first = verify_token(token)
+    first["role"] = "super_admin"
+    second = verify_token(token)
+    assert second["sub"] == "user-1", "Cached payload should match"
+    assert second["role"] == "admin", "Callers must not be able to alter cached payloads"
+    assert TOKEN_CACHE_REQUESTS.get(result="hit") == hits + 1, "Second verification should hit"
+
+    assert verify_token(token + "x") is None, "Tampered tokens must still be rejected"
+    assert verify_token(token[:-2]) is None
+
+    revoke_token(token)
+    assert token_cache.get(token) is None, "Revoked tokens should leave the cache"
+
+    print("✅ Verified token cache tests passed")
+
+def test_expiry_and_bound():
+    """Test that entries die with the token and the LRU stays bounded"""
+    print("Testing expiry and LRU bound...")
+
+    cache = TokenCache(max_entries=2)
+    cache.set("expiring", {"sub": "a", "exp": time.time() + 0.05})
+    cache.set("no-exp", {"sub": "b"})
+    assert cache.get("expiring") is not None
+    assert cache.get("no-exp") is None, "Tokens without exp should not be cached"
+    time.sleep(0.06)
+    assert cache.get("expiring") is None, "Entries should expire at the token's exp"
+
+    exp = time.time() + 60
+    for name in ("a", "b"):
+        cache.set(name, {"sub": name, "exp": exp})
+    cache.get("a")
+    cache.set("c", {"sub": "c", "exp": exp})
+    assert cache.get("b") is None and cache.get("a") is not None, "Least recently used token should be evicted"
+
+    expired = create_access_token({"sub": "old"}, expires_delta=timedelta(seconds=-1))
+    assert verify_token(expired) is None, "Expired tokens must be rejected"
+
+    print("✅ Expiry and LRU bound tests passed")
+
+def test_logout_revokes():
+    """Test that logout calls the revocation hook"""
+    print("Testing logout revocation...")
+
+    token = create_access_token({"sub": "user-2", "role": "admin"})
+    verify_token(token)
+    assert token_cache.get(token) is not None
+
+    response = client.post("/api/auth/logout", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert token_cache.get(token) is None, "Logout should clear the cached verification"
+    assert client.post("/api/auth/logout").status_code == 200, "Logout without a token should still work"
+
+    print("✅ Logout revocation tests passed")
+
+if __name__ == "__main__":
+    test_cached_verification()
+    test_expiry_and_bound()
+    test_logout_revokes()
+    print("\n🎉 All token cache tests passed!")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Current-user cache tests (mock database)
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.auth_service import create_access_token
+from app.services.user_cache import UserCache, USER_CACHE_REQUESTS, user_cache
+from app.utils.mock_database import mock_db
+
+client = TestClient(app, base_url="http://localhost")
+
+def test_me_uses_cache():
+    """Test that repeated /me calls are served from the user cache"""
+    print("Testing cached /me...")
+
+    admin = mock_db.users[0]
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': admin['id'], 'role': admin['role']})}"}
+    user_cache.clear()
+
+    misses = USER_CACHE_REQUESTS.get(result="miss")
+    hits = USER_CACHE_REQUESTS.get(result="hit")
+    for _ in range(3):
+        response = client.get("/api/auth/me", headers=headers)
+        assert response.status_code == 200, "/me failed"
+        assert response.json()["email"] == admin["email"]
+
+    assert USER_CACHE_REQUESTS.get(result="miss") == misses + 1, "Only the first call should miss"
+    assert USER_CACHE_REQUESTS.get(result="hit") == hits + 2, "Later calls should hit"
+    assert "crm_user_cache_hit_ratio" in client.get("/metrics").text
+
+    assert client.get("/api/auth/me", headers={"Authorization": "Bearer nope"}).status_code == 401
+    ghost = create_access_token({"sub": "00000000-0000-0000-0000-000000000000"})
+    assert client.get("/api/auth/me", headers={"Authorization": f"Bearer {ghost}"}).status_code == 404
+
+    print("✅ Cached /me tests passed")
+
+def test_ttl_and_invalidation():
+    """Test expiry, invalidation and the size bound"""
+    print("Testing TTL and invalidation...")
+
+    cache = UserCache(ttl=0.05, max_entries=2)
+    cache.set("a", {"id": "a"})
+    assert cache.get("a") == {"id": "a"}
+    cache.invalidate("a")
+    assert cache.get("a") is None, "Invalidated users should be reloaded"
+
+    cache.set("b", {"id": "b"})
+    time.sleep(0.06)
+    assert cache.get("b") is None, "Expired users should be reloaded"
+
+    for user_id in ("c", "d", "e"):
+        cache.set(user_id, {"id": user_id})
+    assert len(cache.entries) == 2 and cache.get("e") is not None, "Cache should stay bounded"
+
+    print("✅ TTL and invalidation tests passed")
+
+if __name__ == "__main__":
+    test_me_uses_cache()
+    test_ttl_and_invalidation()
+    print("\n🎉 All user cache tests passed!")
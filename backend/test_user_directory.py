@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+User directory tests (mock database)
+"""
+
+import sys
+import os
+import asyncio
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.user_directory import USER_DIRECTORY_MISSES, USER_DIRECTORY_REFRESH_OVERLAP_SECONDS, user_directory
+from app.utils.mock_database import mock_db
+
+client = TestClient(app, base_url="http://localhost")
+
+def test_warm_and_incremental_refresh():
+    """Test warm-up and pulling only changed users"""
+    print("Testing directory warm-up and refresh...")
+
+    asyncio.run(user_directory.warm(False))
+    admin = mock_db.users[0]
+    assert user_directory.get(admin["id"]).email == admin["email"], "Warm-up should load every user"
+
+    original_name = admin["full_name"]
+    admin["full_name"] = "Renamed Admin"
+    admin["updated_at"] = datetime.utcnow() + timedelta(seconds=1)
+    changed = asyncio.run(user_directory.refresh())
+    assert changed == 1, "Only the changed user should count, though the overlap re-reads others"
+    assert user_directory.get(admin["id"]).full_name == "Renamed Admin"
+    assert asyncio.run(user_directory.refresh()) == 0, "Re-read rows are deduplicated by id"
+
+    # A transaction that commits late carries an updated_at from before the watermark
+    late = user_directory.watermark - timedelta(seconds=USER_DIRECTORY_REFRESH_OVERLAP_SECONDS / 2)
+    admin["full_name"] = "Late Commit Admin"
+    admin["updated_at"] = late
+    assert asyncio.run(user_directory.refresh()) == 1, "Rows inside the overlap window should still be picked up"
+    assert user_directory.get(admin["id"]).full_name == "Late Commit Admin"
+
+    admin["full_name"] = original_name
+    user_directory.upsert(admin)
+
+    print("✅ Directory warm-up and refresh tests passed")
+
+def test_user_writes_and_task_lookups():
+    """Test that created users are usable as assignees without a lookup"""
+    print("Testing directory use in task creation...")
+
+    response = client.post("/api/users/", json={"email": "directory@example.com", "full_name": "Dir User", "role": "sales_executive"})
+    assert response.status_code == 200, "User creation failed"
+    user = next(user for user in mock_db.users if user["email"] == "directory@example.com")
+    assert user_directory.get(user["id"]).full_name == "Dir User", "User writes should update the directory"
+
+    misses = USER_DIRECTORY_MISSES.get()
+    response = client.post("/api/tasks/", json={
+        "title": "Directory task",
+        "assigned_to": user["id"],
+        "assigned_by": mock_db.users[0]["id"],
+    })
+    assert response.status_code == 200, "Task creation failed"
+    response = client.post("/api/tasks/bulk", json=[
+        {"title": f"Bulk {i}", "assigned_to": user["id"], "assigned_by": mock_db.users[0]["id"]} for i in range(3)
+    ])
+    assert response.status_code == 200, "Bulk task creation failed"
+    assert USER_DIRECTORY_MISSES.get() == misses, "Known assignees should not hit the database"
+
+    user_directory.invalidate(user["id"])
+    resolved = asyncio.run(user_directory.resolve([user["id"], "unknown-user"]))
+    assert list(resolved) == [user["id"]], "Invalidated users reload, unknown ids are skipped"
+    assert USER_DIRECTORY_MISSES.get() == misses + 1, "Misses are fetched in one batch"
+
+    print("✅ Directory task lookup tests passed")
+
+if __name__ == "__main__":
+    test_warm_and_incremental_refresh()
+    test_user_writes_and_task_lookups()
+    print("\n🎉 All user directory tests passed!")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Username allocation tests (mock database, SQL shape for PostgreSQL)
+"""
+
+import sys
+import os
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncpg
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from app.main import app
+from app.api import users
+from app.utils.mock_database import mock_db
+
+client = TestClient(app, base_url="http://localhost")
+
+def test_insert_statement_shape():
+    """Test the insert skips username collisions and returns the new row"""
+    print("Testing user insert statement...")
+
+    sql = str(users.insert_user_statement({
+        "username": "ann1234", "email": "ann@example.com", "password_hash": "x",
+        "full_name": "Ann", "role": "sales_executive", "is_active": True
+    }).compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (username) DO NOTHING" in sql, sql
+    assert "RETURNING users.id" in sql, sql
+
+    print("✅ User insert statement working")
+
+def unique_violation(constraint: str, detail: str) -> IntegrityError:
+    """IntegrityError shaped like SQLAlchemy's asyncpg adapter raises it"""
+    cause = asyncpg.exceptions.UniqueViolationError.new({"n": constraint, "M": detail, "C": "23505"})
+    adapted = Exception(detail)
+    adapted.__cause__ = cause
+    return IntegrityError("INSERT INTO users ...", {}, adapted)
+
+def test_duplicate_email_detection():
+    """Test duplicate emails are recognised by constraint name, not by message text"""
+    print("Testing duplicate email detection...")
+
+    for constraint in ("users_email_key", "ix_users_email"):
+        error = unique_violation(constraint, f'duplicate key value violates unique constraint "{constraint}"')
+        assert users.violated_constraint(error) in users.USER_EMAIL_CONSTRAINTS
+
+    error = unique_violation("users_backup_email_idx", "Key (backup_email)=(a@example.com) already exists")
+    assert users.violated_constraint(error) == "users_backup_email_idx"
+    assert users.violated_constraint(error) not in users.USER_EMAIL_CONSTRAINTS, "Other constraints mentioning email must not match"
+
+    print("✅ Duplicate email detection working")
+
+def test_mock_allocation():
+    """Test taken candidates are skipped and duplicate emails rejected"""
+    print("Testing username allocation...")
+
+    original = users.generate_username_candidates
+    users.generate_username_candidates = lambda full_name, count: ["superadmin", "allocated0001"]
+    try:
+        response = client.post("/api/users/", json={"email": "alloc@example.com", "full_name": "Alloc User", "role": "sales_executive"})
+        assert response.status_code == 200, response.text
+        assert response.json()["username"] == "allocated0001", "Taken username should be skipped"
+
+        response = client.post("/api/users/", json={"email": "alloc2@example.com", "full_name": "Alloc User", "role": "sales_executive"})
+        assert response.status_code == 409, "Exhausted candidates should be reported"
+    finally:
+        users.generate_username_candidates = original
+
+    response = client.post("/api/users/", json={"email": "alloc@example.com", "full_name": "Other", "role": "sales_executive"})
+    assert response.status_code == 400, "Duplicate email should be rejected"
+
+    assert asyncio.run(mock_db.get_user_by_username("allocated0001"))["email"] == "alloc@example.com"
+    try:
+        asyncio.run(mock_db.create_user({"username": "allocated0001", "email": "new@example.com"}))
+        assert False, "Mock database should enforce unique usernames"
+    except ValueError:
+        pass
+
+    print("✅ Username allocation working")
+
+if __name__ == "__main__":
+    test_insert_statement_shape()
+    test_duplicate_email_detection()
+    test_mock_allocation()
+    print("🎉 Username allocation tests passed")